@@ -0,0 +1,79 @@
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, List, Optional
+
+from fastapi import HTTPException
+
+from transform import dumps
+
+BATCH_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "json": "application/json",
+}
+
+
+def parse_batch_ids(ids: Optional[str], start: Optional[int], end: Optional[int], max_items: int) -> List[int]:
+    """解析批量请求的条目ID：逗号分隔的 ids，或闭区间 start..end（二选一）"""
+    if ids is not None and (start is not None or end is not None):
+        raise HTTPException(status_code=400, detail="Use either ids or start/end, not both")
+
+    if ids is not None:
+        try:
+            item_ids = [int(part) for part in ids.split(",") if part.strip()]
+        except ValueError:
+            raise HTTPException(status_code=400, detail="ids must be comma-separated integers")
+    elif start is not None and end is not None:
+        if end < start:
+            raise HTTPException(status_code=400, detail="end must be >= start")
+        if end - start + 1 > max_items:
+            raise HTTPException(status_code=400, detail=f"Batch is limited to {max_items} items")
+        item_ids = list(range(start, end + 1))
+    else:
+        raise HTTPException(status_code=400, detail="Provide ids or start and end")
+
+    if not item_ids:
+        raise HTTPException(status_code=400, detail="No item ids given")
+    if len(item_ids) > max_items:
+        raise HTTPException(status_code=400, detail=f"Batch is limited to {max_items} items")
+    return item_ids
+
+
+def _item_line(item_id: int, status: int, data: Optional[bytes] = None, error: Optional[str] = None) -> bytes:
+    # 成功的条目直接拼接已序列化的响应体，不再重新解析
+    if data is not None:
+        return b'{"id":%d,"status":%d,"data":%s}' % (item_id, status, data)
+    return dumps({"id": item_id, "status": status, "error": error})
+
+
+async def stream_batch(item_ids: List[int],
+                       load: Callable[[int], Awaitable[bytes]],
+                       concurrency: int,
+                       fmt: str) -> AsyncIterator[bytes]:
+    """并发获取（最多 concurrency 个同时进行），按请求顺序逐条输出；
+    单条失败时输出该条的错误，不影响整个批次"""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(item_id: int) -> bytes:
+        async with semaphore:
+            try:
+                return _item_line(item_id, 200, data=await load(item_id))
+            except HTTPException as exc:
+                return _item_line(item_id, exc.status_code, error=str(exc.detail))
+            except Exception:
+                return _item_line(item_id, 500, error="Internal error")
+
+    tasks = [asyncio.ensure_future(run(item_id)) for item_id in item_ids]
+    try:
+        if fmt == "json":
+            yield b"["
+        for index, task in enumerate(tasks):
+            line = await task
+            if fmt == "json":
+                yield line if index == 0 else b"," + line
+            else:
+                yield line + b"\n"
+        if fmt == "json":
+            yield b"]"
+    finally:
+        # 客户端提前断开时取消尚未完成的请求
+        for task in tasks:
+            task.cancel()
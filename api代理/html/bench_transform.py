@@ -0,0 +1,98 @@
+"""
+响应转换基准：对比逐请求解释配置的 apply_config 与编译后的转换器
+
+旧路径：json.loads → apply_config（列表逐项调用）→ json.dumps
+新路径：ResponseTransformer.transform_bytes（原始字节进，字节出）
+
+用法：python bench_transform.py [-r 重复次数]
+"""
+import argparse
+import copy
+import json
+import time
+from typing import Any, Dict
+
+from fastapi import HTTPException
+
+from test import DEFAULT_API_CONFIGS
+from transform import ResponseTransformer, loads
+
+
+# 逐请求解释配置的旧实现（已不在请求路径上），作为对比基线
+def apply_config(data: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+    if not config["enabled"]:
+        raise HTTPException(status_code=503, detail="API is disabled")
+    
+    # 验证必填字段
+    for field in config["required_fields"]:
+        if field not in data:
+            raise HTTPException(status_code=400, detail=f"Missing required field: {field}")
+    
+    # 添加自定义字段
+    data["custom_field"] = "This is my custom value"
+    data["another_custom"] = 42
+    
+    # 过滤显示字段
+    filtered_data = {k: v for k, v in data.items() if k in config["display_fields"]}
+    return filtered_data
+
+
+def make_post(item_id, extra_fields):
+    post = {
+        "userId": item_id % 10 + 1,
+        "id": item_id,
+        "title": f"post {item_id}",
+        "body": "lorem ipsum dolor sit amet " * 8,
+    }
+    for i in range(extra_fields):
+        post[f"extra_{i}"] = i
+    return post
+
+
+def legacy(raw, config):
+    data = json.loads(raw)
+    if isinstance(data, list):
+        result = [apply_config(item, config) for item in data]
+    else:
+        result = apply_config(data, config)
+    return json.dumps(result).encode("utf-8")
+
+
+def best_time(func, raw, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(raw)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description='响应转换基准')
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='每个用例重复次数（取最快一次）')
+    args = parser.parse_args()
+
+    config = copy.deepcopy(DEFAULT_API_CONFIGS["post_api"])
+    transformer = ResponseTransformer(config)
+
+    cases = [
+        ("单条", make_post(1, 0), 2000),
+        ("单条+50字段", make_post(1, 50), 2000),
+        ("列表100", [make_post(i, 0) for i in range(100)], 50),
+        ("列表10000", [make_post(i, 20) for i in range(10000)], 1),
+    ]
+
+    print(f"{'用例':<12} {'apply_config':>14} {'编译转换器':>12} {'加速':>8}")
+    for name, payload, loops in cases:
+        raw = json.dumps(payload).encode("utf-8")
+
+        # 两条路径的结果必须一致
+        assert loads(transformer.transform_bytes(raw)) == json.loads(legacy(raw, config)), name
+
+        old = best_time(lambda r: [legacy(r, config) for _ in range(loops)], raw, args.repeat) / loops
+        new = best_time(lambda r: [transformer.transform_bytes(r) for _ in range(loops)], raw, args.repeat) / loops
+        print(f"{name:<12} {old * 1e6:>11.1f} µs {new * 1e6:>9.1f} µs {old / new:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+import asyncio
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from single_flight import SingleFlight
+
+# 缓存键：(配置名, 条目ID)
+CacheKey = Tuple[str, Hashable]
+
+
+class ResponseCache:
+    """按配置名 + 条目ID 缓存代理响应：每条带过期时间，总条数按 LRU 淘汰，
+    同一个键的并发未命中只触发一次上游请求（single-flight）。
+    过期后 stale_ttl 秒内仍可返回旧值，同时在后台刷新（stale-while-revalidate），
+    刷新失败时继续使用旧值"""
+
+    def __init__(self, max_entries: int = 10000, clock: Callable[[], float] = time.monotonic):
+        self.max_entries = max_entries
+        self._clock = clock
+        # 键 -> (新鲜截止时间, 可用旧值截止时间, 值)
+        self._entries: "OrderedDict[CacheKey, Tuple[float, float, Any]]" = OrderedDict()
+        # 上游请求在独立任务中进行，发起请求的客户端断开时不影响合并到同一请求上的其他客户端
+        self._inflight = SingleFlight()
+        # 每个配置的版本号，失效时递增，防止失效前发出的请求把旧结果写回缓存
+        self._generations: Dict[str, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.stale = 0
+        self.refresh_errors = 0
+        self.expired = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    async def get_or_fetch(self, key: CacheKey, ttl: float, fetch: Callable[[], Awaitable[Any]],
+                           stale_ttl: float = 0) -> Any:
+        """命中则直接返回；未命中时调用 fetch，同键的并发请求等待同一个结果。ttl <= 0 表示不缓存"""
+        if ttl <= 0:
+            return await fetch()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            now = self._clock()
+            if entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            if entry[1] > now:
+                # 返回旧值，后台刷新（已有刷新在进行时不重复发起）
+                self._entries.move_to_end(key)
+                self.stale += 1
+                if key not in self._inflight:
+                    task = self._inflight.start(key, lambda: self._fetch_and_store(key, ttl, stale_ttl, fetch))
+                    task.add_done_callback(self._refresh_done)
+                return entry[2]
+            del self._entries[key]
+            self.expired += 1
+
+        if key in self._inflight:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+        return await self._inflight.wait(key, lambda: self._fetch_and_store(key, ttl, stale_ttl, fetch))
+
+    async def _fetch_and_store(self, key: CacheKey, ttl: float, stale_ttl: float,
+                               fetch: Callable[[], Awaitable[Any]]) -> Any:
+        generation = self._generations.get(key[0], 0)
+        # 错误不缓存，只转交给正在等待的请求
+        value = await fetch()
+        if self._generations.get(key[0], 0) == generation:
+            self._store(key, ttl, stale_ttl, value)
+        return value
+
+    def _refresh_done(self, task: asyncio.Task) -> None:
+        # 刷新失败时保留旧值，直到超出 stale_ttl
+        if task.cancelled() or task.exception() is not None:
+            self.refresh_errors += 1
+
+    def _store(self, key: CacheKey, ttl: float, stale_ttl: float, value: Any) -> None:
+        fresh_until = self._clock() + ttl
+        self._entries[key] = (fresh_until, fresh_until + max(stale_ttl, 0), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, config_name: str) -> int:
+        """删除某个配置的全部缓存，返回删除的条数"""
+        self._generations[config_name] = self._generations.get(config_name, 0) + 1
+        for key in [key for key in self._inflight if key[0] == config_name]:
+            self._inflight.forget(key)
+
+        stale = [key for key in self._entries if key[0] == config_name]
+        for key in stale:
+            del self._entries[key]
+        self.invalidations += 1
+        return len(stale)
+
+    def clear(self) -> None:
+        for config_name in {key[0] for key in self._entries} | {key[0] for key in self._inflight}:
+            self.invalidate(config_name)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses + self.coalesced + self.stale
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "stale": self.stale,
+            "refresh_errors": self.refresh_errors,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_ratio": round((self.hits + self.coalesced + self.stale) / lookups, 4) if lookups else 0.0,
+        }
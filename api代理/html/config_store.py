@@ -0,0 +1,197 @@
+import asyncio
+import copy
+import json
+import os
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, Set
+
+from transform import ResponseTransformer
+
+# 两种格式共用的可选字段
+OPTIONAL_FIELDS = ("cache_ttl", "stale_ttl", "cache_control")
+# 代理格式记录中由代理解释的字段，其余字段（id 等）写回时保留
+PROXY_FIELDS = ("enabled", "required_fields", "display_fields", "custom_fields") + OPTIONAL_FIELDS
+
+
+def _split_fields(value: Any) -> list:
+    if isinstance(value, str):
+        return [field.strip() for field in value.split(",") if field.strip()]
+    return list(value or [])
+
+
+def is_node_record(entry: Dict[str, Any]) -> bool:
+    return "isEnabled" in entry or "visibleFields" in entry or "requiredFields" in entry
+
+
+def normalize_config(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """把 db.json 中的一条记录整理成代理使用的配置格式
+
+    同时兼容 Node 版（server.js）的字段：isEnabled、requiredFields / visibleFields（逗号分隔）、
+    customFields（JSON 字符串）。Node 版 visibleFields 为空表示显示全部字段，自定义字段总是追加
+    """
+    if is_node_record(entry):
+        custom_fields = entry.get("customFields") or {}
+        if isinstance(custom_fields, str):
+            custom_fields = json.loads(custom_fields or "{}")
+        visible = _split_fields(entry.get("visibleFields"))
+        config = {
+            "enabled": entry.get("isEnabled", True),
+            "required_fields": _split_fields(entry.get("requiredFields")),
+            "display_fields": visible + [k for k in custom_fields if k not in visible] if visible else None,
+            "custom_fields": custom_fields,
+        }
+    else:
+        config = {k: v for k, v in entry.items() if k != "name"}
+        config.setdefault("enabled", True)
+        config.setdefault("required_fields", [])
+        config.setdefault("custom_fields", {})
+        config["required_fields"] = _split_fields(config["required_fields"])
+        if config.get("display_fields") is not None:
+            config["display_fields"] = _split_fields(config["display_fields"])
+    for key in OPTIONAL_FIELDS:
+        if key in entry:
+            config[key] = entry[key]
+    return config
+
+
+def update_record(record: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
+    """把代理格式的配置写回文件中的一条记录，保持记录原来的格式
+
+    Node 版记录只改写它的字段（字段类型保持不变），id、externalApiUrl 等其他字段原样保留，
+    与 Node 服务共用文件时不丢失数据
+    """
+    if not is_node_record(record):
+        kept = {key: value for key, value in record.items() if key not in PROXY_FIELDS}
+        return {**kept, **config}
+
+    record = dict(record)
+    custom_fields = config.get("custom_fields") or {}
+    display_fields = config.get("display_fields")
+    # Node 版总是追加自定义字段，visibleFields 中不需要列出
+    visible = [field for field in display_fields if field not in custom_fields] if display_fields is not None else []
+    required = _split_fields(config.get("required_fields"))
+    record["isEnabled"] = config.get("enabled", True)
+    record["requiredFields"] = ",".join(required) if isinstance(record.get("requiredFields", ""), str) else required
+    record["visibleFields"] = ",".join(visible) if isinstance(record.get("visibleFields", ""), str) else visible
+    if isinstance(record.get("customFields", ""), str):
+        record["customFields"] = json.dumps(custom_fields, ensure_ascii=False, indent=2)
+    else:
+        record["customFields"] = custom_fields
+    for key in OPTIONAL_FIELDS:
+        record.pop(key, None)
+        if key in config:
+            record[key] = config[key]
+    return record
+
+
+class ConfigSnapshot:
+    """某一时刻的全部配置及其编译后的转换器，创建后不再修改，更新时整体替换"""
+
+    def __init__(self, configs: Dict[str, Dict[str, Any]], version: int, mtime_ns: int):
+        self.configs: Mapping[str, Dict[str, Any]] = MappingProxyType(configs)
+        self.transformers: Mapping[str, ResponseTransformer] = MappingProxyType(
+            {name: ResponseTransformer(config) for name, config in configs.items()})
+        self.version = version
+        self.mtime_ns = mtime_ns
+
+
+class ConfigStore:
+    """从 db.json 格式的文件（{"configs": [{"name": ..., ...}]}）加载配置
+
+    请求处理只读取内存中的快照；后台任务按修改时间轮询文件，变化时重新加载并原子替换快照，
+    无需重启 uvicorn。文件不存在时只在内存中使用默认配置，第一次通过 put() 修改时才创建文件；
+    写回时保留文件中的其他内容和每条记录原来的格式
+    """
+
+    def __init__(self, path: str, defaults: Optional[Dict[str, Dict[str, Any]]] = None, poll_interval: float = 1.0):
+        self.path = path
+        self.defaults = defaults or {}
+        self.poll_interval = poll_interval
+        self._snapshot = ConfigSnapshot({}, 0, 0)
+        # 文件的原始内容，写回时只替换修改的记录
+        self._data: Dict[str, Any] = {"configs": []}
+        self._failed_mtime_ns = None
+        self._write_lock = asyncio.Lock()
+
+    @property
+    def snapshot(self) -> ConfigSnapshot:
+        return self._snapshot
+
+    def _read(self) -> ConfigSnapshot:
+        mtime_ns = os.stat(self.path).st_mtime_ns
+        with open(self.path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        snapshot = self._build(data, mtime_ns)
+        self._data = data
+        return snapshot
+
+    def _build(self, data: Dict[str, Any], mtime_ns: int) -> ConfigSnapshot:
+        configs = {entry["name"]: normalize_config(entry) for entry in data.get("configs", [])}
+        return ConfigSnapshot(configs, self._snapshot.version + 1, mtime_ns)
+
+    def _write(self, data: Dict[str, Any]) -> int:
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path)
+        return os.stat(self.path).st_mtime_ns
+
+    def _swap(self, snapshot: ConfigSnapshot) -> Set[str]:
+        """替换快照，返回内容有变化（新增、修改、删除）的配置名"""
+        old = self._snapshot.configs
+        self._snapshot = snapshot
+        new = snapshot.configs
+        return {name for name in set(old) | set(new) if old.get(name) != new.get(name)}
+
+    def load(self) -> Set[str]:
+        if not os.path.exists(self.path):
+            self._data = {"configs": [{"name": name, **config} for name, config in self.defaults.items()]}
+            return self._swap(self._build(self._data, 0))
+        return self._swap(self._read())
+
+    def reload_if_changed(self) -> Set[str]:
+        """文件修改时间变化时重新加载；文件损坏或被删除时保留当前快照"""
+        mtime_ns = -1
+        try:
+            try:
+                mtime_ns = os.stat(self.path).st_mtime_ns
+            except FileNotFoundError:
+                # 还没有创建过文件时继续使用内存中的默认配置
+                if self._snapshot.mtime_ns == 0:
+                    return set()
+                raise
+            if mtime_ns in (self._snapshot.mtime_ns, self._failed_mtime_ns):
+                return set()
+            snapshot = self._read()
+        except (OSError, ValueError, KeyError, TypeError) as exc:
+            # 同一个损坏版本只提示一次，文件再次修改后重试
+            if mtime_ns != self._failed_mtime_ns:
+                print(f"⚠️ 配置文件加载失败，继续使用当前配置: {exc}")
+            self._failed_mtime_ns = mtime_ns
+            return set()
+        self._failed_mtime_ns = None
+        return self._swap(snapshot)
+
+    async def put(self, name: str, config: Dict[str, Any]) -> Set[str]:
+        """更新一条配置：写回文件后立即替换快照"""
+        async with self._write_lock:
+            data = copy.deepcopy(self._data)
+            records = data.setdefault("configs", [])
+            for index, record in enumerate(records):
+                if record.get("name") == name:
+                    records[index] = update_record(record, config)
+                    break
+            else:
+                records.append({"name": name, **config})
+            snapshot = self._build(data, 0)
+            snapshot.mtime_ns = await asyncio.to_thread(self._write, data)
+            self._data = data
+            return self._swap(snapshot)
+
+    async def watch(self, on_change: Callable[[Set[str]], Awaitable[None]]) -> None:
+        """后台轮询文件，配置变化时回调 on_change(变化的配置名)"""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            changed = await asyncio.to_thread(self.reload_if_changed)
+            if changed:
+                await on_change(changed)
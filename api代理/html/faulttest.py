@@ -0,0 +1,102 @@
+"""
+故障测试：启动带故障注入的本地桩上游和代理，检查超时、重试、熔断和返回旧缓存的行为
+
+用法：python faulttest.py
+每一步打印 ✅ / ❌，任何一步失败时退出码为 1
+"""
+import os
+import sys
+import time
+
+import httpx
+
+from loadtest import free_port, start_server
+
+
+def main():
+    stub_port = free_port()
+    stub = start_server("stub_upstream:app", stub_port)
+    stub_url = f"http://127.0.0.1:{stub_port}"
+
+    proxy_port = free_port()
+    proxy = start_server("test:app", proxy_port, {
+        "UPSTREAM_BASE_URL": stub_url,
+        "UPSTREAM_READ_TIMEOUT": "0.5",
+        "UPSTREAM_DEADLINE": "2",
+        "UPSTREAM_RETRIES": "2",
+        "BREAKER_WINDOW": "10",
+        "BREAKER_MIN_CALLS": "5",
+        "BREAKER_RESET_TIMEOUT": "1",
+        "CACHE_DEFAULT_TTL": "0.5",
+        "CACHE_STALE_TTL": "60",
+        "API_CONFIG_FILE": os.path.join(os.path.dirname(os.path.abspath(__file__)), ".faulttest_configs.json"),
+    })
+    proxy_url = f"http://127.0.0.1:{proxy_port}"
+    failures = 0
+
+    def check(name, ok, detail=""):
+        nonlocal failures
+        print(f"{'✅' if ok else '❌'} {name} {detail}")
+        failures += not ok
+
+    def set_faults(**faults):
+        httpx.put(f"{stub_url}/_faults", json=faults).raise_for_status()
+
+    def upstream_requests():
+        return httpx.get(f"{stub_url}/_faults").json()["requests"]
+
+    def timed_get(path):
+        start = time.perf_counter()
+        response = httpx.get(f"{proxy_url}{path}", timeout=30)
+        return response, time.perf_counter() - start
+
+    try:
+        response, _ = timed_get("/new_api/1")
+        check("正常请求", response.status_code == 200)
+
+        # 偶发错误：重试后成功
+        set_faults(error_rate=0.2)
+        ok = sum(timed_get(f"/new_api/{i}")[0].status_code == 200 for i in range(10, 30))
+        check("20% 错误率下重试", ok >= 19, f"({ok}/20 成功)")
+
+        # 上游挂起：在截止时间内返回 504，而不是一直等待
+        set_faults(error_rate=0, hang_rate=1)
+        response, elapsed = timed_get("/new_api/50")
+        check("上游挂起时按截止时间返回", response.status_code == 504 and elapsed < 3, f"({response.status_code}, {elapsed:.2f}s)")
+
+        # 上游持续故障：熔断器打开后快速失败，不再访问上游
+        set_faults(hang_rate=0, error_rate=1)
+        for i in range(60, 70):
+            timed_get(f"/new_api/{i}")
+        before = upstream_requests()
+        response, elapsed = timed_get("/new_api/70")
+        check("熔断后快速失败", response.status_code == 503 and elapsed < 0.1 and upstream_requests() == before,
+              f"({response.status_code}, {elapsed * 1000:.1f} ms)")
+
+        # 缓存过期后上游故障：返回旧值
+        response, _ = timed_get("/new_api/1")
+        check("上游故障时返回旧缓存", response.status_code == 200 and response.json().get("id") == 1)
+
+        # 上游恢复：熔断器半开探测成功后关闭
+        set_faults(error_rate=0)
+        time.sleep(1.2)
+        response, _ = timed_get("/new_api/80")
+        check("上游恢复后熔断器关闭", response.status_code == 200)
+
+        metrics = httpx.get(f"{proxy_url}/metrics").text
+        check("指标包含熔断和重试统计", 'proxy_upstream_resilience{stat="retries"}' in metrics)
+    finally:
+        proxy.terminate()
+        proxy.wait()
+        stub.terminate()
+        stub.wait()
+        try:
+            os.remove(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".faulttest_configs.json"))
+        except FileNotFoundError:
+            pass
+
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+import gzip
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Optional, Sequence, Tuple
+
+from fastapi import Request, Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# 每个缓存条目除内容外的开销（键、OrderedDict 节点），不值得压缩的条目（None）也按此计入大小
+ENTRY_OVERHEAD = 128
+
+
+def body_etag(body: bytes) -> str:
+    """响应体的强 ETag（blake2b 摘要，计算开销远小于序列化）"""
+    return '"%s"' % hashlib.blake2b(body, digest_size=12).hexdigest()
+
+
+def encoded_etag(etag: str, encoding: Optional[str]) -> str:
+    """压缩后的内容是不同的表示，强 ETag 需要不同"""
+    return etag if encoding is None else f'{etag[:-1]}-{encoding}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match 中是否包含该 ETag（GET/HEAD 使用弱比较：忽略 W/ 前缀）"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == opaque:
+            return True
+    return False
+
+
+def accepted_encodings(accept_encoding: Optional[str]) -> Dict[str, float]:
+    """解析 Accept-Encoding：{编码: q 值}，编码名小写"""
+    result: Dict[str, float] = {}
+    if not accept_encoding:
+        return result
+    for part in accept_encoding.split(","):
+        coding, _, params = part.partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        result[coding] = q
+    return result
+
+
+def choose_encoding(accept_encoding: Optional[str], available: Sequence[str]) -> Optional[str]:
+    """从 available（按服务端偏好排序）中选出客户端接受的编码，q 值相同时按服务端偏好；都不接受时返回 None"""
+    accepted = accepted_encodings(accept_encoding)
+    wildcard = accepted.get("*", 0.0)
+    best, best_q = None, 0.0
+    for coding in available:
+        q = accepted.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class CompressedBodyCache:
+    """按 (ETag, 编码) 缓存压缩后的响应体，相同内容只压缩一次，总大小按 LRU 淘汰；
+    压缩后不比原文小的内容也记录下来（值为 None），之后直接返回原文"""
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, min_size: int = 1024,
+                 gzip_level: int = 6, brotli_quality: int = 5):
+        self.max_bytes = max_bytes
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        # 服务端偏好：brotli 压缩率更高，可用时优先
+        self.encodings: Tuple[str, ...] = ("br", "gzip") if brotli is not None else ("gzip",)
+        self._entries: "OrderedDict[Tuple[str, str], Optional[bytes]]" = OrderedDict()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, etag: str, body: bytes, encoding: str) -> Optional[bytes]:
+        """返回压缩后的内容；不值得压缩时返回 None"""
+        key = (etag, encoding)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+        self.misses += 1
+        if encoding == "br":
+            compressed = brotli.compress(body, quality=self.brotli_quality)
+        else:
+            compressed = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+        if len(compressed) >= len(body):
+            compressed = None
+        self._entries[key] = compressed
+        self._bytes += self._entry_size(key, compressed)
+        while self._bytes > self.max_bytes:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self._bytes -= self._entry_size(evicted_key, evicted)
+            self.evictions += 1
+        return compressed
+
+    @staticmethod
+    def _entry_size(key: Tuple[str, str], compressed: Optional[bytes]) -> int:
+        return ENTRY_OVERHEAD + len(key[0]) + len(key[1]) + len(compressed or b"")
+
+    def respond(self, request: Request, body: bytes, media_type: str, cache_control: str) -> Response:
+        """带 ETag、Cache-Control 的响应：If-None-Match 命中时返回 304，
+        不小于 min_size 的内容按 Accept-Encoding 协商压缩"""
+        etag = body_etag(body)
+        if_none_match = request.headers.get("if-none-match")
+        encoding = None
+        if len(body) >= self.min_size:
+            encoding = choose_encoding(request.headers.get("accept-encoding"), self.encodings)
+        headers = {"Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+
+        # 客户端已有压缩后的表示时直接返回 304，无需压缩
+        if encoding is not None and etag_matches(if_none_match, encoded_etag(etag, encoding)):
+            headers["ETag"] = encoded_etag(etag, encoding)
+            return Response(status_code=304, headers=headers)
+        compressed = self.get(etag, body, encoding) if encoding is not None else None
+        if compressed is None:
+            encoding = None
+
+        headers["ETag"] = encoded_etag(etag, encoding)
+        if etag_matches(if_none_match, headers["ETag"]):
+            return Response(status_code=304, headers=headers)
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+            return Response(content=compressed, media_type=media_type, headers=headers)
+        return Response(content=body, media_type=media_type, headers=headers)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "size": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
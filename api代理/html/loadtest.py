@@ -0,0 +1,146 @@
+"""
+代理压测：启动本地桩上游和代理，用固定并发发送请求，输出吞吐量和延迟
+
+用法：
+    python loadtest.py                    # 压测当前的异步连接池版本
+    python loadtest.py --legacy           # 压测旧的同步版本（每个请求新建连接、占用线程池）
+    python loadtest.py --compare          # 两个版本都跑一遍并对比
+    python loadtest.py -c 200 -n 5000 --latency 20
+    python loadtest.py --cache-ttl 60     # 打开响应缓存
+"""
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+from fastapi import FastAPI, HTTPException
+
+from bench_transform import apply_config
+from test import DEFAULT_API_CONFIGS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# 旧版本的端点：同步函数 + 无会话的阻塞请求，作为对比基线
+legacy_app = FastAPI()
+
+
+@legacy_app.get("/new_api/{item_id}")
+def legacy_get_item(item_id: int):
+    response = httpx.get(f"{os.environ['UPSTREAM_BASE_URL']}/posts/{item_id}")
+    if response.status_code != 200:
+        raise HTTPException(status_code=response.status_code, detail="External API error")
+    config = DEFAULT_API_CONFIGS.get("post_api", {})
+    return apply_config(response.json(), config)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(app_path, port, env=None):
+    """在子进程中启动 uvicorn，等待端口可连接"""
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app_path, "--port", str(port), "--log-level", "warning"],
+        cwd=HERE,
+        env={**os.environ, **(env or {})},
+    )
+    deadline = time.time() + 15
+    while time.time() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return process
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise RuntimeError(f"{app_path} 启动失败")
+
+
+async def run_load(url, total, concurrency):
+    latencies = []
+    errors = 0
+    counter = iter(range(total))
+
+    async with httpx.AsyncClient(limits=httpx.Limits(max_connections=concurrency), timeout=30) as client:
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                start = time.perf_counter()
+                try:
+                    response = await client.get(f"{url}/new_api/{i % 100 + 1}")
+                    if response.status_code != 200:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": total,
+        "errors": errors,
+        "rps": total / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def bench(app_path, args, upstream_url):
+    port = free_port()
+    server = start_server(app_path, port, {"UPSTREAM_BASE_URL": upstream_url, "CACHE_DEFAULT_TTL": str(args.cache_ttl)})
+    try:
+        url = f"http://127.0.0.1:{port}"
+        asyncio.run(run_load(url, min(args.concurrency, args.requests), args.concurrency))  # 预热
+        return asyncio.run(run_load(url, args.requests, args.concurrency))
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def print_result(name, result):
+    print(f"{name:<8} {result['rps']:>9.1f} req/s   p50 {result['p50_ms']:>7.1f} ms   "
+          f"p99 {result['p99_ms']:>7.1f} ms   错误 {result['errors']}/{result['requests']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='代理压测（本地桩上游）')
+    parser.add_argument('-n', '--requests', type=int, default=2000, help='请求总数')
+    parser.add_argument('-c', '--concurrency', type=int, default=100, help='并发数')
+    parser.add_argument('--latency', type=float, default=10, help='桩上游的模拟延迟（毫秒）')
+    parser.add_argument('--cache-ttl', type=float, default=0, help='代理响应缓存时间（秒），默认 0 即关闭缓存只比较上游访问')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--legacy', action='store_true', help='只压测旧的同步版本')
+    group.add_argument('--compare', action='store_true', help='两个版本都压测并对比')
+    args = parser.parse_args()
+
+    stub_port = free_port()
+    stub = start_server("stub_upstream:app", stub_port, {"STUB_LATENCY_MS": str(args.latency)})
+    upstream_url = f"http://127.0.0.1:{stub_port}"
+
+    print(f"🚀 {args.requests} 个请求，并发 {args.concurrency}，上游延迟 {args.latency} ms")
+    try:
+        results = {}
+        if args.legacy or args.compare:
+            results['legacy'] = bench("loadtest:legacy_app", args, upstream_url)
+            print_result('legacy', results['legacy'])
+        if not args.legacy:
+            results['pooled'] = bench("test:app", args, upstream_url)
+            print_result('pooled', results['pooled'])
+        if args.compare:
+            print(f"📈 吞吐提升: {results['pooled']['rps'] / results['legacy']['rps']:.2f}x")
+    finally:
+        stub.terminate()
+        stub.wait()
+
+
+if __name__ == '__main__':
+    main()
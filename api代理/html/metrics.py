@@ -0,0 +1,193 @@
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Sequence, Tuple
+
+# 秒，覆盖本地桩（亚毫秒）到慢上游（数秒）
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+class Counter:
+    metric_type = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, labels: Labels = (), amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self, lines: List[str]) -> None:
+        lines.append(f"# HELP {self.name} {self.documentation}")
+        lines.append(f"# TYPE {self.name} {self.metric_type}")
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+
+
+class Gauge(Counter):
+    metric_type = "gauge"
+
+    def dec(self, labels: Labels = (), amount: float = 1) -> None:
+        self._values[labels] = self._values.get(labels, 0) - amount
+
+    def set(self, labels: Labels, value: float) -> None:
+        self._values[labels] = value
+
+
+class Histogram:
+    """固定桶直方图；每个标签组合只保存各桶计数、总和与次数，observe 为 O(log 桶数)"""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series: Dict[Labels, list] = {}
+
+    def observe(self, labels: Labels, value: float) -> None:
+        series = self._series.get(labels)
+        if series is None:
+            # [各桶计数（最后一个是 +Inf）, 总和, 次数]
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self, lines: List[str]) -> None:
+        lines.append(f"# HELP {self.name} {self.documentation}")
+        lines.append(f"# TYPE {self.name} histogram")
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = 'le="+Inf"' if bound == float("inf") else f'le="{bound!r}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {repr(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+
+
+class PhaseTimer:
+    """记录一段代码的耗时到 proxy_phase_seconds{config, phase}"""
+    __slots__ = ("_histogram", "_labels", "_start")
+
+    def __init__(self, histogram: Histogram, labels: Labels):
+        self._histogram = histogram
+        self._labels = labels
+
+    def __enter__(self) -> "PhaseTimer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._histogram.observe(self._labels, time.perf_counter() - self._start)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullTimer":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class ProxyMetrics:
+    """代理服务的全部指标，以 Prometheus 文本格式导出；关闭时所有记录操作为空操作"""
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.request_seconds = Histogram(
+            "proxy_request_seconds", "Request latency by route", ("method", "route", "status"))
+        self.phase_seconds = Histogram(
+            "proxy_phase_seconds", "Time spent per phase of an uncached proxy request", ("config", "phase"))
+        self.upstream_responses = Counter(
+            "proxy_upstream_responses_total", "Upstream responses by status code", ("config", "status"))
+        self.in_flight = Gauge("proxy_requests_in_flight", "Requests currently being handled")
+        # 导出时才采集的指标（连接池、缓存等），避免在请求路径上维护
+        self._collectors: List[Callable[[List[str]], None]] = []
+
+    def phase(self, config: str, phase: str):
+        if not self.enabled:
+            return _NULL_TIMER
+        return PhaseTimer(self.phase_seconds, (config, phase))
+
+    def upstream_status(self, config: str, status: str) -> None:
+        if self.enabled:
+            self.upstream_responses.inc((config, status))
+
+    def add_collector(self, collector: Callable[[List[str]], None]) -> None:
+        self._collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[[List[str]], None]) -> None:
+        self._collectors.remove(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in (self.request_seconds, self.phase_seconds, self.upstream_responses, self.in_flight):
+            metric.render(lines)
+        for collector in self._collectors:
+            collector(lines)
+        return "\n".join(lines) + "\n"
+
+
+def gauge_lines(lines: List[str], name: str, documentation: str, values: Dict[str, float], label: str) -> None:
+    """把 {标签值: 数值} 作为一个 gauge 追加到导出内容"""
+    gauge = Gauge(name, documentation, (label,))
+    for key, value in values.items():
+        gauge.set((key,), value)
+    gauge.render(lines)
+
+
+class MetricsMiddleware:
+    """纯 ASGI 中间件：统计按路由模板聚合的请求耗时、状态码和进行中的请求数"""
+
+    def __init__(self, app, metrics: ProxyMetrics):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.metrics.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        self.metrics.in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            self.metrics.in_flight.dec()
+            # 路由匹配后 scope 中会有 route，用路径模板而不是实际路径，避免标签爆炸
+            route = getattr(scope.get("route"), "path", "unmatched")
+            self.metrics.request_seconds.observe(
+                (scope["method"], route, str(status)), time.perf_counter() - start)
@@ -0,0 +1,219 @@
+import asyncio
+import os
+import random
+import time
+from collections import deque
+from typing import Dict, Optional
+
+import httpx
+
+from upstream import UpstreamClient, env_float, env_int
+
+# 这些上游状态码视为上游故障：计入熔断器，并允许重试
+RETRYABLE_STATUS = frozenset({502, 503, 504})
+
+
+class CircuitOpenError(Exception):
+    """熔断器打开期间直接拒绝请求，不访问上游"""
+
+
+class ResilienceSettings:
+    """上游容错设置，默认值可被环境变量覆盖"""
+
+    def __init__(self,
+                 retries: int = 2,
+                 retry_base_delay: float = 0.05,
+                 retry_max_delay: float = 1.0,
+                 retry_budget_ratio: float = 0.2,
+                 retry_budget_min: float = 10.0,
+                 deadline: float = 15.0,
+                 failure_ratio: float = 0.5,
+                 window: int = 20,
+                 min_calls: int = 10,
+                 reset_timeout: float = 10.0):
+        self.retries = retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.retry_budget_ratio = retry_budget_ratio
+        self.retry_budget_min = retry_budget_min
+        self.deadline = deadline
+        self.failure_ratio = failure_ratio
+        self.window = window
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+
+    @classmethod
+    def from_env(cls) -> "ResilienceSettings":
+        return cls(
+            retries=env_int("UPSTREAM_RETRIES", 2),
+            retry_base_delay=env_float("UPSTREAM_RETRY_BASE_DELAY", 0.05),
+            retry_max_delay=env_float("UPSTREAM_RETRY_MAX_DELAY", 1.0),
+            retry_budget_ratio=env_float("UPSTREAM_RETRY_BUDGET_RATIO", 0.2),
+            retry_budget_min=env_float("UPSTREAM_RETRY_BUDGET_MIN", 10.0),
+            deadline=env_float("UPSTREAM_DEADLINE", 15.0),
+            failure_ratio=env_float("BREAKER_FAILURE_RATIO", 0.5),
+            window=env_int("BREAKER_WINDOW", 20),
+            min_calls=env_int("BREAKER_MIN_CALLS", 10),
+            reset_timeout=env_float("BREAKER_RESET_TIMEOUT", 10.0),
+        )
+
+
+class CircuitBreaker:
+    """最近 window 次调用中至少有 min_calls 次、且失败比例达到 failure_ratio 时打开；
+    打开 reset_timeout 秒后进入半开，只放行一个探测请求，探测成功则关闭，失败则重新打开"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_ratio: float, window: int, min_calls: int, reset_timeout: float,
+                 clock=time.monotonic):
+        self.failure_ratio = failure_ratio
+        self.min_calls = min_calls
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = self.CLOSED
+        # 最近调用结果，True 表示失败
+        self._outcomes = deque(maxlen=window)
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self.rejected = 0
+
+    def before_call(self) -> None:
+        if self.state == self.OPEN:
+            if self._clock() - self.opened_at < self.reset_timeout:
+                self.rejected += 1
+                raise CircuitOpenError("Upstream circuit is open")
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            if self._probing:
+                self.rejected += 1
+                raise CircuitOpenError("Upstream circuit is half-open")
+            self._probing = True
+
+    def _record(self, failed: bool) -> None:
+        if len(self._outcomes) == self._outcomes.maxlen and self._outcomes[0]:
+            self.failures -= 1
+        self._outcomes.append(failed)
+        self.failures += failed
+
+    def record_success(self) -> None:
+        self._probing = False
+        if self.state == self.HALF_OPEN:
+            self.state = self.CLOSED
+            self._outcomes.clear()
+            self.failures = 0
+            return
+        self._record(False)
+
+    def abandon(self) -> None:
+        """调用被取消（既不算成功也不算失败），释放半开状态的探测名额"""
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._probing = False
+        self._record(True)
+        if self.state == self.HALF_OPEN or (
+                len(self._outcomes) >= self.min_calls
+                and self.failures >= self.failure_ratio * len(self._outcomes)):
+            self.state = self.OPEN
+            self.opened_at = self._clock()
+
+
+class RetryBudget:
+    """重试预算：每个请求存入 ratio 个令牌，每次重试消耗一个；另外每秒补充 min_per_second 个。
+    上游整体故障时重试量被限制在请求量的固定比例内，避免重试放大流量"""
+
+    def __init__(self, ratio: float, min_per_second: float, clock=time.monotonic):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max(min_per_second, 1.0) * 10
+        self._clock = clock
+        self._tokens = self.max_tokens
+        self._updated = clock()
+        self.exhausted = 0
+
+    def _refill(self, amount: float) -> None:
+        self._tokens = min(self.max_tokens, self._tokens + amount)
+
+    def record_request(self) -> None:
+        now = self._clock()
+        self._refill(self.ratio + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    def try_spend(self) -> bool:
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        self.exhausted += 1
+        return False
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """指数退避 + 全抖动"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class ResilientUpstream:
+    """包装上游客户端：整体截止时间、带预算的抖动重试、熔断器"""
+
+    def __init__(self, client: UpstreamClient, settings: Optional[ResilienceSettings] = None):
+        self.client = client
+        self.settings = settings or ResilienceSettings.from_env()
+        self.breaker = CircuitBreaker(self.settings.failure_ratio, self.settings.window,
+                                      self.settings.min_calls, self.settings.reset_timeout)
+        self.budget = RetryBudget(self.settings.retry_budget_ratio, self.settings.retry_budget_min)
+        self.retries = 0
+
+    async def get(self, path: str) -> httpx.Response:
+        self.budget.record_request()
+        try:
+            return await asyncio.wait_for(self._get_with_retries(path), self.settings.deadline)
+        except asyncio.TimeoutError:
+            raise httpx.TimeoutException("Upstream deadline exceeded")
+
+    async def _get_with_retries(self, path: str) -> httpx.Response:
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                response = await self.client.get(path)
+            except asyncio.CancelledError:
+                self.breaker.abandon()
+                raise
+            except httpx.HTTPError:
+                self.breaker.record_failure()
+                if not self._may_retry(attempt):
+                    raise
+            else:
+                if response.status_code not in RETRYABLE_STATUS:
+                    self.breaker.record_success()
+                    return response
+                self.breaker.record_failure()
+                if not self._may_retry(attempt):
+                    return response
+
+            await asyncio.sleep(backoff_delay(attempt, self.settings.retry_base_delay, self.settings.retry_max_delay))
+            attempt += 1
+            self.retries += 1
+
+    def _may_retry(self, attempt: int) -> bool:
+        return (attempt < self.settings.retries
+                and self.breaker.state == CircuitBreaker.CLOSED
+                and self.budget.try_spend())
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "breaker_open": int(self.breaker.state != CircuitBreaker.CLOSED),
+            "breaker_window_failures": self.breaker.failures,
+            "breaker_rejected": self.breaker.rejected,
+            "retries": self.retries,
+            "retry_budget_exhausted": self.budget.exhausted,
+        }
+
+    def pool_stats(self) -> Dict[str, int]:
+        return self.client.pool_stats()
+
+    async def aclose(self) -> None:
+        await self.client.aclose()
@@ -0,0 +1,44 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterator
+
+
+class SingleFlight:
+    """同一个键的并发调用只执行一次。
+
+    调用在独立的任务中运行，调用方只通过 shield() 等待：某个等待者（包括发起者）被取消时
+    任务继续执行，其他等待者照常拿到结果；任务结束后自动移除"""
+
+    def __init__(self):
+        self._tasks: Dict[Hashable, asyncio.Task] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._tasks
+
+    def __len__(self) -> int:
+        return len(self._tasks)
+
+    def __iter__(self) -> Iterator[Hashable]:
+        return iter(list(self._tasks))
+
+    def start(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        """返回该键正在进行的任务，没有时用 call 启动一个"""
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._tasks[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        return task
+
+    async def wait(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        return await asyncio.shield(self.start(key, call))
+
+    def forget(self, key: Hashable) -> None:
+        """不再把新的调用合并到正在进行的任务上（任务本身继续执行）"""
+        self._tasks.pop(key, None)
+
+    def _finished(self, key: Hashable, task: asyncio.Task) -> None:
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # 所有等待者都已取消时，避免出现 "exception was never retrieved" 警告
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,206 @@
+import asyncio
+import gzip
+import os
+import sys
+from collections import OrderedDict
+from concurrent.futures import Executor
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import HTTPException, Request, Response
+
+from http_cache import body_etag, choose_encoding, encoded_etag, etag_matches
+from single_flight import SingleFlight
+
+# 压缩引擎（仓库中的 压缩代码/compress_advanced.py），不可用时原样返回文件
+COMPRESSOR_DIR = Path(__file__).resolve().parent.parent.parent / "压缩代码"
+if str(COMPRESSOR_DIR) not in sys.path:
+    sys.path.append(str(COMPRESSOR_DIR))
+try:
+    from compress_advanced import AdvancedCodeCompressor
+except ImportError:
+    AdvancedCodeCompressor = None
+
+# 允许访问的文件类型（目录中的 .py、.json 等不对外提供）
+STATIC_MEDIA_TYPES = {
+    ".html": "text/html; charset=utf-8",
+    ".htm": "text/html; charset=utf-8",
+    ".css": "text/css; charset=utf-8",
+    ".js": "application/javascript; charset=utf-8",
+    ".svg": "image/svg+xml",
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".gif": "image/gif",
+    ".webp": "image/webp",
+    ".ico": "image/x-icon",
+    ".woff": "font/woff",
+    ".woff2": "font/woff2",
+}
+MINIFY_SUFFIXES = (".html", ".css", ".js")
+GZIP_SUFFIXES = (".html", ".htm", ".css", ".js", ".svg")
+
+# 缓存键：(相对路径, 修改时间, 大小)
+StaticKey = Tuple[str, int, int]
+
+
+def load_compressor() -> Optional[Any]:
+    """按 压缩代码/compress_config.json 创建压缩器；引擎不可用时返回 None"""
+    if AdvancedCodeCompressor is None:
+        return None
+    return AdvancedCodeCompressor(str(COMPRESSOR_DIR / "compress_config.json"))
+
+
+class StaticEntry:
+    """一个文件压缩后的内容、预先 gzip 的内容和 ETag"""
+
+    __slots__ = ("body", "gzip_body", "etag", "media_type", "minified")
+
+    def __init__(self, body: bytes, gzip_body: Optional[bytes], media_type: str, minified: bool):
+        self.body = body
+        self.gzip_body = gzip_body
+        self.media_type = media_type
+        self.minified = minified
+        self.etag = body_etag(body)
+
+    @property
+    def size(self) -> int:
+        return len(self.body) + len(self.gzip_body or b"")
+
+
+class MinifyingStaticFiles:
+    """静态文件：HTML/CSS/JS 第一次请求时压缩，结果连同 gzip 内容按 (路径, 修改时间) 缓存在内存中，
+    总大小按 LRU 淘汰；压缩和 gzip 在线程池中进行，不阻塞事件循环，同一文件的并发未命中只压缩一次"""
+
+    def __init__(self, root: str, executor: Executor, compressor: Optional[Any] = None,
+                 max_bytes: int = 32 * 1024 * 1024, gzip_min_size: int = 1024,
+                 cache_control: str = "no-cache"):
+        self.root = Path(root).resolve()
+        self.executor = executor
+        self.compressor = compressor
+        self.max_bytes = max_bytes
+        self.gzip_min_size = gzip_min_size
+        self.cache_control = cache_control
+        # 相对路径 -> (修改时间, 大小, 内容)；文件变化后旧内容在下次请求时被替换
+        self._entries: "OrderedDict[str, Tuple[int, int, StaticEntry]]" = OrderedDict()
+        self._inflight = SingleFlight()
+        self._bytes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.not_modified = 0
+        self.evictions = 0
+        self.minify_errors = 0
+
+    def resolve(self, path: str) -> Path:
+        """把请求路径解析为根目录中的文件；不允许的路径和类型返回 404"""
+        parts = [part for part in path.split("/") if part]
+        if not parts or any(part.startswith(".") for part in parts):
+            raise HTTPException(status_code=404, detail="Not found")
+        file_path = self.root.joinpath(*parts)
+        if file_path.suffix.lower() not in STATIC_MEDIA_TYPES:
+            raise HTTPException(status_code=404, detail="Not found")
+        try:
+            file_path.resolve().relative_to(self.root)
+        except ValueError:
+            raise HTTPException(status_code=404, detail="Not found")
+        return file_path
+
+    async def get(self, path: str) -> StaticEntry:
+        file_path = self.resolve(path)
+        try:
+            stat = file_path.stat()
+        except OSError:
+            raise HTTPException(status_code=404, detail="Not found")
+        if not file_path.is_file():
+            raise HTTPException(status_code=404, detail="Not found")
+        rel = file_path.relative_to(self.root).as_posix()
+
+        cached = self._entries.get(rel)
+        if cached is not None and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+            self._entries.move_to_end(rel)
+            self.hits += 1
+            return cached[2]
+
+        key = (rel, stat.st_mtime_ns, stat.st_size)
+        if key in self._inflight:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+        return await self._inflight.wait(key, lambda: self._load_and_store(key, file_path))
+
+    async def _load_and_store(self, key: StaticKey, file_path: Path) -> StaticEntry:
+        entry = await asyncio.get_running_loop().run_in_executor(self.executor, self._load, file_path)
+        self._store(*key, entry)
+        return entry
+
+    def _load(self, file_path: Path) -> StaticEntry:
+        """在线程池中执行：读取、压缩、gzip"""
+        suffix = file_path.suffix.lower()
+        body = None
+        if self.compressor is not None and suffix in MINIFY_SUFFIXES:
+            try:
+                content = self.compressor.compress_content(file_path)[0]
+            except Exception:
+                # 压缩失败时返回原文件
+                content = None
+                self.minify_errors += 1
+            if content is not None:
+                body = content.encode("utf-8")
+        minified = body is not None
+        if body is None:
+            body = file_path.read_bytes()
+
+        gzip_body = None
+        if suffix in GZIP_SUFFIXES and len(body) >= self.gzip_min_size:
+            gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(gzip_body) >= len(body):
+                gzip_body = None
+        return StaticEntry(body, gzip_body, STATIC_MEDIA_TYPES[suffix], minified)
+
+    def _store(self, rel: str, mtime_ns: int, size: int, entry: StaticEntry) -> None:
+        old = self._entries.pop(rel, None)
+        if old is not None:
+            self._bytes -= old[2].size
+        if entry.size > self.max_bytes:
+            return
+        self._entries[rel] = (mtime_ns, size, entry)
+        self._bytes += entry.size
+        while self._bytes > self.max_bytes:
+            _, (_, _, evicted) = self._entries.popitem(last=False)
+            self._bytes -= evicted.size
+            self.evictions += 1
+
+    async def serve(self, request: Request, path: str) -> Response:
+        entry = await self.get(path)
+        encoding = choose_encoding(request.headers.get("accept-encoding"), ("gzip",)) if entry.gzip_body else None
+        etag = encoded_etag(entry.etag, encoding)
+        headers = {"ETag": etag, "Cache-Control": self.cache_control}
+        if entry.gzip_body is not None:
+            headers["Vary"] = "Accept-Encoding"
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+            return Response(content=entry.gzip_body, media_type=entry.media_type, headers=headers)
+        return Response(content=entry.body, media_type=entry.media_type, headers=headers)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "inflight": len(self._inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "not_modified": self.not_modified,
+            "evictions": self.evictions,
+            "minify_errors": self.minify_errors,
+        }
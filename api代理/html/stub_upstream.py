@@ -0,0 +1,72 @@
+"""
+本地上游桩服务：模拟 jsonplaceholder 的 /posts/{id}，用于压测和故障测试代理，不依赖外网
+
+运行：uvicorn stub_upstream:app --port 9001
+可选环境变量（也可运行时通过 PUT /_faults 修改）：
+    STUB_LATENCY_MS   每个请求的模拟延迟（毫秒）
+    STUB_ERROR_RATE   返回 STUB_ERROR_STATUS（默认 503）的比例，0~1
+    STUB_HANG_RATE    挂起 STUB_HANG_MS 毫秒再返回的比例，0~1，用于触发超时
+"""
+import asyncio
+import os
+import random
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+
+class Faults(BaseModel):
+    latency_ms: float = float(os.environ.get("STUB_LATENCY_MS", "0"))
+    error_rate: float = float(os.environ.get("STUB_ERROR_RATE", "0"))
+    error_status: int = int(os.environ.get("STUB_ERROR_STATUS", "503"))
+    hang_rate: float = float(os.environ.get("STUB_HANG_RATE", "0"))
+    hang_ms: float = float(os.environ.get("STUB_HANG_MS", "30000"))
+
+
+class FaultsUpdate(BaseModel):
+    latency_ms: Optional[float] = None
+    error_rate: Optional[float] = None
+    error_status: Optional[int] = None
+    hang_rate: Optional[float] = None
+    hang_ms: Optional[float] = None
+
+
+app = FastAPI()
+app.state.faults = Faults()
+app.state.requests = 0
+
+
+def make_post(item_id: int):
+    return {
+        "userId": (item_id - 1) // 10 + 1,
+        "id": item_id,
+        "title": f"stub post {item_id}",
+        "body": "lorem ipsum dolor sit amet " * 8,
+    }
+
+
+@app.get("/posts/{item_id}")
+async def get_post(item_id: int):
+    faults: Faults = app.state.faults
+    app.state.requests += 1
+    if faults.latency_ms:
+        await asyncio.sleep(faults.latency_ms / 1000)
+    if faults.hang_rate and random.random() < faults.hang_rate:
+        await asyncio.sleep(faults.hang_ms / 1000)
+    if faults.error_rate and random.random() < faults.error_rate:
+        raise HTTPException(status_code=faults.error_status, detail="Injected fault")
+    if not 1 <= item_id <= 100:
+        raise HTTPException(status_code=404, detail="Not found")
+    return make_post(item_id)
+
+
+@app.get("/_faults")
+async def get_faults():
+    return {"faults": app.state.faults, "requests": app.state.requests}
+
+
+@app.put("/_faults")
+async def update_faults(update: FaultsUpdate):
+    app.state.faults = app.state.faults.model_copy(update=update.model_dump(exclude_none=True))
+    return app.state.faults
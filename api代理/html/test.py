@@ -1,47 +1,231 @@
-from fastapi import FastAPI, HTTPException
-import requests
-from typing import Dict, Any
+import asyncio
+import hmac
+import os
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
 
-app = FastAPI()
+import httpx
+from fastapi import Depends, FastAPI, HTTPException, Request, Response
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from typing import Dict, Any, Optional, Set
 
-# 模拟管理配置（实际用数据库存储，例如SQLAlchemy模型）
-api_configs = {
+from batch import BATCH_FORMATS, parse_batch_ids, stream_batch
+from cache import ResponseCache
+from config_store import ConfigStore
+from http_cache import CompressedBodyCache
+from metrics import MetricsMiddleware, ProxyMetrics, gauge_lines
+from resilience import CircuitOpenError, ResilientUpstream
+from static_files import MinifyingStaticFiles, load_compressor
+from transform import ResponseTransformer, dumps
+from upstream import UpstreamClient
+
+# 配置中可用 cache_ttl 指定响应缓存时间（秒），未指定时用这个默认值，0 表示不缓存
+DEFAULT_CACHE_TTL = float(os.environ.get("CACHE_DEFAULT_TTL", "60"))
+# 过期后仍可返回旧值（同时后台刷新）的时间（秒），配置中可用 stale_ttl 覆盖，0 表示不返回旧值
+DEFAULT_STALE_TTL = float(os.environ.get("CACHE_STALE_TTL", "300"))
+
+# 配置文件（db.json 格式），修改后自动重新加载
+API_CONFIG_FILE = os.environ.get("API_CONFIG_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "api_configs.json"))
+API_CONFIG_POLL_INTERVAL = float(os.environ.get("API_CONFIG_POLL_INTERVAL", "1"))
+
+# 管理接口（查看、修改配置）需要请求头 X-Admin-Token 与之一致；未设置时管理接口关闭（返回 404）
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+
+# 批量接口：单次最多条目数、单个批次同时进行的上游请求数
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "500"))
+BATCH_CONCURRENCY = int(os.environ.get("BATCH_CONCURRENCY", "10"))
+
+# 响应的 Cache-Control，配置中可用 cache_control 覆盖；默认要求客户端每次用 ETag 重新验证（命中时返回 304）
+DEFAULT_CACHE_CONTROL = os.environ.get("DEFAULT_CACHE_CONTROL", "no-cache")
+# 不小于这个大小（字节）的响应按 Accept-Encoding 压缩（brotli 优先），压缩结果按内容缓存
+COMPRESS_MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "1024"))
+COMPRESS_CACHE_MAX_BYTES = int(os.environ.get("COMPRESS_CACHE_MAX_BYTES", str(16 * 1024 * 1024)))
+
+# 静态页面：第一次请求时压缩，结果缓存在内存中；STATIC_MINIFY=0 时原样返回
+STATIC_ROOT = os.environ.get("STATIC_ROOT", os.path.dirname(os.path.abspath(__file__)))
+STATIC_MINIFY = os.environ.get("STATIC_MINIFY", "1").lower() in ("1", "true", "yes", "on")
+STATIC_MINIFY_WORKERS = int(os.environ.get("STATIC_MINIFY_WORKERS", "2"))
+STATIC_CACHE_MAX_BYTES = int(os.environ.get("STATIC_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+STATIC_CACHE_CONTROL = os.environ.get("STATIC_CACHE_CONTROL", "no-cache")
+
+# 指标：METRICS_ENABLED=0 关闭（/metrics 返回 404，请求路径上不做任何统计）
+metrics = ProxyMetrics(enabled=os.environ.get("METRICS_ENABLED", "1").lower() in ("1", "true", "yes", "on"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 整个应用共用一个上游连接池，启动时创建，关闭时释放；外层加超时、重试和熔断
+    app.state.upstream = ResilientUpstream(UpstreamClient())
+    app.state.cache = ResponseCache(max_entries=int(os.environ.get("CACHE_MAX_ENTRIES", "10000")))
+    app.state.compressed = CompressedBodyCache(max_bytes=COMPRESS_CACHE_MAX_BYTES, min_size=COMPRESS_MIN_SIZE)
+
+    # 配置只在启动和文件变化时读盘，请求处理只读内存快照
+    app.state.configs = ConfigStore(API_CONFIG_FILE, DEFAULT_API_CONFIGS, API_CONFIG_POLL_INTERVAL)
+    app.state.configs.load()
+
+    async def on_config_change(names: Set[str]) -> None:
+        for name in names:
+            app.state.cache.invalidate(name)
+
+    watcher = asyncio.create_task(app.state.configs.watch(on_config_change))
+
+    # 压缩静态文件是 CPU 密集操作，放在独立的线程池中，不占用事件循环
+    static_executor = ThreadPoolExecutor(max_workers=STATIC_MINIFY_WORKERS, thread_name_prefix="static-minify")
+    app.state.static = MinifyingStaticFiles(STATIC_ROOT, static_executor,
+                                            load_compressor() if STATIC_MINIFY else None,
+                                            max_bytes=STATIC_CACHE_MAX_BYTES, cache_control=STATIC_CACHE_CONTROL)
+
+    def collect_state(lines):
+        gauge_lines(lines, "proxy_upstream_pool_connections", "Upstream connection pool usage",
+                    app.state.upstream.pool_stats(), "state")
+        gauge_lines(lines, "proxy_upstream_resilience", "Circuit breaker and retry counters",
+                    app.state.upstream.stats(), "stat")
+        stats = app.state.cache.stats()
+        gauge_lines(lines, "proxy_cache", "Response cache counters",
+                    {k: v for k, v in stats.items() if k != "hit_ratio"}, "stat")
+        gauge_lines(lines, "proxy_compressed_cache", "Compressed response body cache counters",
+                    app.state.compressed.stats(), "stat")
+        gauge_lines(lines, "proxy_static_cache", "Minified static file cache counters",
+                    app.state.static.stats(), "stat")
+
+    metrics.add_collector(collect_state)
+    yield
+    metrics.remove_collector(collect_state)
+    watcher.cancel()
+    static_executor.shutdown(wait=False, cancel_futures=True)
+    await app.state.upstream.aclose()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware, metrics=metrics)
+
+# 默认配置：配置文件不存在时使用（第一次通过接口修改时写入文件）
+DEFAULT_API_CONFIGS = {
     "post_api": {
         "enabled": True,
         "required_fields": ["id"],  # 必填字段（验证外部响应）
-        "display_fields": ["userId", "id", "title", "custom_field"]  # 只显示这些字段
+        "display_fields": ["userId", "id", "title", "custom_field"],  # 只显示这些字段
+        "custom_fields": {"custom_field": "This is my custom value", "another_custom": 42}  # 添加的自定义字段
     }
 }
 
-def apply_config(data: Dict[str, Any], config: Dict[str, Any]) -> Dict[str, Any]:
-    if not config["enabled"]:
-        raise HTTPException(status_code=503, detail="API is disabled")
-    
-    # 验证必填字段
-    for field in config["required_fields"]:
-        if field not in data:
-            raise HTTPException(status_code=400, detail=f"Missing required field: {field}")
-    
-    # 添加自定义字段
-    data["custom_field"] = "This is my custom value"
-    data["another_custom"] = 42
-    
-    # 过滤显示字段
-    filtered_data = {k: v for k, v in data.items() if k in config["display_fields"]}
-    return filtered_data
+def require_admin(request: Request) -> None:
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    token = request.headers.get("x-admin-token", "")
+    if not hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
 
-@app.get("/new_api/{item_id}")
-def get_item(item_id: int):
-    # 从外部API获取
-    response = requests.get(f"https://jsonplaceholder.typicode.com/posts/{item_id}")
+async def set_api_config(app: FastAPI, name: str, config: Dict[str, Any]) -> None:
+    """更新配置（写回配置文件、替换快照）并清除该配置下的缓存"""
+    for changed in await app.state.configs.put(name, config):
+        app.state.cache.invalidate(changed)
+
+async def fetch_item(upstream: ResilientUpstream, name: str, item_id: int, transformer: ResponseTransformer) -> bytes:
+    # 从外部API获取（共享连接池，不占用线程池）
+    try:
+        with metrics.phase(name, "upstream"):
+            response = await upstream.get(f"/posts/{item_id}")
+    except CircuitOpenError:
+        metrics.upstream_status(name, "circuit_open")
+        raise HTTPException(status_code=503, detail="External API unavailable (circuit open)")
+    except httpx.TimeoutException:
+        metrics.upstream_status(name, "timeout")
+        raise HTTPException(status_code=504, detail="External API timeout")
+    except httpx.HTTPError:
+        metrics.upstream_status(name, "error")
+        raise HTTPException(status_code=502, detail="External API unreachable")
+    metrics.upstream_status(name, str(response.status_code))
     if response.status_code != 200:
         raise HTTPException(status_code=response.status_code, detail="External API error")
     
-    data = response.json()
-    
-    # 应用配置
-    config = api_configs.get("post_api", {})
-    return apply_config(data, config)
+    # 应用配置（直接处理原始字节）
+    with metrics.phase(name, "transform"):
+        data = transformer.transform_raw(response.content)
+    with metrics.phase(name, "serialize"):
+        return dumps(data)
+
+async def load_item(app: FastAPI, name: str, item_id: int) -> bytes:
+    """经过响应缓存获取一条转换后的响应体"""
+    snapshot = app.state.configs.snapshot
+    config = snapshot.configs.get(name)
+    if config is None:
+        raise HTTPException(status_code=404, detail="API config not found")
+    transformer = snapshot.transformers[name]
+    transformer.check_enabled()
+    cache: ResponseCache = app.state.cache
+    return await cache.get_or_fetch(
+        (name, item_id),
+        config.get("cache_ttl", DEFAULT_CACHE_TTL),
+        lambda: fetch_item(app.state.upstream, name, item_id, transformer),
+        config.get("stale_ttl", DEFAULT_STALE_TTL),
+    )
+
+# 批量路由必须注册在 /new_api/{item_id} 之前
+@app.get("/new_api/batch")
+async def get_items(request: Request,
+                    ids: Optional[str] = None,
+                    start: Optional[int] = None,
+                    end: Optional[int] = None,
+                    format: str = "ndjson"):
+    if format not in BATCH_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of: {', '.join(BATCH_FORMATS)}")
+    item_ids = parse_batch_ids(ids, start, end, BATCH_MAX_ITEMS)
+    transformer = request.app.state.configs.snapshot.transformers.get("post_api")
+    if transformer is None:
+        raise HTTPException(status_code=404, detail="API config not found")
+    transformer.check_enabled()
+
+    return StreamingResponse(
+        stream_batch(item_ids, lambda item_id: load_item(request.app, "post_api", item_id), BATCH_CONCURRENCY, format),
+        media_type=BATCH_FORMATS[format],
+    )
+
+@app.get("/new_api/{item_id}")
+async def get_item(item_id: int, request: Request):
+    body = await load_item(request.app, "post_api", item_id)
+    config = request.app.state.configs.snapshot.configs.get("post_api", {})
+    return request.app.state.compressed.respond(
+        request, body, "application/json", config.get("cache_control", DEFAULT_CACHE_CONTROL))
+
+@app.get("/admin/configs", dependencies=[Depends(require_admin)])
+async def list_configs(request: Request):
+    snapshot = request.app.state.configs.snapshot
+    return {"version": snapshot.version, "configs": dict(snapshot.configs)}
+
+@app.put("/admin/configs/{name}", dependencies=[Depends(require_admin)])
+async def update_config(name: str, config: Dict[str, Any], request: Request):
+    await set_api_config(request.app, name, config)
+    return {"name": name, "config": request.app.state.configs.snapshot.configs[name]}
+
+@app.get("/cache/stats")
+async def cache_stats(request: Request):
+    return request.app.state.cache.stats()
+
+@app.get("/static/{path:path}")
+async def get_static(path: str, request: Request):
+    return await request.app.state.static.serve(request, path)
+
+@app.get("/metrics")
+async def get_metrics():
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics disabled")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
 
-# 运行：uvicorn thisfile:app --reload
-# 测试：访问 http://localhost:8000/new_api/1，应该返回修改后的JSON
\ No newline at end of file
+# 运行：uvicorn test:app --reload
+# 上游连接池可通过环境变量配置：UPSTREAM_BASE_URL、UPSTREAM_MAX_CONNECTIONS、UPSTREAM_MAX_KEEPALIVE、
+#   UPSTREAM_CONNECT_TIMEOUT、UPSTREAM_READ_TIMEOUT、UPSTREAM_POOL_TIMEOUT、UPSTREAM_HTTP2
+# 响应缓存：CACHE_MAX_ENTRIES（最多缓存条数）、CACHE_DEFAULT_TTL（默认缓存秒数）、CACHE_STALE_TTL；命中率见 /cache/stats
+# 上游容错：UPSTREAM_DEADLINE、UPSTREAM_RETRIES、UPSTREAM_RETRY_BASE_DELAY、UPSTREAM_RETRY_MAX_DELAY、
+#   UPSTREAM_RETRY_BUDGET_RATIO、UPSTREAM_RETRY_BUDGET_MIN、
+#   BREAKER_FAILURE_RATIO、BREAKER_WINDOW、BREAKER_MIN_CALLS、BREAKER_RESET_TIMEOUT
+# 批量接口：BATCH_MAX_ITEMS、BATCH_CONCURRENCY
+# 指标：/metrics（Prometheus 文本格式），METRICS_ENABLED=0 关闭
+# 配置文件：API_CONFIG_FILE（默认 api_configs.json）、API_CONFIG_POLL_INTERVAL（检查间隔秒数），直接编辑文件即可生效；
+#   设置 ADMIN_TOKEN 后也可通过 GET/PUT /admin/configs（请求头 X-Admin-Token）查看和修改
+# 测试：访问 http://localhost:8000/new_api/1，应该返回修改后的JSON
+#   响应带 ETag（If-None-Match 命中时返回 304）和 Cache-Control（配置项 cache_control，默认 DEFAULT_CACHE_CONTROL）；
+#   COMPRESS_MIN_SIZE 以上的响应按 Accept-Encoding 使用 brotli/gzip 压缩，压缩结果缓存（COMPRESS_CACHE_MAX_BYTES）
+# 静态页面：http://localhost:8000/static/fanyi.html（HTML/CSS/JS 压缩后返回，支持 gzip、ETag 和 304）；
+#   STATIC_ROOT、STATIC_MINIFY、STATIC_MINIFY_WORKERS、STATIC_CACHE_MAX_BYTES、STATIC_CACHE_CONTROL
+# 批量：http://localhost:8000/new_api/batch?ids=1,2,3 或 ?start=1&end=50&format=json
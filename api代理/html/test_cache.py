@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from cache import ResponseCache
+
+
+def test_leader_cancel_does_not_fail_coalesced_waiters():
+    async def scenario():
+        cache = ResponseCache()
+        calls = 0
+        release = asyncio.Event()
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return b"value"
+
+        leader = asyncio.ensure_future(cache.get_or_fetch(("cfg", 1), 60, fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.ensure_future(cache.get_or_fetch(("cfg", 1), 60, fetch))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        await asyncio.sleep(0)
+        release.set()
+
+        assert await follower == b"value"
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        # 取消发起者后上游请求仍完成并写入缓存
+        assert calls == 1
+        assert await cache.get_or_fetch(("cfg", 1), 60, fetch) == b"value"
+        assert calls == 1
+        assert cache.stats()["inflight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_errors_are_shared_and_not_cached():
+    async def scenario():
+        cache = ResponseCache()
+        calls = 0
+
+        async def fetch():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0)
+            raise RuntimeError("upstream down")
+
+        results = await asyncio.gather(*(cache.get_or_fetch(("cfg", 1), 60, fetch) for _ in range(3)),
+                                       return_exceptions=True)
+        assert calls == 1
+        assert all(isinstance(result, RuntimeError) for result in results)
+        with pytest.raises(RuntimeError):
+            await cache.get_or_fetch(("cfg", 1), 60, fetch)
+        assert calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_stale_value_refreshes_in_background():
+    async def scenario():
+        now = [0.0]
+        cache = ResponseCache(clock=lambda: now[0])
+        values = iter([b"old", b"new"])
+
+        async def fetch():
+            return next(values)
+
+        assert await cache.get_or_fetch(("cfg", 1), 10, fetch, stale_ttl=10) == b"old"
+        now[0] = 15
+        assert await cache.get_or_fetch(("cfg", 1), 10, fetch, stale_ttl=10) == b"old"
+        await asyncio.sleep(0)
+        assert await cache.get_or_fetch(("cfg", 1), 10, fetch, stale_ttl=10) == b"new"
+
+    asyncio.run(scenario())
@@ -0,0 +1,53 @@
+import asyncio
+import json
+
+from config_store import ConfigStore
+
+NODE_RECORD = {
+    "id": "3b29dd9c-d2e0-4763-bbff-82295f4ee565",
+    "name": "fanyi",
+    "externalApiUrl": "https://uapis.cn/api/fanyi?text={{query.text}}",
+    "isEnabled": True,
+    "customFields": "{\n  \"source\": \"MyGateway\"\n}",
+    "visibleFields": "",
+    "requiredFields": "code,result",
+}
+
+
+def test_put_keeps_node_records_in_their_own_format(tmp_path):
+    path = tmp_path / "db.json"
+    other = dict(NODE_RECORD, id="other", name="other")
+    path.write_text(json.dumps({"configs": [NODE_RECORD, other], "users": [1]}), encoding="utf-8")
+    store = ConfigStore(str(path))
+    store.load()
+
+    config = dict(store.snapshot.configs["fanyi"], enabled=False, display_fields=["code", "result"], cache_ttl=5)
+    assert asyncio.run(store.put("fanyi", config)) == {"fanyi"}
+
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["users"] == [1]
+    assert data["configs"][1] == other
+    record = data["configs"][0]
+    assert record["id"] == NODE_RECORD["id"]
+    assert record["externalApiUrl"] == NODE_RECORD["externalApiUrl"]
+    assert record["isEnabled"] is False
+    assert record["requiredFields"] == "code,result"
+    assert record["visibleFields"] == "code,result"
+    assert json.loads(record["customFields"]) == {"source": "MyGateway"}
+    assert record["cache_ttl"] == 5
+    assert "enabled" not in record and "display_fields" not in record
+    assert store.snapshot.configs["fanyi"]["display_fields"] == ["code", "result", "source"]
+
+
+def test_missing_file_is_only_created_by_put(tmp_path):
+    path = tmp_path / "api_configs.json"
+    store = ConfigStore(str(path), {"post_api": {"enabled": True}})
+    store.load()
+    assert store.snapshot.configs["post_api"]["enabled"] is True
+    assert store.reload_if_changed() == set()
+    assert not path.exists()
+
+    asyncio.run(store.put("post_api", {"enabled": False}))
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data == {"configs": [{"name": "post_api", "enabled": False}]}
+    assert store.reload_if_changed() == set()
@@ -0,0 +1,24 @@
+import os
+
+from http_cache import ENTRY_OVERHEAD, CompressedBodyCache
+
+
+def test_incompressible_entries_are_evicted():
+    cache = CompressedBodyCache(max_bytes=10 * ENTRY_OVERHEAD)
+    for i in range(1000):
+        body = os.urandom(2048)
+        assert cache.get(f'"etag-{i}"', body, "gzip") is None
+    stats = cache.stats()
+    # 不值得压缩的条目也占用空间，不能无限增长
+    assert stats["size"] < 10
+    assert stats["bytes"] <= stats["max_bytes"]
+    assert stats["evictions"] == 1000 - stats["size"]
+
+
+def test_compressed_entries_are_reused():
+    cache = CompressedBodyCache()
+    body = b"a" * 4096
+    compressed = cache.get('"etag"', body, "gzip")
+    assert compressed is not None and len(compressed) < len(body)
+    assert cache.get('"etag"', body, "gzip") is compressed
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+from static_files import MinifyingStaticFiles
+
+
+def test_leader_cancel_does_not_fail_coalesced_waiters(tmp_path):
+    (tmp_path / "app.css").write_text("body { color: red; }")
+    release = threading.Event()
+
+    async def scenario():
+        with ThreadPoolExecutor(1) as executor:
+            static = MinifyingStaticFiles(str(tmp_path), executor)
+            load = static._load
+
+            def slow_load(file_path):
+                release.wait()
+                return load(file_path)
+
+            static._load = slow_load
+
+            leader = asyncio.ensure_future(static.get("app.css"))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(static.get("app.css"))
+            await asyncio.sleep(0)
+
+            leader.cancel()
+            await asyncio.sleep(0)
+            release.set()
+
+            entry = await follower
+            assert entry.body == b"body { color: red; }"
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+            # 取消发起者后加载仍完成并写入缓存
+            assert await static.get("app.css") is entry
+            assert static.stats()["misses"] == 1
+            assert static.stats()["coalesced"] == 1
+            assert static.stats()["inflight"] == 0
+
+    asyncio.run(scenario())
+
+
+def test_text_files_are_not_served(tmp_path):
+    (tmp_path / "requirements.txt").write_text("fastapi\n")
+    with ThreadPoolExecutor(1) as executor:
+        static = MinifyingStaticFiles(str(tmp_path), executor)
+        with pytest.raises(HTTPException) as excinfo:
+            static.resolve("requirements.txt")
+    assert excinfo.value.status_code == 404
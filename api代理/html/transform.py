@@ -0,0 +1,80 @@
+import json
+from typing import Any, Dict, Optional, Tuple
+
+from fastapi import HTTPException
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def loads(raw: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+
+def dumps(data: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class ResponseTransformer:
+    """由一条 api_configs 配置编译而成的响应转换器：配置加载或更新时构建一次，
+    每个请求只做必填检查、按显示字段直接投影、注入预先算好的自定义字段"""
+
+    def __init__(self, config: Dict[str, Any]):
+        self.enabled = config.get("enabled", True)
+        self.required_fields: Tuple[str, ...] = tuple(config.get("required_fields", ()))
+
+        custom_fields = config.get("custom_fields") or {}
+        display_fields = config.get("display_fields")
+        if display_fields is None:
+            # 未指定显示字段：保留上游全部字段，追加全部自定义字段
+            self.custom_values: Dict[str, Any] = dict(custom_fields)
+            self.projected_fields: Optional[Tuple[str, ...]] = None
+        else:
+            # 自定义字段只有出现在显示字段里才会输出，且覆盖上游的同名字段
+            display_fields = list(dict.fromkeys(display_fields))
+            self.custom_values = {k: custom_fields[k] for k in display_fields if k in custom_fields}
+            self.projected_fields = tuple(k for k in display_fields if k not in self.custom_values)
+
+    def check_enabled(self) -> None:
+        if not self.enabled:
+            raise HTTPException(status_code=503, detail="API is disabled")
+
+    def transform_item(self, item: Any) -> Dict[str, Any]:
+        if not isinstance(item, dict):
+            raise HTTPException(status_code=502, detail="Unexpected upstream payload")
+        for field in self.required_fields:
+            if field not in item:
+                raise HTTPException(status_code=400, detail=f"Missing required field: {field}")
+
+        if self.projected_fields is None:
+            result = dict(item)
+        else:
+            result = {k: item[k] for k in self.projected_fields if k in item}
+        result.update(self.custom_values)
+        return result
+
+    def transform(self, data: Any) -> Any:
+        """转换单个对象，或逐项转换列表"""
+        self.check_enabled()
+        if isinstance(data, list):
+            return [self.transform_item(item) for item in data]
+        return self.transform_item(data)
+
+    def transform_raw(self, raw: bytes) -> Any:
+        """解析上游原始 JSON 字节并转换"""
+        try:
+            data = loads(raw)
+        except ValueError:
+            raise HTTPException(status_code=502, detail="Invalid upstream JSON")
+        return self.transform(data)
+
+    def transform_bytes(self, raw: bytes) -> bytes:
+        """直接处理上游原始 JSON 字节，返回序列化后的响应体"""
+        return dumps(self.transform_raw(raw))
+
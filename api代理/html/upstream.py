@@ -0,0 +1,99 @@
+import os
+import importlib.util
+from typing import Dict, Optional
+
+import httpx
+
+# 外部API地址（可用环境变量指向本地桩服务做压测）
+DEFAULT_UPSTREAM_BASE_URL = "https://jsonplaceholder.typicode.com"
+
+
+def env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+
+def env_float(name: str, default: float) -> float:
+    return float(os.environ.get(name, default))
+
+
+def env_bool(name: str, default: bool) -> bool:
+    return os.environ.get(name, "1" if default else "0").lower() in ("1", "true", "yes", "on")
+
+
+class UpstreamSettings:
+    """上游连接池设置，默认值可被环境变量覆盖"""
+
+    def __init__(self,
+                 base_url: str = DEFAULT_UPSTREAM_BASE_URL,
+                 max_connections: int = 100,
+                 max_keepalive_connections: int = 20,
+                 keepalive_expiry: float = 30.0,
+                 connect_timeout: float = 5.0,
+                 read_timeout: float = 10.0,
+                 pool_timeout: float = 5.0,
+                 http2: bool = True):
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.pool_timeout = pool_timeout
+        self.http2 = http2
+
+    @classmethod
+    def from_env(cls) -> "UpstreamSettings":
+        return cls(
+            base_url=os.environ.get("UPSTREAM_BASE_URL", DEFAULT_UPSTREAM_BASE_URL),
+            max_connections=env_int("UPSTREAM_MAX_CONNECTIONS", 100),
+            max_keepalive_connections=env_int("UPSTREAM_MAX_KEEPALIVE", 20),
+            keepalive_expiry=env_float("UPSTREAM_KEEPALIVE_EXPIRY", 30.0),
+            connect_timeout=env_float("UPSTREAM_CONNECT_TIMEOUT", 5.0),
+            read_timeout=env_float("UPSTREAM_READ_TIMEOUT", 10.0),
+            pool_timeout=env_float("UPSTREAM_POOL_TIMEOUT", 5.0),
+            http2=env_bool("UPSTREAM_HTTP2", True),
+        )
+
+
+class UpstreamClient:
+    """共享的异步上游客户端：keep-alive 连接池，在应用生命周期内创建和关闭"""
+
+    def __init__(self, settings: Optional[UpstreamSettings] = None):
+        self.settings = settings or UpstreamSettings.from_env()
+
+        # HTTP/2 需要 h2 包，未安装时退回 HTTP/1.1
+        http2 = self.settings.http2 and importlib.util.find_spec("h2") is not None
+
+        self._client = httpx.AsyncClient(
+            base_url=self.settings.base_url,
+            http2=http2,
+            limits=httpx.Limits(
+                max_connections=self.settings.max_connections,
+                max_keepalive_connections=self.settings.max_keepalive_connections,
+                keepalive_expiry=self.settings.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                connect=self.settings.connect_timeout,
+                read=self.settings.read_timeout,
+                write=self.settings.read_timeout,
+                pool=self.settings.pool_timeout,
+            ),
+        )
+
+    async def get(self, path: str) -> httpx.Response:
+        return await self._client.get(path)
+
+    def pool_stats(self) -> Dict[str, int]:
+        """连接池使用情况（读取 httpcore 连接池的状态，仅用于监控）"""
+        pool = getattr(self._client._transport, "_pool", None)
+        connections = list(getattr(pool, "connections", []))
+        idle = sum(1 for connection in connections if connection.is_idle())
+        return {
+            "max": self.settings.max_connections,
+            "open": len(connections),
+            "idle": idle,
+            "active": len(connections) - idle,
+        }
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
@@ -0,0 +1,430 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+压缩器性能基准
+- overhead：测量大量小文件时每个文件的固定开销（配置查找、正则构建、跳过规则匹配）
+- run：生成合成 HTML/CSS/JS 语料，测量各压缩方法和完整 compress_directory 流程的
+  吞吐量（MB/s、文件/s）、峰值内存和压缩率，以 JSON 输出；并用黄金输出哈希检查压缩结果是否变化
+"""
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import hashlib
+import argparse
+import platform
+import tempfile
+import contextlib
+import multiprocessing
+from pathlib import Path
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from compress import CodeCompressor
+from compress_advanced import AdvancedCodeCompressor
+from build_manifest import MANIFEST_FILE
+
+GOLDEN_FILE = Path(__file__).with_name('benchmark_golden.json')
+
+SHAPES = ('tiny', 'bundles', 'strings', 'mixed', 'assets')
+FILE_TYPES = ('html', 'css', 'js')
+
+SMALL_HTML = '<div class="item">\n  <!-- item -->\n  <span> {i} </span>\n  <script> var x = {i}; </script>\n</div>\n'
+SMALL_CSS = '/* item {i} */\n.item-{i} {{\n  color: red;\n  margin: 0 auto;\n}}\n'
+SMALL_JS = '// item {i}\nfunction item{i}(a) {{\n  return a + "{i}";\n}}\n'
+
+WORDS = ('lorem', 'ipsum', 'dolor', 'sit', 'amet', 'price', 'order', 'user', 'data', 'config',
+         'value', 'item', 'list', 'total', 'count', '价格', '订单', '用户', '配置', '数据')
+
+
+# ---------------------------------------------------------------------------
+# 合成语料
+# ---------------------------------------------------------------------------
+
+def _words(rng, count):
+    return ' '.join(rng.choice(WORDS) for _ in range(count))
+
+
+def make_css(rng, rules):
+    """生成CSS：规则、注释、媒体查询"""
+    parts = []
+    for i in range(rules):
+        if i % 7 == 0:
+            parts.append(f'/* section {i}: {_words(rng, 4)} */\n')
+        selector = rng.choice(['.card-{i}', '#main-{i} .title', 'ul.nav-{i} > li a:hover', '.btn-{i}, .btn-{i}:focus'])
+        parts.append(selector.format(i=i) + ' {\n')
+        for _ in range(rng.randint(2, 6)):
+            prop, value = rng.choice([
+                ('color', '#ffffff'), ('margin', '0px auto'), ('padding', '10px 20px'),
+                ('font-family', '"Helvetica Neue", Arial, sans-serif'), ('background', 'url("img/bg.png") no-repeat'),
+                ('width', 'calc(100% - 20px)'), ('transition', 'all 0.3s ease'), ('border', '1px solid #333333'),
+            ])
+            parts.append(f'    {prop}: {value};\n')
+        parts.append('}\n\n')
+        if i % 25 == 24:
+            parts.append('@media (max-width: 768px) {\n    .card { padding: 0 ; }\n}\n')
+    return ''.join(parts)
+
+
+def make_js(rng, functions, strings_per_function=2):
+    """生成JavaScript：函数、注释、字符串、模板字符串、正则表达式"""
+    parts = ['/**\n * generated bundle\n */\n"use strict";\n\n']
+    for i in range(functions):
+        parts.append(f'// function {i}: {_words(rng, 5)}\n')
+        parts.append(f'function handler{i}(event, options) {{\n')
+        parts.append(f'    const url = "https://api.example.com/v1/items/{i}"; // endpoint\n')
+        for j in range(strings_per_function):
+            parts.append(f'    var s{j} = \'{_words(rng, 3)} // not a comment\' + "{_words(rng, 2)}";\n')
+        parts.append(f'    const message = `item ${{event.id}} of ${{options.total}} /* keep */`;\n')
+        parts.append('    if (/^[a-z0-9_\\/-]+$/i.test(options.name)) {\n')
+        parts.append(f'        return event.value / {i + 1} + options.offset; /* ratio */\n')
+        parts.append('    }\n\n')
+        parts.append('    return message.replace(/\\s+/g, " ");\n}\n\n')
+    return ''.join(parts)
+
+
+def make_html(rng, sections):
+    """生成HTML：注释、空白、内联脚本和样式、pre/textarea"""
+    parts = ['<!DOCTYPE html>\n<html lang="zh-CN">\n<head>\n    <meta charset="UTF-8">\n',
+             '    <title>Benchmark page</title>\n',
+             '    <style>\n        .card { color: red; }\n    </style>\n',
+             '    <!--[if IE]><script src="ie.js"></script><![endif]-->\n</head>\n<body>\n']
+    for i in range(sections):
+        parts.append(f'    <!-- section {i} -->\n')
+        parts.append(f'    <div class="card card-{i}" id="card-{i}">\n')
+        parts.append(f'        <h2 class="title">  {_words(rng, 4)}  </h2>\n')
+        parts.append(f'        <p>\n            {_words(rng, 20)}\n        </p>\n')
+        if i % 5 == 0:
+            parts.append(f'        <pre>  line 1\n    line {i}  </pre>\n')
+        if i % 9 == 0:
+            parts.append(f'        <script>\n            window.card{i} = {{ id: {i} }}; // init\n        </script>\n')
+        if i % 13 == 0:
+            parts.append('        <textarea name="note">  keep   me  </textarea>\n')
+        parts.append('    </div>\n')
+    parts.append('</body>\n</html>\n')
+    return ''.join(parts)
+
+
+def generate_corpus(directory, shape, scale=1.0, seed=42):
+    """在目录中生成指定形态的语料，返回生成的文件数量
+
+    - tiny：大量小文件
+    - bundles：少量大文件
+    - strings：字符串字面量密集的JS
+    - mixed：各种大小混合
+    - assets：以字体、图片和不需要压缩的大文件为主，少量页面
+    """
+    rng = random.Random(f'{shape}-{seed}')
+    directory = Path(directory)
+    files = []
+
+    def n(value):
+        return max(1, int(value * scale))
+
+    if shape == 'tiny':
+        for i in range(n(400)):
+            files.append((f'pages/p{i % 20}/page{i}.html', SMALL_HTML.format(i=i)))
+            files.append((f'css/c{i % 20}/style{i}.css', SMALL_CSS.format(i=i)))
+            files.append((f'js/j{i % 20}/script{i}.js', SMALL_JS.format(i=i)))
+    elif shape == 'bundles':
+        for i in range(2):
+            files.append((f'report{i}.html', make_html(rng, n(2500))))
+            files.append((f'vendor{i}.css', make_css(rng, n(5000))))
+            files.append((f'vendor{i}.js', make_js(rng, n(3000))))
+    elif shape == 'strings':
+        for i in range(4):
+            files.append((f'strings{i}.js', make_js(rng, n(800), strings_per_function=20)))
+    elif shape == 'mixed':
+        for i in range(n(60)):
+            files.append((f'site/page{i}.html', make_html(rng, rng.randint(1, 80))))
+            files.append((f'site/css/style{i}.css', make_css(rng, rng.randint(1, 150))))
+            files.append((f'site/js/app{i}.js', make_js(rng, rng.randint(1, 60))))
+    elif shape == 'assets':
+        for i in range(n(40)):
+            files.append((f'fonts/font{i}.woff2', rng.randbytes(n(400_000))))
+            files.append((f'img/photo{i}.png', rng.randbytes(n(800_000))))
+            files.append((f'data/data{i}.json', json.dumps([{'id': j, 'name': _words(rng, 3)} for j in range(n(5000))])))
+        for i in range(n(10)):
+            files.append((f'page{i}.html', make_html(rng, 20)))
+    else:
+        raise ValueError(f'未知的语料形态: {shape}')
+
+    for rel_path, content in files:
+        file_path = directory / rel_path
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        if isinstance(content, bytes):
+            file_path.write_bytes(content)
+            continue
+        with open(file_path, 'w', encoding='utf-8', newline='\n') as f:
+            f.write(content)
+    return len(files)
+
+
+# ---------------------------------------------------------------------------
+# 测量
+# ---------------------------------------------------------------------------
+
+def peak_rss_kb():
+    """当前进程的峰值内存（KB）"""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS 以字节为单位，Linux 以 KB 为单位
+    return usage // 1024 if sys.platform == 'darwin' else usage
+
+
+def make_compressor(kind, config_file):
+    if kind == 'basic':
+        return CodeCompressor()
+    return AdvancedCodeCompressor(config_file)
+
+
+def tree_digest(directory):
+    """输出目录的哈希（按相对路径排序，不含增量清单）"""
+    digest = hashlib.sha256()
+    directory = Path(directory)
+    for file_path in sorted(p for p in directory.rglob('*') if p.is_file() and p.name != MANIFEST_FILE):
+        digest.update(file_path.relative_to(directory).as_posix().encode('utf-8') + b'\0')
+        digest.update(file_path.read_bytes() + b'\0')
+    return digest.hexdigest()
+
+
+def run_method_case(kind, file_type, corpus_dir, config_file):
+    """在子进程中运行：对语料中某类文件调用压缩方法"""
+    compressor = make_compressor(kind, config_file)
+    method = getattr(compressor, f'compress_{file_type}')
+    contents = [p.read_text(encoding='utf-8') for p in sorted(Path(corpus_dir).rglob(f'*.{file_type}'))]
+
+    digest = hashlib.sha256()
+    bytes_in = bytes_out = 0
+    start = time.perf_counter()
+    outputs = [method(content) for content in contents]
+    seconds = time.perf_counter() - start
+
+    for content, output in zip(contents, outputs):
+        bytes_in += len(content.encode('utf-8'))
+        encoded = output.encode('utf-8')
+        bytes_out += len(encoded)
+        digest.update(encoded + b'\0')
+
+    return {
+        'files': len(contents), 'bytes_in': bytes_in, 'bytes_out': bytes_out,
+        'seconds': seconds, 'peak_rss_kb': peak_rss_kb(), 'digest': digest.hexdigest(),
+    }
+
+
+def run_pipeline_case(kind, corpus_dir, output_dir, config_file, jobs):
+    """在子进程中运行：完整的 compress_directory 流程"""
+    files = [p for p in Path(corpus_dir).rglob('*') if p.is_file()]
+    bytes_in = sum(p.stat().st_size for p in files)
+
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        start = time.perf_counter()
+        if kind == 'basic':
+            CodeCompressor(corpus_dir, output_dir).compress_directory()
+        else:
+            AdvancedCodeCompressor(config_file, jobs=jobs).compress_directory(corpus_dir, output_dir)
+        seconds = time.perf_counter() - start
+
+    bytes_out = sum(p.stat().st_size for p in Path(output_dir).rglob('*') if p.is_file() and p.name != MANIFEST_FILE)
+    return {
+        'files': len(files), 'bytes_in': bytes_in, 'bytes_out': bytes_out,
+        'seconds': seconds, 'peak_rss_kb': peak_rss_kb(), 'digest': tree_digest(output_dir),
+    }
+
+
+def run_isolated(func, *args):
+    """在独立的子进程中运行，使峰值内存只反映该用例"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as executor:
+        return executor.submit(func, *args).result()
+
+
+def finish_result(name, shape, raw):
+    seconds = raw['seconds'] or 1e-9
+    raw.update({
+        'name': name,
+        'shape': shape,
+        'mb_per_s': raw['bytes_in'] / seconds / 1e6,
+        'files_per_s': raw['files'] / seconds,
+        'ratio': raw['bytes_out'] / raw['bytes_in'] if raw['bytes_in'] else 1.0,
+    })
+    return raw
+
+
+def run_benchmarks(shapes, scale, config_file, jobs, work_dir):
+    """生成语料并运行全部用例"""
+    results = []
+    for shape in shapes:
+        corpus_dir = Path(work_dir) / f'corpus_{shape}'
+        generate_corpus(corpus_dir, shape, scale)
+
+        for kind in ('basic', 'advanced'):
+            for file_type in FILE_TYPES:
+                if not any(corpus_dir.rglob(f'*.{file_type}')):
+                    continue
+                raw = run_isolated(run_method_case, kind, file_type, str(corpus_dir), config_file)
+                results.append(finish_result(f'{kind}.compress_{file_type}', shape, raw))
+                print(f"⏱️  {shape:>8} {kind}.compress_{file_type}: {results[-1]['mb_per_s']:.2f} MB/s", file=sys.stderr)
+
+            output_dir = Path(work_dir) / f'out_{shape}_{kind}'
+            raw = run_isolated(run_pipeline_case, kind, str(corpus_dir), str(output_dir), config_file, jobs)
+            results.append(finish_result(f'{kind}.compress_directory', shape, raw))
+            print(f"⏱️  {shape:>8} {kind}.compress_directory: {results[-1]['files_per_s']:.0f} 文件/s", file=sys.stderr)
+            shutil.rmtree(output_dir, ignore_errors=True)
+
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+    return results
+
+
+# ---------------------------------------------------------------------------
+# 黄金输出
+# ---------------------------------------------------------------------------
+
+def golden_key(result, scale):
+    return f"{result['shape']}@{scale}:{result['name']}"
+
+
+def check_golden(results, scale, golden_file):
+    """比较输出哈希与黄金文件，返回不一致的用例列表"""
+    try:
+        with open(golden_file, 'r', encoding='utf-8') as f:
+            golden = json.load(f)
+    except FileNotFoundError:
+        print(f"⚠️  黄金文件 {golden_file} 不存在，请先使用 --update-golden 生成", file=sys.stderr)
+        return None
+
+    mismatches = []
+    for result in results:
+        key = golden_key(result, scale)
+        if key in golden and golden[key] != result['digest']:
+            mismatches.append(key)
+    return mismatches
+
+
+def update_golden(results, scale, golden_file):
+    """把当前输出哈希写入黄金文件"""
+    try:
+        with open(golden_file, 'r', encoding='utf-8') as f:
+            golden = json.load(f)
+    except FileNotFoundError:
+        golden = {}
+    for result in results:
+        golden[golden_key(result, scale)] = result['digest']
+    with open(golden_file, 'w', encoding='utf-8') as f:
+        json.dump(golden, f, indent=2, sort_keys=True)
+        f.write('\n')
+
+
+# ---------------------------------------------------------------------------
+# 小文件开销
+# ---------------------------------------------------------------------------
+
+def time_per_call(func, args_list, repeat):
+    """返回每次调用的最短平均耗时（微秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for args in args_list:
+            func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best / len(args_list) * 1e6
+
+
+def bench_overhead(compressor, count, repeat):
+    """小文件单文件开销基准"""
+    html = [(SMALL_HTML.format(i=i),) for i in range(count)]
+    css = [(SMALL_CSS.format(i=i),) for i in range(count)]
+    js = [(SMALL_JS.format(i=i),) for i in range(count)]
+    paths = [(Path(f'site/pages/p{i % 50}/node_modules/lib{i}.js' if i % 10 == 0 else f'site/pages/p{i % 50}/file{i}.min.js' if i % 10 == 1 else f'site/pages/p{i % 50}/file{i}.js'),)
+             for i in range(count)]
+
+    return {
+        'compress_html': time_per_call(compressor.compress_html, html, repeat),
+        'compress_css': time_per_call(compressor.compress_css, css, repeat),
+        'compress_js': time_per_call(compressor.compress_js, js, repeat),
+        'should_skip_file': time_per_call(compressor.should_skip_file, paths, repeat),
+        'is_binary_file': time_per_call(compressor.is_binary_file, paths, repeat),
+    }
+
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='压缩器性能基准')
+    parser.add_argument('-c', '--config', default='compress_config.json', help='配置文件路径')
+    subparsers = parser.add_subparsers(dest='command')
+
+    overhead_parser = subparsers.add_parser('overhead', help='测量小文件单文件开销')
+    overhead_parser.add_argument('-n', '--files', type=int, default=5000, help='每种类型的小文件数量')
+    overhead_parser.add_argument('-r', '--repeat', type=int, default=5, help='重复次数（取最快的一次）')
+
+    run_parser = subparsers.add_parser('run', help='在合成语料上运行吞吐量基准')
+    run_parser.add_argument('-s', '--shape', choices=SHAPES + ('all',), default='all', help='语料形态')
+    run_parser.add_argument('--scale', type=float, default=1.0, help='语料规模倍数')
+    run_parser.add_argument('-j', '--jobs', type=int, default=1, help='compress_directory 的并行进程数')
+    run_parser.add_argument('-o', '--output', help='结果JSON输出路径（默认输出到标准输出）')
+    run_parser.add_argument('--check-golden', action='store_true', help='检查输出是否与黄金文件一致')
+    run_parser.add_argument('--update-golden', action='store_true', help='用当前输出更新黄金文件')
+    run_parser.add_argument('--golden-file', default=str(GOLDEN_FILE), help='黄金文件路径')
+
+    args = parser.parse_args()
+
+    if args.command == 'overhead':
+        compressor = AdvancedCodeCompressor(args.config)
+        results = bench_overhead(compressor, args.files, args.repeat)
+
+        print(f"📏 小文件单文件开销（{args.files} 个文件，取 {args.repeat} 次中最快）")
+        print("=" * 50)
+        for name, micros in results.items():
+            print(f"{name:>18}: {micros:>8.2f} µs/文件")
+        return
+
+    if args.command != 'run':
+        parser.print_help()
+        return
+
+    shapes = SHAPES if args.shape == 'all' else (args.shape,)
+    config_file = str(Path(args.config).absolute())
+    with tempfile.TemporaryDirectory(prefix='bench_') as work_dir:
+        results = run_benchmarks(shapes, args.scale, config_file, args.jobs, work_dir)
+
+    report = {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scale': args.scale,
+        'jobs': args.jobs,
+        'results': results,
+    }
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+        print(f"📄 结果已保存到: {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+    if args.update_golden:
+        update_golden(results, args.scale, args.golden_file)
+        print(f"🏅 黄金文件已更新: {args.golden_file}", file=sys.stderr)
+    elif args.check_golden:
+        mismatches = check_golden(results, args.scale, args.golden_file)
+        if mismatches is None:
+            sys.exit(2)
+        if mismatches:
+            print("❌ 以下用例的输出与黄金文件不一致:", file=sys.stderr)
+            for key in mismatches:
+                print(f"   {key}", file=sys.stderr)
+            sys.exit(1)
+        print("✅ 输出与黄金文件一致", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,166 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+增量压缩清单
+在输出目录中记录每个源文件的大小、修改时间、内容哈希和输出哈希，
+用于跳过未变化的文件、清理已删除源文件的输出
+"""
+
+import os
+import json
+import shutil
+import hashlib
+from pathlib import Path
+
+MANIFEST_FILE = '.compress_manifest.json'
+MANIFEST_VERSION = 1
+
+
+def hash_bytes(data):
+    """计算字节内容的哈希"""
+    return hashlib.sha256(data).hexdigest()
+
+
+def hash_file(file_path):
+    """分块计算文件内容的哈希"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_config(config, modules=()):
+    """计算配置和压缩器代码的哈希，任何一个变化（包括升级压缩器）时需要全量重建"""
+    digest = hashlib.sha256(json.dumps(config, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    for module in modules:
+        with open(module.__file__, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    def __init__(self, output_dir, config_hash):
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / MANIFEST_FILE
+        self.config_hash = config_hash
+        self.entries = {}
+        self.seen = set()
+
+    def load(self):
+        """加载清单；清单缺失、损坏或配置已变化时返回 False（需要全量重建）"""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return False
+
+        if data.get('version') != MANIFEST_VERSION or data.get('config_hash') != self.config_hash:
+            return False
+
+        self.entries = data.get('files', {})
+        return True
+
+    def prepare_output(self, incremental):
+        """准备输出目录；非增量模式或清单失效时清空重建"""
+        if incremental and self.load():
+            return True
+
+        self.entries = {}
+        if self.output_dir.exists():
+            shutil.rmtree(self.output_dir)
+        self.output_dir.mkdir(parents=True)
+        return False
+
+    def check(self, rel_path, file_path, output_file, stat=None, variant=None):
+        """检查源文件是否未变化
+
+        返回 (是否可跳过, 源文件哈希)。大小和修改时间都一致时不读取文件内容；
+        仅修改时间变化时重新计算哈希确认内容是否真的变化。stat 可传入扫描时已获取的结果。
+        variant 为源文件以外影响输出的因素（如未使用 CSS 清理的索引），与记录时不同也需要重新处理
+        """
+        key = Path(rel_path).as_posix()
+        self.seen.add(key)
+
+        if stat is None:
+            stat = file_path.stat()
+        entry = self.entries.get(key)
+        if entry is None or not output_file.exists():
+            return False, hash_file(file_path)
+
+        if entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime_ns:
+            return entry.get('variant') == variant, entry['hash']
+
+        source_hash = hash_file(file_path)
+        if entry['size'] == stat.st_size and entry['hash'] == source_hash:
+            entry['mtime'] = stat.st_mtime_ns
+            return entry.get('variant') == variant, source_hash
+
+        return False, source_hash
+
+    def record(self, rel_path, file_path, source_hash, file_type, original_size, compressed_size, output_hash,
+               sidecars=None, stat=None, variant=None):
+        """记录处理结果"""
+        key = Path(rel_path).as_posix()
+        if stat is None:
+            stat = file_path.stat()
+        self.seen.add(key)
+        self.entries[key] = {
+            'size': stat.st_size,
+            'mtime': stat.st_mtime_ns,
+            'hash': source_hash,
+            'type': file_type,
+            'original': original_size,
+            'compressed': compressed_size,
+            'output_hash': output_hash,
+        }
+        if sidecars:
+            self.entries[key]['sidecars'] = sidecars
+        if variant is not None:
+            self.entries[key]['variant'] = variant
+
+    def get(self, rel_path):
+        """获取已记录的条目"""
+        return self.entries.get(Path(rel_path).as_posix())
+
+    def remove_stale(self, extra_suffixes=()):
+        """删除源文件已不存在的输出文件（以及附加后缀的同名文件），返回删除的相对路径列表"""
+        removed = []
+        for key in sorted(set(self.entries) - self.seen):
+            self.remove(key, extra_suffixes)
+            removed.append(key)
+        return removed
+
+    def remove(self, rel_path, extra_suffixes=()):
+        """删除一个条目及其输出文件，返回被删除的条目（不存在时返回 None）"""
+        key = Path(rel_path).as_posix()
+        output_file = self.output_dir / key
+        for path in [output_file] + [output_file.with_name(output_file.name + suffix) for suffix in extra_suffixes]:
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+        self._remove_empty_dirs(output_file.parent)
+        self.seen.discard(key)
+        return self.entries.pop(key, None)
+
+    def _remove_empty_dirs(self, directory):
+        """向上删除空目录，直到输出目录为止"""
+        while directory != self.output_dir and self.output_dir in directory.parents:
+            try:
+                directory.rmdir()
+            except OSError:
+                break
+            directory = directory.parent
+
+    def save(self):
+        """原子写入清单"""
+        data = {
+            'version': MANIFEST_VERSION,
+            'config_hash': self.config_hash,
+            'files': self.entries,
+        }
+        tmp_path = self.path.with_name(self.path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, sort_keys=True)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+资源合并与小资源内联
+压缩完成后解析输出目录中 HTML 引用的本地 CSS/JS：同一页面中相邻的样式表、脚本按顺序合并为一个文件，
+小于阈值的资源直接内联为 <style>/<script>，CSS 中引用的小图片内联为 data URI，并改写 HTML。
+多个页面引用同一组文件时合并文件只生成一次；合并文件名由成员列表决定，内容变化时文件名不变
+（需要内容哈希时同时启用资源指纹）。
+
+增量模式下未重新压缩的 HTML 已经是改写后的内容，因此保留一份改写前的输出（硬链接，不额外占用空间），
+每次运行都从改写前的内容重新合并，被合并的 CSS/JS 变化时页面无需重新压缩。
+这些状态保存在输出目录旁边的 .<输出目录名>.bundle-state 中，不会随输出目录一起部署
+"""
+
+import os
+import re
+import json
+import base64
+import hashlib
+import posixpath
+import mimetypes
+from html import escape, unescape
+from pathlib import Path
+from urllib.parse import quote
+
+from build_manifest import hash_bytes
+from fast_io import passthrough_file, read_text
+from fingerprint import CSS_REF_RE, HTML_SUFFIXES, resolve_ref
+from sidecars import SIDECAR_SUFFIXES, write_output
+
+# 状态目录中的文件：上次生成的合并文件列表、改写前的 HTML 输出
+BUNDLE_MANIFEST_FILE = 'manifest.json'
+SOURCE_COPY_DIR = 'src'
+
+# 可以整体跳过内容的元素（内联脚本、样式以及其中的文本不是引用），<link> 单独匹配
+_PAGE_TOKEN_RE = re.compile(r'''<!--.*?-->'''
+                            r'''|<(script|style|noscript|template|textarea)\b((?:"[^"]*"|'[^']*'|[^'">])*)>(.*?)</\1\s*>'''
+                            r'''|<link\b((?:"[^"]*"|'[^']*'|[^'">])*)>''', re.IGNORECASE | re.DOTALL)
+
+_ATTR_RE = re.compile(r'''([^\s"'>/=]+)(?:\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+)))?''')
+_UNQUOTED_VALUE_RE = re.compile(r'''[^\s"'=<>`]+''')
+
+# 外部链接、data URI、页内锚点（不需要改写）
+_EXTERNAL_RE = re.compile(r'^(?:[a-z][a-z0-9+.-]*:|//|#)', re.IGNORECASE)
+
+# 可以合并的标签上允许出现的属性（integrity、async、media 等会改变加载方式，不合并）
+_LINK_ATTRIBUTES = frozenset(['rel', 'href', 'type', 'media'])
+_SCRIPT_ATTRIBUTES = frozenset(['src', 'type', 'defer'])
+_SCRIPT_TYPES = frozenset(['', 'text/javascript', 'application/javascript', 'text/ecmascript', 'application/ecmascript'])
+
+_CHARSET_RE = re.compile(r'^\s*@charset\s*"[^"]*"\s*;', re.IGNORECASE)
+_USE_STRICT_RE = re.compile(r'''^\s*(["'])use strict\1''')
+_SCRIPT_END_RE = re.compile(r'</script|<!--', re.IGNORECASE)
+_STYLE_END_RE = re.compile(r'</style', re.IGNORECASE)
+
+
+def bundle_state_dir(output_dir):
+    """合并状态目录：与输出目录同级（同一文件系统，副本可以使用硬链接），不在输出目录中"""
+    output_dir = Path(output_dir).absolute()
+    return output_dir.with_name(f'.{output_dir.name}.bundle-state')
+
+
+class BundleSettings:
+    """资源合并设置（来自 output_settings.bundle）"""
+
+    def __init__(self, settings):
+        settings = settings or {}
+        self.enabled = settings.get('enabled', False)
+        self.directory = settings.get('directory', 'bundles').strip('/')
+        self.inline_max_size = settings.get('inline_max_size', 2048)
+        self.data_uri_max_size = settings.get('data_uri_max_size', 4096)
+
+
+class _Reference:
+    """页面中一个可以合并的 <link>/<script> 标签"""
+
+    __slots__ = ('kind', 'target', 'ref', 'start', 'end', 'tag', 'defer', 'strict')
+
+    def __init__(self, kind, target, ref, start, end, tag, defer=False, strict=False):
+        self.kind = kind
+        self.target = target
+        self.ref = ref
+        self.start = start
+        self.end = end
+        self.tag = tag
+        self.defer = defer
+        self.strict = strict
+
+
+def _parse_attributes(text):
+    attributes = {}
+    for match in _ATTR_RE.finditer(text):
+        value = next((group for group in match.groups()[1:] if group is not None), '')
+        attributes.setdefault(match.group(1).lower(), unescape(value).strip())
+    return attributes
+
+
+def _replace_attribute(tag, name, value):
+    """替换开始标签中一个属性的值，保持原来的引号风格"""
+    def replace(match):
+        quote_char = match.group(2)[0] if match.group(2)[0] in '"\'' else ''
+        if not quote_char and not _UNQUOTED_VALUE_RE.fullmatch(value):
+            quote_char = '"'
+        return f'{match.group(1)}{quote_char}{escape(value, quote=bool(quote_char))}{quote_char}'
+
+    return re.sub(rf'''(\s{name}\s*=\s*)("[^"]*"|'[^']*'|[^\s"'=<>`]+)''', replace, tag, count=1, flags=re.IGNORECASE)
+
+
+class AssetBundler:
+    def __init__(self, output_dir, settings, sidecar_settings):
+        self.output_dir = output_dir
+        self.settings = settings
+        self.sidecar_settings = sidecar_settings
+        self.state_dir = bundle_state_dir(output_dir)
+        self.manifest_path = self.state_dir / BUNDLE_MANIFEST_FILE
+        self.copy_dir = self.state_dir / SOURCE_COPY_DIR
+        # 本次生成的合并文件 {相对路径: 内容哈希}，供资源指纹使用
+        self.outputs = {}
+        self.output_hashes = {}
+        self.inlined = 0
+        self._bundles = {}
+        self._texts = {}
+        self._charsets = set()
+        self._rebased = {}
+        self._data_uris = {}
+
+    def run(self, output_hashes):
+        """处理输出目录中的 HTML，返回 (生成的合并文件数, 内联的资源数, 改写的页面数)
+
+        output_hashes 为 {相对路径: 输出内容哈希}，来自增量清单
+        """
+        previous = self._load_manifest()
+        self.outputs = {}
+        self.inlined = 0
+        self._bundles = {}
+        self._texts = {}
+        self._charsets = set()
+        self._rebased = {}
+        self._data_uris = {}
+        self.output_hashes = output_hashes
+
+        pages = sorted(rel for rel in output_hashes if posixpath.splitext(rel)[1].lower() in HTML_SUFFIXES)
+        rewritten = 0
+        for rel in pages:
+            current, source = self._page_source(rel)
+            new_text = self._bundle_page(rel, source)
+            if new_text != current:
+                write_output(self.output_dir / rel, new_text.encode('utf-8'), self.sidecar_settings)
+                rewritten += 1
+
+        # 删除上次生成、这次已不再使用的合并文件，以及已删除页面的改写前副本
+        for stale in set(previous) - set(self.outputs):
+            for path in [self.output_dir / stale] + [self.output_dir / f'{stale}{s}' for s in SIDECAR_SUFFIXES]:
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+        self._remove_stale_copies(set(pages))
+
+        self._save_manifest()
+        return len(self.outputs), self.inlined, rewritten
+
+    def _page_source(self, rel):
+        """返回 (当前输出内容, 改写前的内容)
+
+        输出与清单中的哈希一致时是刚压缩（或从未改写过）的内容，保存一份副本；
+        否则是上次改写的结果，使用保存的副本
+        """
+        path = self.output_dir / rel
+        copy_path = self.copy_dir / rel
+        current = read_text(path)
+        expected = self.output_hashes[rel]
+        if expected is None or hash_bytes(current.encode('utf-8')) == expected:
+            copy_path.parent.mkdir(parents=True, exist_ok=True)
+            passthrough_file(path, copy_path, 'hardlink')
+            return current, current
+        try:
+            return current, read_text(copy_path)
+        except FileNotFoundError:
+            return current, current
+
+    def _remove_stale_copies(self, pages):
+        # 自底向上遍历，删除副本后变空的目录一并删除
+        for root, dirs, files in os.walk(self.copy_dir, topdown=False):
+            for name in files:
+                path = os.path.join(root, name)
+                if posixpath.normpath(os.path.relpath(path, self.copy_dir).replace(os.sep, '/')) not in pages:
+                    os.remove(path)
+            if root != str(self.copy_dir) and not os.listdir(root):
+                os.rmdir(root)
+
+    def _bundle_page(self, rel, text):
+        """把页面中的引用分组后合并或内联，返回改写后的内容"""
+        groups = []
+        group = None
+        for match in _PAGE_TOKEN_RE.finditer(text):
+            reference = self._reference(rel, match)
+            if reference is None:
+                # 内联脚本/样式、不能合并的引用会打断分组；注释和其他 <link> 不影响样式表分组
+                if match.group(1) is not None or (match.group(4) is not None and self._is_stylesheet(match.group(4))):
+                    group = None
+                continue
+            if group is not None and self._can_join(text, group, reference):
+                group.append(reference)
+            else:
+                group = [reference]
+                groups.append(group)
+
+        edits = []
+        for group in groups:
+            replacement = self._replace_group(rel, group)
+            if replacement is None:
+                continue
+            edits.append((group[0].start, group[0].end, replacement))
+            edits.extend((reference.start, reference.end, '') for reference in group[1:])
+        if not edits:
+            return text
+
+        parts = []
+        position = 0
+        for start, end, replacement in sorted(edits):
+            parts.append(text[position:start])
+            parts.append(replacement)
+            position = end
+        parts.append(text[position:])
+        return ''.join(parts)
+
+    @staticmethod
+    def _is_stylesheet(attributes):
+        return 'stylesheet' in _parse_attributes(attributes).get('rel', '').lower().split()
+
+    @staticmethod
+    def _can_join(text, group, reference):
+        last = group[-1]
+        if reference.kind != last.kind:
+            return False
+        if reference.kind == 'css':
+            return True
+        # 脚本只合并紧挨着的（中间的元素可能是后面的脚本要操作的），加载方式和严格模式需要一致
+        return (not text[last.end:reference.start].strip()
+                and reference.defer == last.defer and reference.strict == group[0].strict)
+
+    def _reference(self, page, match):
+        """解析可以合并的引用，其他标签返回 None"""
+        if match.group(4) is not None:
+            attributes = _parse_attributes(match.group(4))
+            if (not attributes.keys() <= _LINK_ATTRIBUTES or attributes.get('rel', '').lower().split() != ['stylesheet']
+                    or attributes.get('type', 'text/css').lower() != 'text/css'
+                    or attributes.get('media', 'all').lower() != 'all'):
+                return None
+            kind, ref = 'css', attributes.get('href', '')
+        elif match.group(1).lower() == 'script' and not match.group(3).strip():
+            attributes = _parse_attributes(match.group(2))
+            if not attributes.keys() <= _SCRIPT_ATTRIBUTES or attributes.get('type', '').lower() not in _SCRIPT_TYPES:
+                return None
+            kind, ref = 'js', attributes.get('src', '')
+        else:
+            return None
+
+        target = resolve_ref(page, ref)
+        if target is None or posixpath.splitext(target)[1].lower() != f'.{kind}' or target not in self.output_hashes:
+            return None
+        text = self._asset_text(target, kind)
+        if text is None:
+            return None
+        return _Reference(kind, target, ref, match.start(), match.end(), match.group(0),
+                          defer='defer' in attributes, strict=_USE_STRICT_RE.match(text) is not None)
+
+    def _asset_text(self, target, kind):
+        """读取被引用的资源（每个文件只读一次）；含 @import 或无法改写 url() 的 CSS 返回 None"""
+        if target in self._texts:
+            return self._texts[target]
+        try:
+            text = read_text(self.output_dir / target)
+        except (UnicodeDecodeError, OSError):
+            text = None
+        if text is not None and kind == 'css':
+            # @charset 只能出现在文件开头，合并时去掉，必要时在合并文件开头重新声明
+            text, count = _CHARSET_RE.subn('', text, count=1)
+            if count:
+                self._charsets.add(target)
+            if self._rebase_css(target, text, posixpath.dirname(target)) is None:
+                text = None
+        self._texts[target] = text
+        return text
+
+    def _rebase_css(self, target, text, directory):
+        """把 CSS 中的相对 url() 改为相对于新位置，小图片改为 data URI；含 @import 时返回 None"""
+        key = (target, directory)
+        if key in self._rebased:
+            return self._rebased[key]
+        unresolved = False
+
+        def replace(match):
+            nonlocal unresolved
+            if match.group(1) is None:
+                unresolved = True
+                return match.group(0)
+            ref = match.group(3)
+            if ref.startswith('/'):
+                return match.group(0)
+            resolved = resolve_ref(target, ref)
+            if resolved is None:
+                # 指向输出目录之外的相对路径移动位置后无法改写
+                unresolved = unresolved or not _EXTERNAL_RE.match(ref)
+                return match.group(0)
+            data_uri = self._data_uri(resolved)
+            if data_uri is not None:
+                return f'{match.group(1)}{data_uri}{match.group(4)}'
+            suffix = ref[len(re.split(r'[?#]', ref, maxsplit=1)[0]):]
+            new_ref = quote(posixpath.relpath(resolved, directory or '.')) + suffix
+            return f'{match.group(1)}{match.group(2)}{new_ref}{match.group(2)}{match.group(4)}'
+
+        rebased = CSS_REF_RE.sub(replace, text)
+        self._rebased[key] = None if unresolved else rebased
+        return self._rebased[key]
+
+    def _data_uri(self, target):
+        """不超过大小上限的图片转为 data URI，其他返回 None"""
+        if target in self._data_uris:
+            return self._data_uris[target]
+        data_uri = None
+        mime_type = mimetypes.guess_type(target)[0]
+        if self.settings.data_uri_max_size > 0 and mime_type and mime_type.startswith('image/'):
+            path = self.output_dir / target
+            try:
+                if path.stat().st_size <= self.settings.data_uri_max_size:
+                    data_uri = f'data:{mime_type};base64,{base64.b64encode(path.read_bytes()).decode("ascii")}'
+            except OSError:
+                pass
+        self._data_uris[target] = data_uri
+        return data_uri
+
+    def _replace_group(self, page, group):
+        """返回替换第一个引用的内容（内联的元素或指向合并文件的标签），不需要改写时返回 None"""
+        first = group[0]
+        size = sum(len(self._texts[reference.target]) for reference in group)
+        if size <= self.settings.inline_max_size and not first.defer:
+            inline = self._inline(page, group)
+            if inline is not None:
+                self.inlined += len(group)
+                return inline
+        if len(group) < 2:
+            return None
+
+        bundle = self._bundle(first.kind, tuple(reference.target for reference in group))
+        if first.ref.startswith('/'):
+            ref = '/' + bundle
+        else:
+            ref = posixpath.relpath(bundle, posixpath.dirname(page) or '.')
+        return _replace_attribute(first.tag, 'href' if first.kind == 'css' else 'src', quote(ref))
+
+    def _inline(self, page, group):
+        if group[0].kind == 'css':
+            directory = posixpath.dirname(page)
+            text = '\n'.join(self._rebase_css(reference.target, self._texts[reference.target], directory)
+                             for reference in group)
+            return None if _STYLE_END_RE.search(text) else f'<style>{text}</style>'
+        text = '\n;'.join(self._texts[reference.target] for reference in group)
+        return None if _SCRIPT_END_RE.search(text) else f'<script>{text}</script>'
+
+    def _bundle(self, kind, targets):
+        """生成（或复用）合并文件，返回其相对路径"""
+        key = (kind, targets)
+        if key in self._bundles:
+            return self._bundles[key]
+        name = hashlib.sha256('\0'.join((kind,) + targets).encode('utf-8')).hexdigest()[:12]
+        bundle = f'{self.settings.directory}/{name}.{kind}' if self.settings.directory else f'{name}.{kind}'
+        if kind == 'css':
+            directory = posixpath.dirname(bundle)
+            text = '\n'.join(self._rebase_css(target, self._texts[target], directory) for target in targets)
+            if self._charsets.intersection(targets):
+                text = '@charset "UTF-8";' + text
+        else:
+            text = '\n;'.join(self._texts[target] for target in targets)
+
+        data = text.encode('utf-8')
+        path = self.output_dir / bundle
+        try:
+            unchanged = path.read_bytes() == data
+        except FileNotFoundError:
+            unchanged = False
+        if not unchanged:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            write_output(path, data, self.sidecar_settings)
+        self._bundles[key] = bundle
+        self.outputs[bundle] = hash_bytes(data)
+        return bundle
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return []
+
+    def _save_manifest(self):
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.manifest_path.with_name(self.manifest_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(sorted(self.outputs), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.manifest_path)
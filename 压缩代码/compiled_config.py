@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+编译后的压缩配置
+从 compress_config.json 一次性构建：展开各类型的压缩选项、预编译正则、
+合并跳过规则，压缩每个文件时只需直接使用这些对象
+"""
+
+import os
+import re
+import fnmatch
+from pathlib import Path
+
+from sidecars import SidecarSettings
+from fast_io import PASSTHROUGH_MODES
+from scanner import IGNORE_FILE
+from output_cache import CacheSettings
+from fingerprint import FingerprintSettings
+from css_pruner import PruneSettings
+from bundler import BundleSettings, bundle_state_dir
+
+DEFAULT_PRESERVE_TAGS = ('pre', 'textarea', 'script', 'style')
+
+# 需要压缩的文件类型，其余文件原样放到输出目录
+MINIFIED_SUFFIXES = {'.html': 'html', '.css': 'css', '.js': 'js'}
+
+# CSS 压缩用到的正则
+CSS_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+CSS_WHITESPACE_RE = re.compile(r'\s+')
+
+# 这些符号后面的空格可以删除（空白已合并为单个空格）
+CSS_TRIM_AFTER = ('{ ', '} ', ': ', '; ', ', ')
+
+
+class SkipMatcher:
+    """预构建的跳过规则：子串规则合并为一个正则，通配符规则合并为另一个正则"""
+
+    def __init__(self, skip_patterns):
+        substrings = [pattern for pattern in skip_patterns if '*' not in pattern]
+        globs = [pattern for pattern in skip_patterns if '*' in pattern]
+
+        self._substring_re = re.compile('|'.join(re.escape(pattern) for pattern in substrings)) if substrings else None
+        self._glob_re = re.compile('|'.join(fnmatch.translate(os.path.normcase(pattern)) for pattern in globs)) if globs else None
+
+    def __call__(self, file_path):
+        if self._glob_re is not None and self._glob_re.match(os.path.normcase(file_path.name)):
+            return True
+        return self._substring_re is not None and self._substring_re.search(str(file_path)) is not None
+
+    def skip_dir(self, dir_path):
+        """目录路径已包含子串规则时，其中所有文件都会被跳过，可以整个剪枝；
+        通配符规则只匹配文件名，不用于剪枝"""
+        return self._substring_re is not None and self._substring_re.search(str(dir_path)) is not None
+
+
+class CompiledConfig:
+    def __init__(self, config):
+        settings = config['compression_settings']
+        file_settings = config['file_settings']
+
+        html = settings['html']
+        self.html_enabled = html['enabled']
+        self.html_remove_comments = html.get('remove_comments', True)
+        self.html_remove_whitespace = html.get('remove_whitespace', True)
+        self.html_preserve_tags = tuple(html.get('preserve_tags', DEFAULT_PRESERVE_TAGS))
+        self.html_stream_threshold = html.get('stream_threshold', 8 * 1024 * 1024)
+        self.html_stream_chunk_size = html.get('stream_chunk_size', 1024 * 1024)
+        self.html_minify_inline_css = html.get('minify_inline_css', True)
+        self.html_minify_inline_js = html.get('minify_inline_js', True)
+        self.html_minify_attributes = html.get('minify_attributes', True)
+
+        css = settings['css']
+        self.css_enabled = css['enabled']
+        self.css_remove_comments = css.get('remove_comments', True)
+        self.css_remove_whitespace = css.get('remove_whitespace', True)
+        self.css_minify_selectors = css.get('minify_selectors', True)
+        self.css_optimize_values = css.get('optimize_values', True)
+        self.css_merge_rules = css.get('merge_rules', True)
+        self.css_prune = PruneSettings(css.get('prune'))
+
+        js = settings['js']
+        self.js_enabled = js['enabled']
+        self.js_remove_comments = js.get('remove_comments', True)
+        self.js_remove_whitespace = js.get('remove_whitespace', True)
+
+        self.should_skip = SkipMatcher(file_settings['skip_patterns'])
+        self.binary_extensions = frozenset(ext.lower() for ext in file_settings['binary_extensions'])
+        self.ignore_file = file_settings.get('ignore_file', IGNORE_FILE)
+
+        output_settings = config.get('output_settings', {})
+        self.sidecars = SidecarSettings(output_settings.get('precompress'))
+        self.passthrough_mode = output_settings.get('passthrough', 'reflink')
+        if self.passthrough_mode not in PASSTHROUGH_MODES:
+            raise ValueError(f"output_settings.passthrough 必须是 {', '.join(PASSTHROUGH_MODES)} 之一")
+        self.cache = CacheSettings(output_settings.get('cache'))
+        self.fingerprint = FingerprintSettings(output_settings.get('fingerprint'))
+        self.bundle = BundleSettings(output_settings.get('bundle'))
+
+    def source_skip_dir(self, output_dir):
+        """扫描源目录用的 skip_dir：输出目录和合并状态目录位于源目录中时同样不进入"""
+        excluded = {Path(output_dir).absolute(), bundle_state_dir(output_dir)}
+        skip_dir = self.should_skip.skip_dir
+        return lambda path: path.absolute() in excluded or skip_dir(path)
@@ -7,14 +7,46 @@
 
 import os
 import re
+import sys
 import json
-import shutil
 from pathlib import Path
 
+import fast_io
+import js_minifier
+import html_minifier
+import css_optimizer
+from build_manifest import BuildManifest, hash_bytes, hash_config
+from js_minifier import minify_js
+from css_optimizer import CSSParseError, optimize_css
+from html_minifier import minify_html, minify_html_file
+from fast_io import passthrough_file, read_text
+from scanner import scan_tree
+
+# 基础版没有配置文件，用压缩器名称和跳过规则作为清单的配置指纹
+SKIP_PATTERNS = [
+    'node_modules',
+    '.git',
+    '__pycache__',
+    '.pyc',
+    'compressed',
+    'compress.py'
+]
+
+# 影响压缩结果的模块，升级后增量清单失效、全量重建
+MINIFIER_MODULES = (fast_io, js_minifier, html_minifier, css_optimizer, sys.modules[__name__])
+
+# 需要保留空白的HTML标签
+HTML_PRESERVE_TAGS = ('pre', 'textarea', 'script')
+
+# 超过此大小的HTML文件流式压缩，避免整个文件读入内存
+HTML_STREAM_THRESHOLD = 8 * 1024 * 1024
+
+
 class CodeCompressor:
-    def __init__(self, source_dir='.', output_dir='compressed'):
+    def __init__(self, source_dir='.', output_dir='compressed', incremental=False):
         self.source_dir = Path(source_dir)
         self.output_dir = Path(output_dir)
+        self.incremental = incremental
         self.stats = {
             'html': {'original': 0, 'compressed': 0, 'files': 0},
             'css': {'original': 0, 'compressed': 0, 'files': 0},
@@ -24,37 +56,19 @@ class CodeCompressor:
         
     def compress_html(self, content):
         """压缩HTML代码"""
-        # 保留重要的空白符，删除不必要的空白
-        # 删除HTML注释（但保留条件注释）
-        content = re.sub(r'<!--(?!\[if).*?-->', '', content, flags=re.DOTALL)
-        
-        # 删除多余的空白符，但保留pre、textarea、script标签内的空白
-        def preserve_whitespace(match):
-            return match.group(0)
-        
-        # 先标记需要保留空白的标签
-        preserved_tags = []
-        preserve_pattern = r'<(pre|textarea|script)[^>]*>.*?</\1>'
-        
-        def mark_preserved(match):
-            preserved_tags.append(match.group(0))
-            return f'__PRESERVE_{len(preserved_tags)-1}__'
-        
-        content = re.sub(preserve_pattern, mark_preserved, content, flags=re.DOTALL | re.IGNORECASE)
-        
-        # 压缩空白符
-        content = re.sub(r'\s+', ' ', content)
-        content = re.sub(r'>\s+<', '><', content)
-        content = re.sub(r'^\s+|\s+$', '', content, flags=re.MULTILINE)
-        
-        # 恢复保留的标签
-        for i, preserved in enumerate(preserved_tags):
-            content = content.replace(f'__PRESERVE_{i}__', preserved)
-        
-        return content.strip()
+        # 单遍扫描：删除注释（保留条件注释），压缩空白和属性，内联样式和脚本交给 CSS/JS 压缩，保留pre、textarea内的空白
+        return minify_html(content, preserve_tags=HTML_PRESERVE_TAGS, minify_css=self.compress_css,
+                           minify_js=self.compress_js, minify_attributes=True).strip()
     
     def compress_css(self, content):
         """压缩CSS代码"""
+        # 解析为规则和声明做结构优化（颜色、0 值单位、合并规则）
+        try:
+            return optimize_css(content)
+        except CSSParseError:
+            # 无法解析（CSS 嵌套、括号不匹配）时退回逐字符压缩
+            pass
+        
         # 删除CSS注释
         content = re.sub(r'/\*.*?\*/', '', content, flags=re.DOTALL)
         
@@ -77,68 +91,18 @@ class CodeCompressor:
     
     def compress_js(self, content):
         """压缩JavaScript代码（保守压缩，确保功能不受影响）"""
-        # 删除单行注释（但保留URL中的//）
-        lines = content.split('\n')
-        compressed_lines = []
-        
-        for line in lines:
-            # 检查是否在字符串中
-            in_string = False
-            string_char = None
-            i = 0
-            clean_line = ""
-            
-            while i < len(line):
-                char = line[i]
-                
-                if not in_string:
-                    if char in ['"', "'"]:
-                        in_string = True
-                        string_char = char
-                        clean_line += char
-                    elif char == '/' and i + 1 < len(line) and line[i + 1] == '/':
-                        # 找到注释，检查是否在URL中
-                        if 'http' not in line[:i]:
-                            break  # 这是注释，忽略后面的内容
-                        else:
-                            clean_line += char
-                    else:
-                        clean_line += char
-                else:
-                    if char == string_char and (i == 0 or line[i-1] != '\\'):
-                        in_string = False
-                        string_char = None
-                    clean_line += char
-                
-                i += 1
-            
-            if clean_line.strip():
-                compressed_lines.append(clean_line.rstrip())
-        
-        content = '\n'.join(compressed_lines)
-        
-        # 删除多行注释
-        content = re.sub(r'/\*.*?\*/', '', content, flags=re.DOTALL)
-        
-        # 删除多余的空白符（但保留字符串内的空白）
-        content = re.sub(r'\n\s*\n', '\n', content)  # 删除空行
-        content = re.sub(r'^\s+', '', content, flags=re.MULTILINE)  # 删除行首空白
-        
-        return content.strip()
+        # 单遍词法扫描，字符串、模板字符串、正则表达式和URL中的//不会被误删
+        return minify_js(content)
     
     def should_skip_file(self, file_path):
         """检查是否应该跳过某个文件"""
-        skip_patterns = [
-            'node_modules',
-            '.git',
-            '__pycache__',
-            '.pyc',
-            'compressed',
-            'compress.py'
-        ]
-        
         file_str = str(file_path)
-        return any(pattern in file_str for pattern in skip_patterns)
+        return any(pattern in file_str for pattern in SKIP_PATTERNS)
+    
+    def file_type(self, file_path):
+        """根据扩展名判断文件类型"""
+        suffix = file_path.suffix.lower()
+        return {'.html': 'html', '.css': 'css', '.js': 'js'}.get(suffix, 'other')
     
     def compress_file(self, file_path):
         """压缩单个文件"""
@@ -146,28 +110,23 @@ class CodeCompressor:
             return None, None
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                original_content = f.read()
+            original_content = read_text(file_path)
         except UnicodeDecodeError:
             # 对于二进制文件，直接复制
             return None, None
         
         original_size = len(original_content)
-        suffix = file_path.suffix.lower()
+        file_type = self.file_type(file_path)
         
-        if suffix == '.html':
+        if file_type == 'html':
             compressed_content = self.compress_html(original_content)
-            file_type = 'html'
-        elif suffix == '.css':
+        elif file_type == 'css':
             compressed_content = self.compress_css(original_content)
-            file_type = 'css'
-        elif suffix == '.js':
+        elif file_type == 'js':
             compressed_content = self.compress_js(original_content)
-            file_type = 'js'
         else:
             # 其他文件类型不压缩，直接复制
             compressed_content = original_content
-            file_type = 'other'
         
         compressed_size = len(compressed_content)
         
@@ -179,57 +138,98 @@ class CodeCompressor:
         return compressed_content, (original_size, compressed_size)
     
     def copy_binary_file(self, src_path, dst_path):
-        """复制二进制文件"""
+        """原样复制文件（reflink 或内核内复制，不解码），返回文件大小；失败时返回 None"""
         try:
-            shutil.copy2(src_path, dst_path)
-            size = src_path.stat().st_size
+            _, size = passthrough_file(src_path, dst_path)
             self.stats['other']['original'] += size
             self.stats['other']['compressed'] += size
             self.stats['other']['files'] += 1
-            return True
+            return size
         except Exception as e:
             print(f"复制文件失败 {src_path}: {e}")
-            return False
+            return None
     
     def compress_directory(self):
         """压缩整个目录"""
         print(f"🗜️  开始压缩 {self.source_dir} 到 {self.output_dir}")
         print("=" * 60)
         
-        # 创建输出目录
-        if self.output_dir.exists():
-            shutil.rmtree(self.output_dir)
-        self.output_dir.mkdir(parents=True)
+        # 创建输出目录（增量模式下清单有效时保留已有输出）
+        config_hash = hash_config({'compressor': 'CodeCompressor', 'skip_patterns': SKIP_PATTERNS}, MINIFIER_MODULES)
+        manifest = BuildManifest(self.output_dir, config_hash)
+        if manifest.prepare_output(self.incremental):
+            print("♻️  增量模式：跳过未变化的文件")
+        skipped_files = 0
         
-        # 遍历所有文件
-        for file_path in self.source_dir.rglob('*'):
-            if file_path.is_file() and not self.should_skip_file(file_path):
-                # 计算相对路径
-                rel_path = file_path.relative_to(self.source_dir)
-                output_path = self.output_dir / rel_path
-                
-                # 创建目录
-                output_path.parent.mkdir(parents=True, exist_ok=True)
-                
-                # 压缩文件
+        # 遍历所有文件（跳过规则都是路径子串，匹配的目录整个不进入）
+        for scanned in scan_tree(self.source_dir, self.should_skip_file, self.should_skip_file):
+            file_path = scanned.path
+            rel_path = scanned.rel_path
+            output_path = self.output_dir / rel_path
+            
+            # 未变化的文件沿用上次的统计
+            unchanged, source_hash = manifest.check(rel_path, file_path, output_path, scanned.stat)
+            if unchanged:
+                entry = manifest.get(rel_path)
+                self.stats[entry['type']]['original'] += entry['original']
+                self.stats[entry['type']]['compressed'] += entry['compressed']
+                self.stats[entry['type']]['files'] += 1
+                skipped_files += 1
+                continue
+            
+            # 创建目录
+            output_path.parent.mkdir(parents=True, exist_ok=True)
+            
+            # 大HTML文件流式压缩
+            if file_path.suffix.lower() == '.html' and scanned.stat.st_size > HTML_STREAM_THRESHOLD:
+                result = minify_html_file(file_path, output_path, preserve_tags=HTML_PRESERVE_TAGS,
+                                          minify_css=self.compress_css, minify_js=self.compress_js,
+                                          minify_attributes=True)
+                if result is not None:
+                    original_size, compressed_size, output_hash = result
+                    self.stats['html']['original'] += original_size
+                    self.stats['html']['compressed'] += compressed_size
+                    self.stats['html']['files'] += 1
+                    manifest.record(rel_path, file_path, source_hash, 'html',
+                                    original_size, compressed_size, output_hash)
+                    reduction = ((original_size - compressed_size) / original_size * 100) if original_size > 0 else 0
+                    print(f"✅ {rel_path}: {original_size:,} → {compressed_size:,} bytes (-{reduction:.1f}%)（流式）")
+                    continue
+            
+            # 压缩文件（其他类型的文件不需要修改，不经过解码直接复制）
+            compressed_content, sizes = None, None
+            if self.file_type(file_path) != 'other':
                 compressed_content, sizes = self.compress_file(file_path)
-                
-                if compressed_content is not None:
-                    # 保存压缩后的文件
-                    try:
-                        with open(output_path, 'w', encoding='utf-8') as f:
-                            f.write(compressed_content)
-                        
-                        if sizes:
-                            original_size, compressed_size = sizes
-                            reduction = ((original_size - compressed_size) / original_size * 100) if original_size > 0 else 0
-                            print(f"✅ {rel_path}: {original_size:,} → {compressed_size:,} bytes (-{reduction:.1f}%)")
-                    except Exception as e:
-                        print(f"❌ 保存文件失败 {rel_path}: {e}")
-                else:
-                    # 复制二进制文件
-                    if self.copy_binary_file(file_path, output_path):
-                        print(f"📄 {rel_path}: 已复制（二进制文件）")
+            
+            if compressed_content is not None:
+                # 保存压缩后的文件
+                try:
+                    with open(output_path, 'w', encoding='utf-8') as f:
+                        f.write(compressed_content)
+                    
+                    if sizes:
+                        original_size, compressed_size = sizes
+                        reduction = ((original_size - compressed_size) / original_size * 100) if original_size > 0 else 0
+                        print(f"✅ {rel_path}: {original_size:,} → {compressed_size:,} bytes (-{reduction:.1f}%)")
+                        manifest.record(rel_path, file_path, source_hash, self.file_type(file_path),
+                                        original_size, compressed_size,
+                                        hash_bytes(compressed_content.encode('utf-8')))
+                except Exception as e:
+                    print(f"❌ 保存文件失败 {rel_path}: {e}")
+            else:
+                # 复制二进制文件
+                size = self.copy_binary_file(file_path, output_path)
+                if size is not None:
+                    manifest.record(rel_path, file_path, source_hash, 'other', size, size, source_hash)
+                    print(f"📄 {rel_path}: 已复制（无需压缩）")
+        
+        # 清理源文件已删除的输出，并保存清单
+        for removed in manifest.remove_stale():
+            print(f"🗑️  {removed}: 源文件已删除，移除输出")
+        manifest.save()
+        
+        if skipped_files:
+            print(f"♻️  跳过 {skipped_files} 个未变化的文件")
     
     def print_summary(self):
         """打印压缩统计信息"""
@@ -279,13 +279,15 @@ def main():
     print(f"\n📂 源目录: {Path(source).absolute()}")
     print(f"📂 输出目录: {Path(output).absolute()}")
     
+    incremental = input("是否增量压缩，只处理变化的文件？(y/N): ").strip().lower() in ['y', 'yes']
+    
     confirm = input("\n确认开始压缩？(y/N): ").strip().lower()
     if confirm not in ['y', 'yes']:
         print("❌ 操作已取消")
         return
     
     # 开始压缩
-    compressor = CodeCompressor(source, output)
+    compressor = CodeCompressor(source, output, incremental)
     compressor.compress_directory()
     compressor.print_summary()
 
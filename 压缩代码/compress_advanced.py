@@ -7,21 +7,89 @@
 
 import os
 import re
+import sys
 import json
 import shutil
 import argparse
 from pathlib import Path
 from datetime import datetime
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import fast_io
+import js_minifier
+import html_minifier
+import compiled_config
+import css_optimizer
+import css_pruner
+from build_manifest import BuildManifest, hash_bytes, hash_config, hash_file
+from js_minifier import minify_js
+from html_minifier import minify_html, minify_html_file
+from css_optimizer import CSSParseError, optimize_css
+from css_pruner import INDEX_SUFFIXES, SCRIPT_SUFFIXES, build_selector_index
+from compiled_config import CompiledConfig, CSS_COMMENT_RE, CSS_WHITESPACE_RE, CSS_TRIM_AFTER, MINIFIED_SUFFIXES
+from sidecars import SIDECAR_SUFFIXES, brotli, remove_sidecars, write_sidecars, write_sidecars_from_file
+from fast_io import PASSTHROUGH_MODES, passthrough_file, read_text
+from fingerprint import AssetFingerprinter
+from bundler import AssetBundler
+from output_cache import OutputCache, compressor_fingerprint, format_size, parse_size
+from scanner import is_excluded, scan_tree
+from watch import DEFAULT_DEBOUNCE, DEFAULT_POLL_INTERVAL, watch
+
+# 并行模式下每次发给工作进程的文件数（扫描是惰性的，事先不知道文件总数）
+PARALLEL_CHUNKSIZE = 16
+
+# 并行模式下每个工作进程最多排队的批次数：扫描不会跑到压缩前面太远，内存占用与文件总数无关
+PARALLEL_BATCHES_PER_JOB = 2
+
+# 影响压缩结果的模块，源码变化时压缩结果缓存自动失效
+CACHE_FINGERPRINT_MODULES = (fast_io, js_minifier, html_minifier, css_optimizer, css_pruner, compiled_config,
+                             sys.modules[__name__])
+
+# 工作进程内的压缩器实例（由 _init_worker 创建）
+_worker_compressor = None
+
+
+def _init_worker(config, selector_index=None):
+    """进程池初始化：每个工作进程只构建一次压缩器（未使用 CSS 清理的索引由主进程建立后传入）"""
+    global _worker_compressor
+    _worker_compressor = AdvancedCodeCompressor(config=config)
+    _worker_compressor.selector_index = selector_index
+
+
+def _process_in_worker(tasks):
+    """在工作进程中压缩并写出一批文件"""
+    return [_worker_compressor.process_text_file(file_path, output_file, source_hash)
+            for file_path, output_file, source_hash in tasks]
+
 
 class AdvancedCodeCompressor:
-    def __init__(self, config_file='compress_config.json'):
-        self.config = self.load_config(config_file)
+    def __init__(self, config_file='compress_config.json', config=None, jobs=1, incremental=False):
+        self.config = config if config is not None else self.load_config(config_file)
+        self.recompile()
+        self.jobs = jobs
+        self.incremental = incremental
         self.stats = {
-            'html': {'original': 0, 'compressed': 0, 'files': 0, 'saved': 0},
-            'css': {'original': 0, 'compressed': 0, 'files': 0, 'saved': 0},
-            'js': {'original': 0, 'compressed': 0, 'files': 0, 'saved': 0},
-            'other': {'original': 0, 'compressed': 0, 'files': 0, 'saved': 0}
+            file_type: {'original': 0, 'compressed': 0, 'files': 0, 'saved': 0,
+                        'precompressed': 0, 'gzip': 0, 'brotli': 0}
+            for file_type in ('html', 'css', 'js', 'other')
         }
+        self.cache_hits = 0
+        self.selector_index = None
+        
+    def recompile(self):
+        """编译配置（修改 self.config 后需要重新调用）"""
+        # 配置只编译一次，压缩每个文件时直接使用预编译的正则和选项
+        self.compiled = CompiledConfig(self.config)
+        self.output_cache = self.open_output_cache()
+    
+    def open_output_cache(self):
+        """按配置打开共享的压缩结果缓存，未启用时返回 None"""
+        settings = self.compiled.cache
+        if not settings.enabled:
+            return None
+        fingerprint = compressor_fingerprint(CACHE_FINGERPRINT_MODULES, self.config['compression_settings'])
+        return OutputCache(settings.directory, settings.max_size, fingerprint)
         
     def load_config(self, config_file):
         """加载配置文件"""
@@ -39,8 +107,11 @@ class AdvancedCodeCompressor:
         """获取默认配置"""
         return {
             "compression_settings": {
-                "html": {"enabled": True, "remove_comments": True, "remove_whitespace": True},
-                "css": {"enabled": True, "remove_comments": True, "remove_whitespace": True},
+                "html": {"enabled": True, "remove_comments": True, "remove_whitespace": True,
+                         "minify_inline_css": True, "minify_inline_js": True, "minify_attributes": True},
+                "css": {"enabled": True, "remove_comments": True, "remove_whitespace": True,
+                        "minify_selectors": True, "optimize_values": True, "merge_rules": True,
+                        "prune": {"enabled": False, "safelist": [], "scan_scripts": True}},
                 "js": {"enabled": True, "remove_comments": True, "remove_whitespace": True}
             },
             "file_settings": {
@@ -50,131 +121,112 @@ class AdvancedCodeCompressor:
             "output_settings": {
                 "default_output_dir": "compressed",
                 "preserve_structure": True,
-                "create_backup": False
+                "create_backup": False,
+                "passthrough": "reflink",
+                "cache": {"enabled": False, "dir": None, "max_size": "512M"},
+                "fingerprint": {"enabled": False, "hash_length": 8, "manifest": "asset-manifest.json"},
+                "bundle": {"enabled": False, "directory": "bundles", "inline_max_size": 2048, "data_uri_max_size": 4096},
+                "precompress": {"enabled": False, "gzip": True, "gzip_level": 9,
+                                "brotli": True, "brotli_quality": 11, "min_size": 1024}
             }
         }
     
     def compress_html(self, content):
         """压缩HTML代码"""
-        if not self.config['compression_settings']['html']['enabled']:
+        compiled = self.compiled
+        if not compiled.html_enabled:
             return content
         
-        settings = self.config['compression_settings']['html']
-        
-        # 删除HTML注释
-        if settings.get('remove_comments', True):
-            content = re.sub(r'<!--(?!\[if).*?-->', '', content, flags=re.DOTALL)
-        
-        # 压缩空白符
-        if settings.get('remove_whitespace', True):
-            # 保留特殊标签内的空白
-            preserve_tags = settings.get('preserve_tags', ['pre', 'textarea', 'script', 'style'])
-            preserved_blocks = []
-            
-            for tag in preserve_tags:
-                pattern = rf'<{tag}[^>]*>.*?</{tag}>'
-                
-                def preserve_block(match):
-                    preserved_blocks.append(match.group(0))
-                    return f'__PRESERVE_BLOCK_{len(preserved_blocks)-1}__'
-                
-                content = re.sub(pattern, preserve_block, content, flags=re.DOTALL | re.IGNORECASE)
-            
-            # 压缩空白符
-            content = re.sub(r'\s+', ' ', content)
-            content = re.sub(r'>\s+<', '><', content)
-            content = re.sub(r'^\s+|\s+$', '', content, flags=re.MULTILINE)
-            
-            # 恢复保留的块
-            for i, block in enumerate(preserved_blocks):
-                content = content.replace(f'__PRESERVE_BLOCK_{i}__', block)
-        
-        return content.strip()
+        # 单遍扫描：删除注释、压缩空白和属性，内联样式和脚本交给 CSS/JS 压缩，保留其他特殊标签内的内容
+        return minify_html(content, **self.html_minifier_options()).strip()
+    
+    def compress_html_stream(self, file_path, output_file):
+        """流式压缩大HTML文件，返回 (原始大小, 压缩后大小, 输出哈希)；无法读取时返回 None"""
+        return minify_html_file(file_path, output_file, chunk_size=self.compiled.html_stream_chunk_size,
+                                **self.html_minifier_options())
+    
+    def html_minifier_options(self):
+        """HTML 压缩器的参数"""
+        compiled = self.compiled
+        return {
+            'remove_comments': compiled.html_remove_comments,
+            'remove_whitespace': compiled.html_remove_whitespace,
+            'preserve_tags': compiled.html_preserve_tags,
+            'minify_css': self.compress_css if compiled.html_minify_inline_css else None,
+            'minify_js': self.compress_js if compiled.html_minify_inline_js else None,
+            'minify_attributes': compiled.html_minify_attributes,
+        }
+    
+    def should_stream(self, file_path):
+        """超过阈值的HTML文件使用流式压缩"""
+        compiled = self.compiled
+        threshold = compiled.html_stream_threshold
+        return (compiled.html_enabled and threshold > 0 and file_path.suffix.lower() == '.html'
+                and file_path.stat().st_size > threshold)
     
     def compress_css(self, content):
         """压缩CSS代码"""
-        if not self.config['compression_settings']['css']['enabled']:
+        compiled = self.compiled
+        if not compiled.css_enabled:
             return content
         
-        settings = self.config['compression_settings']['css']
+        # 删除注释并压缩空白时解析为规则和声明做结构优化；无法解析（CSS 嵌套等）时退回逐字符压缩
+        if compiled.css_remove_comments and compiled.css_remove_whitespace:
+            try:
+                selector_filter = self.selector_index.matches if self.selector_index is not None else None
+                return optimize_css(content, compiled.css_minify_selectors, compiled.css_optimize_values,
+                                    compiled.css_merge_rules, selector_filter)
+            except CSSParseError:
+                pass
         
         # 删除CSS注释
-        if settings.get('remove_comments', True):
-            content = re.sub(r'/\*.*?\*/', '', content, flags=re.DOTALL)
-        
-        # 压缩空白符
-        if settings.get('remove_whitespace', True):
-            content = re.sub(r'\s+', ' ', content)
-            content = re.sub(r'{\s*', '{', content)
-            content = re.sub(r'}\s*', '}', content)
-            content = re.sub(r':\s*', ':', content)
-            content = re.sub(r';\s*', ';', content)
-            content = re.sub(r',\s*', ',', content)
-            content = re.sub(r';\s*}', '}', content)
-            content = re.sub(r'^\s+|\s+$', '', content, flags=re.MULTILINE)
+        if compiled.css_remove_comments:
+            content = CSS_COMMENT_RE.sub('', content)
+        
+        # 压缩空白符：先合并为单个空格，再删除符号后的空格和最后一个分号
+        if compiled.css_remove_whitespace:
+            content = CSS_WHITESPACE_RE.sub(' ', content)
+            for token in CSS_TRIM_AFTER:
+                content = content.replace(token, token[0])
+            content = content.replace(';}', '}')
         
         return content.strip()
     
     def compress_js(self, content):
         """压缩JavaScript代码"""
-        if not self.config['compression_settings']['js']['enabled']:
+        compiled = self.compiled
+        if not compiled.js_enabled:
             return content
         
-        settings = self.config['compression_settings']['js']
-        
-        # 删除注释
-        if settings.get('remove_comments', True):
-            # 保留字符串和正则表达式
-            preserved_strings = []
-            
-            # 保留字符串
-            def preserve_string(match):
-                preserved_strings.append(match.group(0))
-                return f'__STRING_{len(preserved_strings)-1}__'
-            
-            # 匹配字符串
-            content = re.sub(r'"(?:[^"\\]|\\.)*"', preserve_string, content)
-            content = re.sub(r"'(?:[^'\\]|\\.)*'", preserve_string, content)
-            content = re.sub(r'`(?:[^`\\]|\\.)*`', preserve_string, content)
-            
-            # 删除单行注释
-            content = re.sub(r'//.*$', '', content, flags=re.MULTILINE)
-            
-            # 删除多行注释
-            content = re.sub(r'/\*.*?\*/', '', content, flags=re.DOTALL)
-            
-            # 恢复字符串
-            for i, string in enumerate(preserved_strings):
-                content = content.replace(f'__STRING_{i}__', string)
-        
-        # 压缩空白符
-        if settings.get('remove_whitespace', True):
-            content = re.sub(r'\n\s*\n', '\n', content)  # 删除空行
-            content = re.sub(r'^\s+', '', content, flags=re.MULTILINE)  # 删除行首空白
-        
-        return content.strip()
+        # 单遍词法扫描，字符串、模板字符串和正则表达式原样保留
+        return minify_js(content,
+                         remove_comments=compiled.js_remove_comments,
+                         remove_whitespace=compiled.js_remove_whitespace)
     
     def should_skip_file(self, file_path):
         """检查是否应该跳过文件"""
-        skip_patterns = self.config['file_settings']['skip_patterns']
-        file_str = str(file_path)
-        
-        for pattern in skip_patterns:
-            if '*' in pattern:
-                # 通配符匹配
-                import fnmatch
-                if fnmatch.fnmatch(file_path.name, pattern):
-                    return True
-            else:
-                if pattern in file_str:
-                    return True
-        
-        return False
+        return self.compiled.should_skip(file_path)
     
     def is_binary_file(self, file_path):
         """检查是否为二进制文件"""
-        binary_extensions = self.config['file_settings']['binary_extensions']
-        return file_path.suffix.lower() in binary_extensions
+        return file_path.suffix.lower() in self.compiled.binary_extensions
+    
+    def is_passthrough_file(self, file_path):
+        """不需要压缩的文件（二进制文件和非 HTML/CSS/JS 文件）原样输出，不解码"""
+        return self.is_binary_file(file_path) or file_path.suffix.lower() not in MINIFIED_SUFFIXES
+    
+    def passthrough_file(self, file_path, output_file):
+        """原样输出文件，返回 (文件大小, 使用的方式, 预压缩大小)"""
+        sidecar_settings = self.compiled.sidecars
+        if sidecar_settings.enabled:
+            remove_sidecars(output_file)
+        
+        method, size = passthrough_file(file_path, output_file, self.compiled.passthrough_mode)
+        
+        sidecars = None
+        if not self.is_binary_file(file_path) and sidecar_settings.applies_to(output_file, size):
+            sidecars = write_sidecars_from_file(output_file, sidecar_settings)
+        return size, method, sidecars
     
     def create_backup(self, source_dir):
         """创建备份"""
@@ -188,15 +240,13 @@ class AdvancedCodeCompressor:
         shutil.copytree(source_dir, backup_dir)
         return backup_dir
     
-    def compress_file(self, file_path):
-        """压缩单个文件"""
+    def compress_content(self, file_path):
+        """读取并压缩单个文件，不更新统计；返回 (压缩内容, 文件类型, 原始大小)"""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                original_content = f.read()
+            original_content = read_text(file_path)
         except (UnicodeDecodeError, PermissionError):
-            return None, None
+            return None, None, 0
         
-        original_size = len(original_content)
         suffix = file_path.suffix.lower()
         
         if suffix == '.html':
@@ -212,18 +262,177 @@ class AdvancedCodeCompressor:
             compressed_content = original_content
             file_type = 'other'
         
+        return compressed_content, file_type, len(original_content)
+    
+    def update_stats(self, file_type, original_size, compressed_size, sidecars=None, sign=1):
+        """累加单个文件的统计（sign=-1 时减去，用于监视模式下替换或删除已统计的文件）"""
+        self.stats[file_type]['original'] += sign * original_size
+        self.stats[file_type]['compressed'] += sign * compressed_size
+        self.stats[file_type]['saved'] += sign * (original_size - compressed_size)
+        self.stats[file_type]['files'] += sign
+        if sidecars:
+            self.stats[file_type]['precompressed'] += sign * sidecars['input']
+            self.stats[file_type]['gzip'] += sign * sidecars['gzip']
+            self.stats[file_type]['brotli'] += sign * sidecars['brotli']
+    
+    def reset_stats(self):
+        """清空统计"""
+        for stats in self.stats.values():
+            for key in stats:
+                stats[key] = 0
+        self.cache_hits = 0
+    
+    def compress_file(self, file_path):
+        """压缩单个文件"""
+        compressed_content, file_type, original_size = self.compress_content(file_path)
+        if compressed_content is None:
+            return None, None
+        
         compressed_size = len(compressed_content)
         saved_size = original_size - compressed_size
         
         # 更新统计
-        self.stats[file_type]['original'] += original_size
-        self.stats[file_type]['compressed'] += compressed_size
-        self.stats[file_type]['saved'] += saved_size
-        self.stats[file_type]['files'] += 1
+        self.update_stats(file_type, original_size, compressed_size)
         
         return compressed_content, (original_size, compressed_size, saved_size)
     
-    def compress_directory(self, source_dir, output_dir):
+    def process_text_file(self, file_path, output_file, source_hash=None):
+        """压缩并写出文本文件，返回 (文件类型, 原始大小, 压缩后大小, 输出哈希, 预压缩大小, 是否命中缓存)；
+        无法读取时返回 None
+        
+        不修改 self.stats，便于在工作进程中调用后由主进程按顺序合并统计
+        """
+        sidecar_settings = self.compiled.sidecars
+        if sidecar_settings.enabled:
+            remove_sidecars(output_file)
+        
+        # 输出文件可能与缓存对象、带哈希的文件名或合并前的副本是硬链接，先删除再写入，
+        # 原地覆盖会同时改掉这些本应不变的文件
+        output_file.unlink(missing_ok=True)
+        
+        cache = self.output_cache
+        cache_key = None
+        if cache is not None:
+            cache_key = cache.key(source_hash or hash_file(file_path), MINIFIED_SUFFIXES.get(file_path.suffix.lower(), 'other'),
+                                  self.output_variant(file_path))
+            meta = cache.lookup(cache_key)
+            if meta is not None and cache.restore(cache_key, output_file, self.compiled.passthrough_mode):
+                sidecars = None
+                if sidecar_settings.applies_to(output_file, output_file.stat().st_size):
+                    sidecars = write_sidecars_from_file(output_file, sidecar_settings)
+                return meta['type'], meta['original'], meta['compressed'], meta['output_hash'], sidecars, True
+        
+        if self.should_stream(file_path):
+            result = self.compress_html_stream(file_path, output_file)
+            if result is None:
+                return None
+            original_size, compressed_size, output_hash = result
+            self.store_in_cache(cache_key, 'html', original_size, compressed_size, output_hash, file=output_file)
+            sidecars = None
+            if sidecar_settings.applies_to(output_file, output_file.stat().st_size):
+                sidecars = write_sidecars_from_file(output_file, sidecar_settings)
+            return 'html', original_size, compressed_size, output_hash, sidecars, False
+        
+        compressed_content, file_type, original_size = self.compress_content(file_path)
+        if compressed_content is None:
+            return None
+        
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(compressed_content)
+        
+        data = compressed_content.encode('utf-8')
+        output_hash = hash_bytes(data)
+        self.store_in_cache(cache_key, file_type, original_size, len(compressed_content), output_hash, data=data)
+        sidecars = None
+        if sidecar_settings.applies_to(output_file, len(data)):
+            # 直接使用内存中的压缩结果，无需再次读取输出文件
+            sidecars = write_sidecars(output_file, data, sidecar_settings)
+        
+        return file_type, original_size, len(compressed_content), output_hash, sidecars, False
+    
+    def store_in_cache(self, cache_key, file_type, original_size, compressed_size, output_hash, data=None, file=None):
+        """把压缩结果存入共享缓存；写入失败（磁盘满、无权限等）不影响压缩"""
+        if cache_key is None:
+            return
+        meta = {'type': file_type, 'original': original_size, 'compressed': compressed_size, 'output_hash': output_hash}
+        try:
+            if data is not None:
+                self.output_cache.store_bytes(cache_key, data, meta)
+            else:
+                self.output_cache.store_file(cache_key, file, meta)
+        except OSError:
+            pass
+    
+    def record_passthrough(self, manifest, file_path, rel_path, output_file, source_hash, stat):
+        """原样输出文件（链接或内核内复制，不解码），更新统计和清单"""
+        size, method, sidecars = self.passthrough_file(file_path, output_file)
+        self.update_stats('other', size, size, sidecars)
+        manifest.record(rel_path, file_path, source_hash, 'other', size, size, source_hash, sidecars, stat)
+        action = '已链接' if method == 'hardlink' else '已复制'
+        print(f"📄 {rel_path}: {action} ({size:,} bytes, {method})")
+    
+    def record_text_result(self, manifest, file_path, rel_path, source_hash, stat, result):
+        """合并 process_text_file 的结果：更新统计和清单，输出日志"""
+        if result is None:
+            return
+        file_type, original_size, compressed_size, output_hash, sidecars, cached = result
+        self.update_stats(file_type, original_size, compressed_size, sidecars)
+        manifest.record(rel_path, file_path, source_hash, file_type,
+                        original_size, compressed_size, output_hash, sidecars, stat, self.output_variant(file_path))
+        
+        saved_size = original_size - compressed_size
+        reduction = (saved_size / original_size * 100) if original_size > 0 else 0
+        note = " (缓存)" if cached else ""
+        self.cache_hits += cached
+        
+        if saved_size > 0:
+            print(f"✅ {rel_path}: {original_size:,} → {compressed_size:,} bytes (-{reduction:.1f}%){note}")
+        else:
+            print(f"📄 {rel_path}: {original_size:,} bytes (无压缩){note}")
+    
+    def prepare_pruning(self, source_path):
+        """建立未使用 CSS 清理的索引（每次运行一次，所有样式表共用）"""
+        self.selector_index = None
+        settings = self.compiled.css_prune
+        if not (settings.enabled and self.compiled.css_enabled):
+            return
+        index = build_selector_index(source_path, self.compiled, settings)
+        if not index.documents:
+            print("⚠️  未使用 CSS 清理: 源目录中没有 HTML 文件，不清理")
+            return
+        # 先计算索引哈希，传给工作进程的索引中已包含
+        index.digest()
+        self.selector_index = index
+        print(f"✂️  未使用 CSS 清理: 索引 {index.documents} 个 HTML 文件"
+              f"（{len(index.classes)} 个 class，{len(index.ids)} 个 id，{len(index.tags)} 种标签）")
+    
+    def output_variant(self, file_path):
+        """源文件以外影响输出的因素：启用清理时 CSS 和 HTML（内联样式）的输出取决于索引"""
+        if self.selector_index is None or file_path.suffix.lower() not in ('.css',) + INDEX_SUFFIXES:
+            return None
+        return self.selector_index.digest()
+    
+    def run_bundle(self, output_path, manifest):
+        """资源合并：在全部文件压缩完成后处理 HTML 引用的 CSS/JS，返回生成的合并文件 {相对路径: 内容哈希}"""
+        if not self.compiled.bundle.enabled:
+            return {}
+        bundler = AssetBundler(output_path, self.compiled.bundle, self.compiled.sidecars)
+        bundles, inlined, rewritten = bundler.run({key: entry['output_hash'] for key, entry in manifest.entries.items()})
+        print(f"🧩 资源合并: 生成 {bundles} 个合并文件，内联 {inlined} 个资源，改写 {rewritten} 个页面")
+        return bundler.outputs
+    
+    def run_fingerprint(self, output_path, manifest, bundles=None):
+        """资源指纹：在全部文件压缩完成后按依赖顺序处理（清单中已有输出哈希，资源文件无需再次读取）"""
+        if not self.compiled.fingerprint.enabled:
+            return
+        fingerprinter = AssetFingerprinter(output_path, self.compiled.fingerprint, self.compiled.sidecars)
+        output_hashes = {key: entry['output_hash'] for key, entry in manifest.entries.items()}
+        output_hashes.update(bundles or {})
+        hashed, rewritten = fingerprinter.run(output_hashes)
+        print(f"🔖 资源指纹: {hashed} 个文件使用带哈希的文件名，改写 {rewritten} 个文件中的引用"
+              f"（清单: {self.compiled.fingerprint.manifest}）")
+    
+    def compress_directory(self, source_dir, output_dir, backup=True):
         """压缩目录"""
         source_path = Path(source_dir)
         output_path = Path(output_dir)
@@ -233,52 +442,200 @@ class AdvancedCodeCompressor:
         print("=" * 80)
         
         # 创建备份
-        backup_dir = self.create_backup(source_path)
+        backup_dir = self.create_backup(source_path) if backup else None
         
-        # 创建输出目录
-        if output_path.exists():
-            shutil.rmtree(output_path)
-        output_path.mkdir(parents=True)
+        # 创建输出目录（增量模式下清单有效时保留已有输出）
+        manifest = BuildManifest(output_path, hash_config(self.config, CACHE_FINGERPRINT_MODULES))
+        self.manifest = manifest
+        incremental = manifest.prepare_output(self.incremental)
+        if incremental:
+            print("♻️  增量模式：跳过未变化的文件")
+        self.prepare_pruning(source_path)
         
-        # 遍历文件
-        processed_files = 0
-        for file_path in source_path.rglob('*'):
-            if file_path.is_file() and not self.should_skip_file(file_path):
-                rel_path = file_path.relative_to(source_path)
+        # 惰性扫描：跳过的目录不进入，未变化的文件直接沿用清单中的统计
+        skipped_files = 0
+        
+        def iter_entries():
+            nonlocal skipped_files
+            compiled = self.compiled
+            for scanned in scan_tree(source_path, compiled.source_skip_dir(output_path), compiled.should_skip,
+                                     compiled.ignore_file):
+                file_path, rel_path = scanned.path, scanned.rel_path
                 output_file = output_path / rel_path
+                
+                unchanged, source_hash = manifest.check(rel_path, file_path, output_file, scanned.stat,
+                                                        self.output_variant(file_path))
+                if unchanged:
+                    entry = manifest.get(rel_path)
+                    self.update_stats(entry['type'], entry['original'], entry['compressed'], entry.get('sidecars'))
+                    skipped_files += 1
+                    continue
+                
                 output_file.parent.mkdir(parents=True, exist_ok=True)
+                yield file_path, rel_path, output_file, self.is_passthrough_file(file_path), source_hash, scanned.stat
+        
+        executor = None
+        processed_files = 0
+        
+        def record(entry, result=None):
+            nonlocal processed_files
+            file_path, rel_path, output_file, is_passthrough, source_hash, stat = entry
+            if is_passthrough:
+                self.record_passthrough(manifest, file_path, rel_path, output_file, source_hash, stat)
+            else:
+                self.record_text_result(manifest, file_path, rel_path, source_hash, stat, result)
+            processed_files += 1
+        
+        try:
+            if self.jobs > 1:
+                # 扫描的同时按批提交给工作进程，已提交未完成的批次数有上限（扫描过快时等待最早的批次）；
+                # 主进程按扫描顺序合并统计和输出日志
+                executor = ProcessPoolExecutor(max_workers=self.jobs, initializer=_init_worker,
+                                               initargs=(self.config, self.selector_index))
+                max_pending = self.jobs * PARALLEL_BATCHES_PER_JOB
+                # 按扫描顺序排列的 (本批条目, 压缩其中文本文件的 future)
+                pending = deque()
+                
+                def finish_batch():
+                    batch, future = pending.popleft()
+                    results = iter(future.result() if future is not None else ())
+                    for entry in batch:
+                        record(entry, None if entry[3] else next(results))
                 
-                if self.is_binary_file(file_path):
-                    # 复制二进制文件
-                    shutil.copy2(file_path, output_file)
-                    size = file_path.stat().st_size
-                    self.stats['other']['original'] += size
-                    self.stats['other']['compressed'] += size
-                    self.stats['other']['files'] += 1
-                    print(f"📄 {rel_path}: 已复制 ({size:,} bytes)")
-                else:
-                    # 压缩文本文件
-                    result = self.compress_file(file_path)
-                    if result[0] is not None:
-                        compressed_content, sizes = result
-                        
-                        with open(output_file, 'w', encoding='utf-8') as f:
-                            f.write(compressed_content)
-                        
-                        original_size, compressed_size, saved_size = sizes
-                        reduction = (saved_size / original_size * 100) if original_size > 0 else 0
-                        
-                        if saved_size > 0:
-                            print(f"✅ {rel_path}: {original_size:,} → {compressed_size:,} bytes (-{reduction:.1f}%)")
-                        else:
-                            print(f"📄 {rel_path}: {original_size:,} bytes (无压缩)")
+                def submit_batch(batch):
+                    tasks = [(entry[0], entry[2], entry[4]) for entry in batch if not entry[3]]
+                    pending.append((batch, executor.submit(_process_in_worker, tasks) if tasks else None))
+                    while pending and (len(pending) > max_pending or pending[0][1] is None or pending[0][1].done()):
+                        finish_batch()
                 
-                processed_files += 1
+                batch = []
+                for entry in iter_entries():
+                    batch.append(entry)
+                    if len(batch) >= PARALLEL_CHUNKSIZE:
+                        submit_batch(batch)
+                        batch = []
+                if batch:
+                    submit_batch(batch)
+                while pending:
+                    finish_batch()
+            else:
+                # 串行模式边扫描边处理
+                for entry in iter_entries():
+                    record(entry, None if entry[3] else self.process_text_file(entry[0], entry[2], entry[4]))
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+        
+        # 清理源文件已删除的输出，并保存清单
+        for removed in manifest.remove_stale(SIDECAR_SUFFIXES):
+            print(f"🗑️  {removed}: 源文件已删除，移除输出")
+        
+        bundles = self.run_bundle(output_path, manifest)
+        self.run_fingerprint(output_path, manifest, bundles)
+        manifest.save()
+        
+        # 缓存超过大小上限时淘汰最久未使用的条目
+        if self.output_cache is not None:
+            removed, freed = self.output_cache.prune()
+            if removed:
+                print(f"🗃️  压缩缓存淘汰 {removed} 个条目，释放 {format_size(freed)}")
         
         print(f"\n✨ 处理完成！共处理 {processed_files} 个文件")
+        if skipped_files:
+            print(f"♻️  跳过 {skipped_files} 个未变化的文件")
+        if self.cache_hits:
+            print(f"🗃️  {self.cache_hits} 个文件使用了压缩缓存中的结果")
         if backup_dir:
             print(f"📦 备份保存在: {backup_dir}")
     
+    def update_paths(self, source_dir, output_dir, paths):
+        """监视模式：只处理变化的文件，更新对应的输出、清单和统计；返回 (更新的文件数, 删除的输出数)
+        
+        需要先调用 compress_directory。目录的增删改名、忽略文件的变化无法逐个文件处理，
+        这时以增量模式重新同步整个源目录（未变化的文件只比较 stat），返回 None
+        """
+        source_path = Path(source_dir)
+        output_path = Path(output_dir)
+        source_root = source_path.absolute()
+        manifest = self.manifest
+        compiled = self.compiled
+        
+        rel_paths = set()
+        for path in paths:
+            try:
+                rel_path = Path(path).absolute().relative_to(source_root)
+            except ValueError:
+                continue
+            file_path = source_path / rel_path
+            key = rel_path.as_posix()
+            if (file_path.name == compiled.ignore_file or file_path.is_dir()
+                    or (not file_path.exists() and any(entry.startswith(key + '/') for entry in manifest.entries))):
+                return self.resync(source_dir, output_dir)
+            rel_paths.add(rel_path)
+        
+        # HTML/JS 变化可能改变未使用 CSS 清理的索引，索引变化时所有 CSS 都需要重新处理
+        if compiled.css_prune.enabled and compiled.css_enabled and any(path.suffix.lower() in INDEX_SUFFIXES + SCRIPT_SUFFIXES
+                                                  for path in rel_paths):
+            previous = self.selector_index.digest() if self.selector_index is not None else None
+            index = build_selector_index(source_path, compiled, compiled.css_prune)
+            if (index.digest() if index.documents else None) != previous:
+                return self.resync(source_dir, output_dir)
+        
+        skip_dir = compiled.source_skip_dir(output_path)
+        updated = removed = 0
+        for rel_path in sorted(rel_paths):
+            file_path = source_path / rel_path
+            output_file = output_path / rel_path
+            old = manifest.get(rel_path)
+            excluded = not file_path.is_file() or is_excluded(
+                source_path, rel_path, skip_dir, compiled.should_skip, compiled.ignore_file)
+            if not excluded:
+                try:
+                    stat = file_path.stat()
+                except FileNotFoundError:
+                    # 检查之后文件被删除（编辑器保存时常见），按删除处理
+                    excluded = True
+            
+            if excluded:
+                if old is not None:
+                    self.update_stats(old['type'], old['original'], old['compressed'], old.get('sidecars'), sign=-1)
+                    manifest.remove(rel_path, SIDECAR_SUFFIXES)
+                    print(f"🗑️  {rel_path}: 源文件已删除，移除输出")
+                    removed += 1
+                continue
+            
+            unchanged, source_hash = manifest.check(rel_path, file_path, output_file, stat, self.output_variant(file_path))
+            if unchanged:
+                continue
+            if old is not None:
+                self.update_stats(old['type'], old['original'], old['compressed'], old.get('sidecars'), sign=-1)
+            
+            output_file.parent.mkdir(parents=True, exist_ok=True)
+            if self.is_passthrough_file(file_path):
+                self.record_passthrough(manifest, file_path, rel_path, output_file, source_hash, stat)
+            else:
+                result = self.process_text_file(file_path, output_file, source_hash)
+                if result is None and old is not None:
+                    manifest.remove(rel_path, SIDECAR_SUFFIXES)
+                self.record_text_result(manifest, file_path, rel_path, source_hash, stat, result)
+            updated += 1
+        
+        if updated or removed:
+            bundles = self.run_bundle(output_path, manifest)
+            self.run_fingerprint(output_path, manifest, bundles)
+            manifest.save()
+        return updated, removed
+    
+    def resync(self, source_dir, output_dir):
+        """以增量模式重新同步整个源目录，统计从清单重新累加"""
+        self.reset_stats()
+        incremental, self.incremental = self.incremental, True
+        try:
+            self.compress_directory(source_dir, output_dir, backup=False)
+        finally:
+            self.incremental = incremental
+        return None
+    
     def print_summary(self):
         """打印统计报告"""
         print("\n" + "=" * 80)
@@ -303,17 +660,84 @@ class AdvancedCodeCompressor:
               f"{total_original:>9,} → {total_compressed:>9,} bytes | "
               f"节省 {total_saved:>8,} bytes ({total_reduction:>5.1f}%)")
         
+        # 预压缩统计（相对于压缩后的文件大小）
+        if any(stats['precompressed'] for stats in self.stats.values()):
+            print("-" * 80)
+            print("📦 预压缩文件 (.gz / .br)")
+            for file_type, stats in self.stats.items():
+                if stats['precompressed'] > 0:
+                    line = f"{file_type.upper():>6}: {stats['precompressed']:>9,} bytes"
+                    for key, label in (('gzip', 'gzip'), ('brotli', 'brotli')):
+                        if stats[key]:
+                            reduction = (1 - stats[key] / stats['precompressed']) * 100
+                            line += f" | {label} {stats[key]:>9,} bytes (-{reduction:>4.1f}%)"
+                    print(line)
+        
         print(f"\n🎉 压缩完成！总共节省了 {total_saved:,} bytes ({total_reduction:.1f}%)")
 
 
+def cache_main(argv):
+    """压缩结果缓存管理：cache stats / cache prune"""
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument('-c', '--config', default='compress_config.json', help='配置文件路径（读取缓存目录和大小上限）')
+    common.add_argument('--cache-dir', help='缓存目录')
+    parser = argparse.ArgumentParser(prog='compress_advanced.py cache', description='压缩结果缓存管理')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('stats', parents=[common], help='显示缓存统计')
+    prune_parser = subparsers.add_parser('prune', parents=[common], help='按最近使用时间淘汰缓存条目')
+    prune_parser.add_argument('--max-size', type=parse_size, help='淘汰到不超过此大小（如 100M，默认使用配置中的上限）')
+    prune_parser.add_argument('--all', action='store_true', help='清空缓存')
+    
+    args = parser.parse_args(argv)
+    
+    compressor = AdvancedCodeCompressor(args.config)
+    settings = compressor.compiled.cache
+    cache = OutputCache(args.cache_dir or settings.directory, settings.max_size)
+    
+    if args.command == 'stats':
+        stats = cache.stats()
+        print("🗃️  压缩结果缓存")
+        print("=" * 80)
+        print(f"📁 缓存目录: {stats['directory']}")
+        print(f"📦 条目数: {stats['entries']:,}")
+        print(f"💾 总大小: {format_size(stats['size'])} / 上限 {format_size(stats['max_size'])}")
+        for key, label in (('oldest', '最久未使用'), ('newest', '最近使用')):
+            if stats[key] is not None:
+                print(f"🕒 {label}: {datetime.fromtimestamp(stats[key]).strftime('%Y-%m-%d %H:%M:%S')}")
+    else:
+        max_size = 0 if args.all else args.max_size
+        removed, freed = cache.prune(max_size)
+        print(f"🗑️  淘汰 {removed} 个条目，释放 {format_size(freed)}")
+
+
 def main():
     """主函数"""
+    # 缓存管理子命令（源目录名恰好是 cache 时请写成 ./cache）
+    if len(sys.argv) > 1 and sys.argv[1] == 'cache':
+        cache_main(sys.argv[2:])
+        return
+    
     parser = argparse.ArgumentParser(description='高级代码压缩工具')
     parser.add_argument('source', nargs='?', default='.', help='源目录路径')
     parser.add_argument('output', nargs='?', default='compressed', help='输出目录路径')
     parser.add_argument('-c', '--config', default='compress_config.json', help='配置文件路径')
     parser.add_argument('-b', '--backup', action='store_true', help='创建备份')
     parser.add_argument('-y', '--yes', action='store_true', help='跳过确认')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='并行压缩的进程数（0 表示使用全部CPU核心）')
+    parser.add_argument('-i', '--incremental', action='store_true', help='增量压缩，只处理变化的文件')
+    parser.add_argument('-z', '--precompress', action='store_true', help='同时生成 .gz/.br 预压缩文件')
+    parser.add_argument('--passthrough', choices=PASSTHROUGH_MODES,
+                        help='不需要压缩的文件的输出方式（默认 reflink，不支持时内核内复制；hardlink 与源文件共享数据）')
+    parser.add_argument('--fingerprint', action='store_true', help='为 CSS/JS/图片生成带内容哈希的文件名并改写引用')
+    parser.add_argument('--bundle', action='store_true', help='合并页面引用的 CSS/JS，小资源内联到 HTML')
+    parser.add_argument('--prune-css', action='store_true', help='删除源目录的 HTML 中没有用到的 CSS 规则')
+    parser.add_argument('--safelist', action='append', default=[], metavar='PATTERN',
+                        help='清理未使用 CSS 时始终保留的 class/id/标签名（可使用通配符，可多次指定）')
+    parser.add_argument('-w', '--watch', action='store_true', help='压缩后持续监视源目录，只重新处理变化的文件（隐含 -i）')
+    parser.add_argument('--debounce', type=float, default=DEFAULT_DEBOUNCE * 1000, help='监视模式的防抖时间（毫秒）')
+    parser.add_argument('--poll', action='store_true', help='监视模式强制使用轮询（默认在安装了 watchdog 时使用系统通知）')
+    parser.add_argument('--cache', action='store_true', help='启用共享的压缩结果缓存，相同内容的文件只压缩一次')
+    parser.add_argument('--cache-dir', help='压缩结果缓存目录（指定时自动启用缓存）')
     
     args = parser.parse_args()
     
@@ -321,16 +745,44 @@ def main():
     print("=" * 80)
     
     # 创建压缩器
-    compressor = AdvancedCodeCompressor(args.config)
+    jobs = args.jobs if args.jobs > 0 else (os.cpu_count() or 1)
+    compressor = AdvancedCodeCompressor(args.config, jobs=jobs, incremental=args.incremental or args.watch)
     
     # 设置备份选项
     if args.backup:
         compressor.config['output_settings']['create_backup'] = True
     
+    # 设置预压缩和直通文件选项（属于编译后的配置，需要重新编译）
+    if args.precompress:
+        compressor.config['output_settings'].setdefault('precompress', {})['enabled'] = True
+        if brotli is None:
+            print("⚠️  未安装 brotli 模块，只生成 .gz 文件")
+    if args.passthrough:
+        compressor.config['output_settings']['passthrough'] = args.passthrough
+    if args.cache or args.cache_dir:
+        cache_settings = compressor.config['output_settings'].setdefault('cache', {})
+        cache_settings['enabled'] = True
+        if args.cache_dir:
+            cache_settings['dir'] = args.cache_dir
+    if args.fingerprint:
+        compressor.config['output_settings'].setdefault('fingerprint', {})['enabled'] = True
+    if args.bundle:
+        compressor.config['output_settings'].setdefault('bundle', {})['enabled'] = True
+    if args.prune_css or args.safelist:
+        prune_settings = compressor.config['compression_settings']['css'].setdefault('prune', {})
+        prune_settings['enabled'] = True
+        prune_settings['safelist'] = list(prune_settings.get('safelist', [])) + args.safelist
+    if (args.precompress or args.passthrough or args.cache or args.cache_dir or args.fingerprint or args.bundle
+            or args.prune_css or args.safelist):
+        compressor.recompile()
+    
     # 显示配置信息
     print(f"📂 源目录: {Path(args.source).absolute()}")
     print(f"📂 输出目录: {Path(args.output).absolute()}")
     print(f"⚙️  配置文件: {args.config}")
+    print(f"🧵 并行进程: {jobs}")
+    if compressor.output_cache is not None:
+        print(f"🗃️  压缩缓存: {compressor.output_cache.directory}")
     
     # 确认操作
     if not args.yes:
@@ -341,6 +793,9 @@ def main():
     
     # 开始压缩
     try:
+        if args.watch:
+            watch(compressor, args.source, args.output, args.debounce / 1000, args.poll, DEFAULT_POLL_INTERVAL)
+            return
         compressor.compress_directory(args.source, args.output)
         compressor.print_summary()
     except KeyboardInterrupt:
@@ -0,0 +1,615 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CSS 结构优化器
+把样式表解析为规则和声明后再输出：
+- 缩短颜色（#ffffff → #fff、rgb(255,0,0) → red）、去掉长度 0 的单位、缩短数字（0.50 → .5）
+- 压缩选择器和 @media 等条件中的空白
+- 合并重复的选择器（中间没有规则设置相同属性时才移动）、合并相邻的声明完全相同的规则、删除被覆盖的声明
+字符串、url() 原样保留，calc() 等函数中的 + - 两侧的空格保留。
+解析失败（括号不匹配、CSS 嵌套等）时抛出 CSSParseError，由调用方退回简单压缩
+"""
+
+import re
+from functools import lru_cache
+
+# 把样式表切分为 文本、分隔符、文本……：分隔符为注释、字符串、url() 和花括号；
+# 分号只在文本片段中才有意义（字符串和 url() 中可以有分号），由解析时再按分号切分文本
+_CSS_SPLIT_RE = re.compile(r'''(
+    /\*.*?(?:\*/|\Z)
+  | "(?:[^"\\\n]|\\.)*" | '(?:[^'\\\n]|\\.)*'
+  | [uU][rR][lL]\(\s*(?:"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'|[^"')\s]*)\s*\)
+  | [{}]
+)''', re.VERBOSE | re.DOTALL)
+
+# 属性值的词法单元
+_VALUE_TOKEN_RE = re.compile(r'''
+    (?P<string>"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')
+  | (?P<url>url\(\s*(?:"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'|[^"')\s]*)\s*\))
+  | (?P<ws>\s+)
+  | (?P<hash>\#[\w-]+)
+  | (?P<func>-?[^\W\d][\w-]*\()
+  | (?P<ident>-?[^\W\d][\w-]*|--[\w-]*)
+  | (?P<number>[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:e[+-]?\d+)?)(?P<unit>%|[^\W\d]+)?
+  | (?P<other>.)
+''', re.VERBOSE | re.DOTALL | re.IGNORECASE)
+
+# 字符串和 url()，压缩选择器和条件时原样保留
+_STRING_OR_URL_RE = re.compile(r'''("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*'|url\([^)]*\))''', re.IGNORECASE)
+
+_WS_RE = re.compile(r'\s+')
+_SELECTOR_TRIM_RE = re.compile(r' ?([>+~,]) ?|(\() | (\))')
+_PRELUDE_TRIM_RE = re.compile(r' ?(,) ?|(:) |(\() | (\))')
+_IMPORTANT_RE = re.compile(r'\s*!\s*important\s*$', re.IGNORECASE)
+_AT_NAME_RE = re.compile(r'@(?:-[a-z]+-)?([\w-]+)', re.IGNORECASE)
+_RGB_RE = re.compile(r'\brgb\(\s*(\d{1,3})\s*[,\s]\s*(\d{1,3})\s*[,\s]\s*(\d{1,3})\s*\)', re.IGNORECASE)
+_PSEUDO_RE = re.compile(r'::?([\w-]+)')
+_VENDOR_PREFIX_RE = re.compile(r'^-[a-z]+-')
+
+# 包含规则的 @ 规则（递归优化）；keyframes 中的规则不合并
+_NESTED_AT_RULES = frozenset(['media', 'supports', 'layer', 'container', 'document', 'scope', 'starting-style'])
+_KEYFRAMES_AT_RULES = frozenset(['keyframes'])
+# 包含声明的 @ 规则：其中的描述符不作用于元素，不影响规则合并
+_DECLARATION_AT_RULES = frozenset(['font-face', 'page', 'counter-style', 'property', 'viewport', 'font-palette-values'])
+
+# 可以去掉单位的长度单位（百分比、时间、角度不能去掉）
+_LENGTH_UNITS = frozenset(['px', 'em', 'rem', 'ex', 'ch', 'vw', 'vh', 'vmin', 'vmax', 'cm', 'mm', 'in', 'pt', 'pc', 'q'])
+
+# 这些属性中 0 和 0px 含义不同（flex: 1 0px 与 flex: 1 0）
+_KEEP_ZERO_UNIT_PROPERTIES = frozenset(['flex', 'flex-basis', '-webkit-flex', '-ms-flex'])
+
+# 这些属性的值不做数值和颜色优化
+_RAW_VALUE_PROPERTIES = frozenset(['unicode-range', 'filter', '-ms-filter'])
+
+# 比十六进制写法更短的颜色名
+_SHORTER_COLOR_NAMES = {
+    '#f00': 'red', '#c0c0c0': 'silver', '#808080': 'gray', '#800000': 'maroon', '#800080': 'purple',
+    '#008000': 'green', '#808000': 'olive', '#000080': 'navy', '#008080': 'teal', '#ffa500': 'orange',
+    '#d2b48c': 'tan', '#fa8072': 'salmon', '#ffc0cb': 'pink', '#dda0dd': 'plum', '#ee82ee': 'violet',
+    '#f5deb3': 'wheat', '#ff6347': 'tomato', '#a52a2a': 'brown', '#ffd700': 'gold', '#4b0082': 'indigo',
+    '#fffff0': 'ivory', '#f0e68c': 'khaki', '#faf0e6': 'linen', '#da70d6': 'orchid', '#cd853f': 'peru',
+    '#a0522d': 'sienna', '#fffafa': 'snow', '#f5f5dc': 'beige', '#ffe4c4': 'bisque', '#ff7f50': 'coral',
+    '#f0ffff': 'azure',
+}
+
+# 所有浏览器都支持的关键字：同一属性的两个值都只由这些关键字、数值和颜色组成时，前一个不可能是兼容写法
+_UNIVERSAL_KEYWORDS = frozenset('''
+    auto none inherit normal bold bolder lighter italic oblique underline overline line-through
+    block inline inline-block list-item table table-row table-cell hidden visible scroll absolute relative
+    fixed static left right center top bottom middle baseline justify solid dashed dotted double groove ridge
+    inset outset transparent pointer default move text wait help crosshair nowrap pre pre-wrap pre-line
+    both collapse separate repeat repeat-x repeat-y no-repeat uppercase lowercase capitalize small-caps
+    disc circle square decimal outside inside thin medium thick small large x-small x-large smaller larger
+    black white red green blue yellow gray grey silver maroon purple navy teal olive lime aqua fuchsia orange
+'''.split())
+_UNIVERSAL_TOKEN_RE = re.compile(r'^(?:[+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:px|em|ex|pt|pc|cm|mm|in|%|s|ms|deg)?'
+                                 r'|#[0-9a-f]{3}|#[0-9a-f]{6})$', re.IGNORECASE)
+
+# 合并相邻规则的选择器列表时，只要有一个选择器不被浏览器识别整条规则就会失效；只合并这些伪类/伪元素
+_SAFE_PSEUDOS = frozenset('''
+    hover active focus visited link first-child last-child only-child nth-child nth-last-child
+    first-of-type last-of-type only-of-type nth-of-type nth-last-of-type not empty root target checked
+    disabled enabled before after first-letter first-line lang
+'''.split())
+
+# 属性族：改变属性所属的族时需要考虑简写属性（margin 与 margin-top）
+_EXTRA_FAMILIES = {
+    'line-height': {'font'}, 'top': {'inset'}, 'right': {'inset'}, 'bottom': {'inset'}, 'left': {'inset'},
+    'columns': {'column'}, 'gap': {'column', 'row', 'grid'}, 'column-gap': {'gap'}, 'row-gap': {'gap'},
+    'grid-gap': {'gap', 'column', 'row'}, 'grid-row-gap': {'gap', 'row'}, 'grid-column-gap': {'gap', 'column'},
+    'place-items': {'align', 'justify'}, 'place-content': {'align', 'justify'}, 'place-self': {'align', 'justify'},
+    'white-space': {'text'}, 'word-wrap': {'overflow'}, 'page-break-before': {'break'},
+    'page-break-after': {'break'}, 'page-break-inside': {'break'},
+    'inline-size': {'width', 'height'}, 'block-size': {'width', 'height'},
+}
+_ALL = '*'
+
+
+class CSSParseError(ValueError):
+    """无法解析的样式表"""
+
+
+class Declaration:
+    __slots__ = ('prop', 'value', 'important')
+
+    def __init__(self, prop, value, important=False):
+        self.prop = prop
+        self.value = value
+        self.important = important
+
+    def __str__(self):
+        if self.prop is None:
+            return self.value
+        return f"{self.prop}:{self.value}{'!important' if self.important else ''}"
+
+
+class Rule:
+    __slots__ = ('selector', 'declarations')
+
+    def __init__(self, selector, declarations):
+        self.selector = selector
+        self.declarations = declarations
+
+    def __str__(self):
+        return f"{self.selector}{{{_join_declarations(self.declarations)}}}"
+
+
+class AtRule:
+    """@ 规则：body 为 None（语句）、子规则列表或声明列表"""
+    __slots__ = ('prelude', 'name', 'body', 'has_rules')
+
+    def __init__(self, prelude, body=None, has_rules=False):
+        self.prelude = prelude
+        match = _AT_NAME_RE.match(prelude)
+        self.name = match.group(1).lower() if match else ''
+        self.body = body
+        self.has_rules = has_rules
+
+    def __str__(self):
+        if self.body is None:
+            return f"{self.prelude};"
+        if self.has_rules:
+            return f"{self.prelude}{{{''.join(map(str, self.body))}}}"
+        return f"{self.prelude}{{{_join_declarations(self.body)}}}"
+
+
+class Comment:
+    """保留的 /*! 注释（版权声明）"""
+    __slots__ = ('text',)
+
+    def __init__(self, text):
+        self.text = text
+
+    def __str__(self):
+        return self.text
+
+
+def _join_declarations(declarations):
+    return ';'.join(map(str, declarations))
+
+
+# ---------------------------------------------------------------------------
+# 解析
+# ---------------------------------------------------------------------------
+
+def _parse(content):
+    parts = _CSS_SPLIT_RE.split(content)
+    nodes, pos = _parse_rules(parts, 0, top=True)
+    return nodes
+
+
+def _parse_rules(parts, pos, top):
+    nodes = []
+    buffer = []
+
+    def end_statement():
+        statement = ''.join(buffer).strip()
+        buffer.clear()
+        if statement.startswith('@'):
+            nodes.append(AtRule(statement))
+        elif statement:
+            raise CSSParseError(f'规则外的声明: {statement[:40]}')
+
+    while pos < len(parts):
+        text = parts[pos]
+        pos += 1
+        if not text:
+            continue
+        if pos % 2:
+            # 偶数位置是普通文本，@import 等语句以分号结束
+            if ';' in text:
+                pieces = text.split(';')
+                for piece in pieces[:-1]:
+                    buffer.append(piece)
+                    end_statement()
+                text = pieces[-1]
+            buffer.append(text)
+        elif text == '{':
+            prelude = ''.join(buffer).strip()
+            buffer.clear()
+            if prelude.startswith('@'):
+                at_rule = AtRule(prelude)
+                if at_rule.name in _NESTED_AT_RULES or at_rule.name in _KEYFRAMES_AT_RULES:
+                    at_rule.body, pos = _parse_rules(parts, pos, top=False)
+                    at_rule.has_rules = True
+                elif at_rule.name in _DECLARATION_AT_RULES:
+                    at_rule.body, pos = _parse_declarations(parts, pos)
+                else:
+                    raise CSSParseError(f'不支持的 @ 规则: {prelude[:40]}')
+                nodes.append(at_rule)
+            elif prelude:
+                declarations, pos = _parse_declarations(parts, pos)
+                nodes.append(Rule(prelude, declarations))
+            else:
+                raise CSSParseError('缺少选择器')
+        elif text == '}':
+            if top or ''.join(buffer).strip():
+                raise CSSParseError('括号不匹配')
+            return nodes, pos
+        elif text.startswith('/*'):
+            if top and text.startswith('/*!') and not ''.join(buffer).strip():
+                nodes.append(Comment(text))
+        else:
+            # 字符串、url()
+            buffer.append(text)
+
+    if not top:
+        raise CSSParseError('规则没有结束')
+    if ''.join(buffer).strip():
+        raise CSSParseError('样式表末尾有未结束的内容')
+    return nodes, pos
+
+
+def _parse_declarations(parts, pos):
+    declarations = []
+    buffer = []
+    while pos < len(parts):
+        text = parts[pos]
+        pos += 1
+        if pos % 2:
+            # 普通文本：按分号切分声明
+            if ';' in text:
+                pieces = text.split(';')
+                buffer.append(pieces[0])
+                for piece in pieces[1:]:
+                    declaration = _make_declaration(''.join(buffer))
+                    if declaration is not None:
+                        declarations.append(declaration)
+                    buffer = [piece]
+            else:
+                buffer.append(text)
+        elif text == '}':
+            declaration = _make_declaration(''.join(buffer))
+            if declaration is not None:
+                declarations.append(declaration)
+            return declarations, pos
+        elif text == '{':
+            # CSS 嵌套规则
+            raise CSSParseError('不支持嵌套规则')
+        elif not text.startswith('/*'):
+            buffer.append(text)
+    raise CSSParseError('声明块没有结束')
+
+
+def _make_declaration(text):
+    parts = _split_declaration(text.strip())
+    return Declaration(*parts) if parts is not None else None
+
+
+@lru_cache(maxsize=8192)
+def _split_declaration(text):
+    """拆分为 (属性, 值, 是否 !important)；无法识别的内容属性为 None，原样保留"""
+    if not text:
+        return None
+    prop, colon, value = text.partition(':')
+    prop = prop.strip()
+    if not colon or not prop or _WS_RE.search(prop):
+        # 无法识别的内容原样保留（只压缩空白）
+        return None, _collapse(text), False
+    important = False
+    match = _IMPORTANT_RE.search(value)
+    if match and not prop.startswith('--'):
+        important = True
+        value = value[:match.start()]
+    return prop, value.strip(), important
+
+
+# ---------------------------------------------------------------------------
+# 选择器、条件和属性值
+# ---------------------------------------------------------------------------
+
+def _outside_strings(text, func):
+    """只对字符串和 url() 以外的部分调用 func"""
+    parts = _STRING_OR_URL_RE.split(text)
+    for i in range(0, len(parts), 2):
+        parts[i] = func(parts[i])
+    return ''.join(parts)
+
+
+def _collapse(text):
+    return _outside_strings(text, lambda part: _WS_RE.sub(' ', part)).strip()
+
+
+def minify_selector(selector):
+    """压缩选择器中组合符、逗号和括号两侧的空白"""
+    def trim(part):
+        part = _WS_RE.sub(' ', part)
+        return _SELECTOR_TRIM_RE.sub(lambda m: m.group(1) or m.group(2) or m.group(3), part)
+    return _outside_strings(selector, trim).strip()
+
+
+def minify_prelude(prelude):
+    """压缩 @media 等条件中的空白（关键字与括号之间的空格保留：and (…)）"""
+    def trim(part):
+        part = _WS_RE.sub(' ', part)
+        return _PRELUDE_TRIM_RE.sub(lambda m: m.group(1) or m.group(2) or m.group(3) or m.group(4), part)
+    return _outside_strings(prelude, trim).strip()
+
+
+def shorten_color(color):
+    """#AABBCC → #abc，更短时使用颜色名；不是颜色时原样返回"""
+    digits = color[1:]
+    if len(digits) not in (3, 4, 6, 8) or not all(c in '0123456789abcdefABCDEF' for c in digits):
+        return color
+    digits = digits.lower()
+    if len(digits) in (6, 8) and all(digits[i] == digits[i + 1] for i in range(0, len(digits), 2)):
+        digits = digits[::2]
+    color = '#' + digits
+    return _SHORTER_COLOR_NAMES.get(color, color)
+
+
+def _rgb_to_hex(match):
+    channels = [int(value) for value in match.groups()]
+    if any(value > 255 for value in channels):
+        return match.group()
+    return shorten_color('#' + ''.join(f'{value:02x}' for value in channels))
+
+
+def shorten_number(number):
+    """0.50 → .5、10.0 → 10、-0.5 → -.5"""
+    sign = ''
+    if number[0] in '+-':
+        sign, number = number[0], number[1:]
+    if 'e' in number or 'E' in number or '.' not in number:
+        return sign + number
+    number = number.rstrip('0').rstrip('.')
+    if number.startswith('0.'):
+        number = number[1:]
+    if not number or number == '0':
+        return '0'
+    return sign + number
+
+
+# 样式表中大量重复相同的属性值，解析和压缩结果按原文缓存
+@lru_cache(maxsize=8192)
+def minify_value(value, prop=''):
+    """压缩属性值：空白、颜色、数字、长度 0 的单位"""
+    prop = prop.lower()
+    if prop.startswith('--'):
+        return value.strip()
+    lowered = value.lower()
+    if prop in _RAW_VALUE_PROPERTIES or '\\' in value or 'progid:' in lowered or 'expression(' in lowered:
+        return _collapse(value)
+    if 'rgb(' in lowered:
+        value = _outside_strings(value, lambda part: _RGB_RE.sub(_rgb_to_hex, part))
+    drop_zero_unit = prop not in _KEEP_ZERO_UNIT_PROPERTIES
+
+    out = []
+    pending_space = False
+    functions = []
+    for match in _VALUE_TOKEN_RE.finditer(value):
+        kind = match.lastgroup
+        text = match.group()
+        if kind == 'ws':
+            pending_space = bool(out)
+            continue
+        if kind == 'hash':
+            text = shorten_color(text)
+        elif kind in ('number', 'unit'):
+            number, unit = match.group('number'), match.group('unit') or ''
+            number = shorten_number(number)
+            if number == '0' and unit.lower() in _LENGTH_UNITS and not functions and drop_zero_unit:
+                unit = ''
+            text = number + unit
+        elif kind == 'func':
+            functions.append(text[:-1].lower())
+        elif text == ')' and functions:
+            functions.pop()
+
+        if pending_space and out[-1][-1] not in ',(/' and text[0] not in ',)/':
+            out.append(' ')
+        pending_space = False
+        out.append(text)
+    return ''.join(out)
+
+
+# ---------------------------------------------------------------------------
+# 结构优化
+# ---------------------------------------------------------------------------
+
+def _is_universal(value):
+    return all(token.lower() in _UNIVERSAL_KEYWORDS or _UNIVERSAL_TOKEN_RE.match(token)
+               for token in re.split(r'[\s,/]+', value) if token)
+
+
+def remove_overridden(declarations):
+    """删除被同一规则中后面的同名声明覆盖的声明
+
+    两个值相同，或两个值都只包含所有浏览器都支持的数值、颜色和关键字时才删除前一个
+    （display:-webkit-box; display:flex 这样的兼容写法保留）；!important 的声明不会被普通声明覆盖
+    """
+    kept = []
+    last = {}
+    for declaration in declarations:
+        prop = declaration.prop
+        if prop is None:
+            kept.append(declaration)
+            continue
+        key = prop if prop.startswith('--') else prop.lower()
+        index = last.get(key)
+        if index is not None:
+            previous = kept[index]
+            if previous.important and not declaration.important:
+                continue
+            if previous.value == declaration.value or (_is_universal(previous.value) and _is_universal(declaration.value)):
+                kept[index] = None
+        last[key] = len(kept)
+        kept.append(declaration)
+    return [declaration for declaration in kept if declaration is not None]
+
+
+def _property_families(prop):
+    prop = prop.lower().lstrip('*_')
+    if prop.startswith('--'):
+        return {prop}
+    prop = _VENDOR_PREFIX_RE.sub('', prop)
+    if prop == 'all':
+        return {_ALL}
+    return {prop.split('-')[0]} | _EXTRA_FAMILIES.get(prop, set())
+
+
+def _node_families(node):
+    """节点中的声明可能影响的属性族"""
+    if isinstance(node, Comment):
+        return set()
+    if isinstance(node, Rule):
+        declarations = node.declarations
+    elif node.body is None or node.name in _DECLARATION_AT_RULES or node.name in _KEYFRAMES_AT_RULES:
+        return set() if node.name != 'import' else {_ALL}
+    elif node.has_rules:
+        families = set()
+        for child in node.body:
+            families |= _node_families(child)
+        return families
+    else:
+        return {_ALL}
+
+    families = set()
+    for declaration in declarations:
+        if declaration.prop is None:
+            return {_ALL}
+        families |= _property_families(declaration.prop)
+    return families
+
+
+def _conflicts(a, b):
+    return bool(a & b) or (_ALL in a and b) or (_ALL in b and a)
+
+
+def _merge_duplicate_selectors(nodes):
+    """同一选择器的规则合并到后一条：只有中间的规则都不设置前一条规则的属性（含简写）时才移动"""
+    last_index = {}
+    for j, node in enumerate(nodes):
+        if not isinstance(node, Rule):
+            continue
+        i = last_index.get(node.selector)
+        last_index[node.selector] = j
+        if i is None:
+            continue
+        earlier = nodes[i]
+        families = _node_families(earlier)
+        if any(nodes[k] is not None and _conflicts(families, _node_families(nodes[k])) for k in range(i + 1, j)):
+            continue
+        node.declarations = remove_overridden(earlier.declarations + node.declarations)
+        nodes[i] = None
+    return [node for node in nodes if node is not None]
+
+
+def _mergeable_selector(selector):
+    selector = _STRING_OR_URL_RE.sub('', selector)
+    # :not(a, b) 这样的选择器列表参数是较新的语法
+    if re.search(r'\([^)]*,', selector):
+        return False
+    return all(name.lower() in _SAFE_PSEUDOS for name in _PSEUDO_RE.findall(selector))
+
+
+def _split_selectors(selector):
+    """按顶层逗号拆分选择器列表（括号和字符串中的逗号不拆分）"""
+    if '(' not in selector and '[' not in selector:
+        return selector.split(',')
+    selectors = []
+    depth = 0
+    quote = None
+    start = 0
+    for i, char in enumerate(selector):
+        if quote:
+            if char == quote and selector[i - 1] != '\\':
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char in '([':
+            depth += 1
+        elif char in ')]':
+            depth -= 1
+        elif char == ',' and depth == 0:
+            selectors.append(selector[start:i])
+            start = i + 1
+    selectors.append(selector[start:])
+    return selectors
+
+
+def _merge_adjacent_bodies(nodes):
+    """相邻且声明完全相同的规则合并选择器：a{color:red}b{color:red} → a,b{color:red}"""
+    merged = []
+    previous_body = None
+    for node in nodes:
+        if not isinstance(node, Rule):
+            merged.append(node)
+            previous_body = None
+            continue
+        body = _join_declarations(node.declarations)
+        if body == previous_body and _mergeable_selector(node.selector) and _mergeable_selector(merged[-1].selector):
+            previous = merged[-1]
+            selectors = _split_selectors(previous.selector)
+            selectors.extend(selector for selector in _split_selectors(node.selector) if selector not in selectors)
+            previous.selector = ','.join(selectors)
+            continue
+        merged.append(node)
+        previous_body = body
+    return merged
+
+
+def _is_empty(node):
+    if isinstance(node, Rule):
+        return not node.declarations
+    if isinstance(node, AtRule):
+        return node.body is not None and not node.body
+    return False
+
+
+def _optimize_nodes(nodes, options, merge, selector_filter=None):
+    minify_selectors, optimize_values, merge_rules = options
+    for node in nodes:
+        if isinstance(node, Rule):
+            node.selector = minify_selector(node.selector) if minify_selectors else _collapse(node.selector)
+            if selector_filter is not None:
+                # 删除不可能匹配的选择器，全部删除时规则变为空规则，在下面统一删除
+                selectors = [selector for selector in _split_selectors(node.selector) if selector_filter(selector.strip())]
+                if not selectors:
+                    node.declarations = []
+                    continue
+                node.selector = ','.join(selectors)
+        elif isinstance(node, AtRule):
+            node.prelude = minify_prelude(node.prelude) if minify_selectors else _collapse(node.prelude)
+            if node.has_rules:
+                # @keyframes 中的 from/to/百分比不是选择器，不合并也不过滤
+                in_keyframes = node.name in _KEYFRAMES_AT_RULES
+                node.body = _optimize_nodes(node.body, options, merge and not in_keyframes,
+                                            None if in_keyframes else selector_filter)
+        else:
+            continue
+
+        declarations = node.declarations if isinstance(node, Rule) else node.body if not node.has_rules else None
+        if declarations is None:
+            continue
+        for declaration in declarations:
+            if declaration.prop is not None:
+                declaration.value = minify_value(declaration.value, declaration.prop) if optimize_values else _collapse(declaration.value)
+        if merge_rules:
+            declarations = remove_overridden(declarations)
+        if isinstance(node, Rule):
+            node.declarations = declarations
+        else:
+            node.body = declarations
+
+    if merge_rules and merge:
+        nodes = _merge_duplicate_selectors(nodes)
+    nodes = [node for node in nodes if not _is_empty(node)]
+    if merge_rules and merge:
+        nodes = _merge_adjacent_bodies(nodes)
+    return nodes
+
+
+def optimize_css(content, minify_selectors=True, optimize_values=True, merge_rules=True, selector_filter=None):
+    """解析并优化样式表，返回压缩结果；无法解析时抛出 CSSParseError
+
+    selector_filter(选择器) 返回 False 的选择器从规则中删除（未使用 CSS 清理）
+    """
+    nodes = _parse(content)
+    nodes = _optimize_nodes(nodes, (minify_selectors, optimize_values, merge_rules), True, selector_filter)
+    # @charset 必须位于文件开头（保留的注释之前）
+    charset = next((node for node in nodes if isinstance(node, AtRule) and node.name == 'charset'), None)
+    if charset is not None and nodes[0] is not charset:
+        nodes.remove(charset)
+        nodes.insert(0, charset)
+    return ''.join(map(str, nodes))
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+未使用 CSS 清理
+压缩前扫描一遍源目录中的 HTML（以及 JS）文件，建立所有用到的 class、id 和标签名的索引，
+压缩 CSS 时删除不可能匹配任何元素的选择器（规则中的选择器全部删除时删除整条规则）。
+索引每次运行只建立一次，所有样式表（包括 HTML 中的内联样式）共用
+"""
+
+import re
+import fnmatch
+import hashlib
+
+from fast_io import read_text
+from scanner import scan_tree
+
+INDEX_SUFFIXES = ('.html', '.htm')
+SCRIPT_SUFFIXES = ('.js', '.mjs')
+
+# HTML 中的开始标签和 class/id 属性（包括 :class、ng-class 这样由框架绑定的属性）
+_TAG_RE = re.compile(r'<([a-zA-Z][\w:-]*)')
+_CLASS_ID_RE = re.compile(r'''\s([\w:.@-]*class[\w.-]*|id)\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+))''', re.IGNORECASE)
+_SCRIPT_RE = re.compile(r'<script\b[^>]*>(.*?)</script\s*>', re.IGNORECASE | re.DOTALL)
+
+# 脚本中可能是 class/id/标签名的单词（classList.add('open')、createElement('dialog')）
+_WORD_RE = re.compile(r'[A-Za-z_][\w-]*')
+
+# 解析器自动补全的元素：源码中省略了开始标签，但 DOM 中一定存在（<table><tr> 会补出 tbody）
+IMPLIED_TAGS = ('html', 'head', 'body', 'tbody', 'colgroup')
+
+# 选择器中不要求元素具备的部分：字符串、属性选择器、函数式伪类（:not(.x)、:nth-child(2n)）的参数、伪类和伪元素
+_SELECTOR_STRING_RE = re.compile(r'''"(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*\'''')
+_ATTRIBUTE_SELECTOR_RE = re.compile(r'\[[^\]]*\]')
+_FUNCTIONAL_PSEUDO_RE = re.compile(r'(?<!\\)::?[\w-]+\([^()]*\)')
+_PSEUDO_RE = re.compile(r'(?<!\\)::?[\w-]+')
+_SIMPLE_SELECTOR_RE = re.compile(r'([.#]?)((?:[\w-]|\\.)+)')
+_ESCAPE_RE = re.compile(r'\\(.)')
+_HEX_ESCAPE_RE = re.compile(r'\\[0-9a-fA-F]')
+
+
+class PruneSettings:
+    """未使用 CSS 清理设置（来自 compression_settings.css.prune）"""
+
+    def __init__(self, settings):
+        settings = settings or {}
+        self.enabled = settings.get('enabled', False)
+        self.safelist = tuple(settings.get('safelist', ()))
+        self.scan_scripts = settings.get('scan_scripts', True)
+
+
+class SelectorIndex:
+    def __init__(self, safelist=(), scan_scripts=True):
+        self.scan_scripts = scan_scripts
+        self.classes = set()
+        self.ids = set()
+        self.tags = set(IMPLIED_TAGS)
+        self.words = set()
+        self.documents = 0
+        # 白名单支持通配符：is-*、js-*
+        self._safelist_re = re.compile('|'.join(fnmatch.translate(pattern) for pattern in safelist)) if safelist else None
+        self._cache = {}
+        self._digest = None
+
+    def add_html(self, text):
+        """索引一个 HTML 文档（内联脚本中的单词同样视为可能用到的名称）"""
+        self.documents += 1
+        self.tags.update(tag.lower() for tag in _TAG_RE.findall(text))
+        for match in _CLASS_ID_RE.finditer(text):
+            value = match.group(2) or match.group(3) or match.group(4) or ''
+            attribute = match.group(1).lower()
+            if attribute == 'class':
+                self.classes.update(value.split())
+            elif attribute == 'id':
+                self.ids.add(value.strip())
+            else:
+                self.words.update(_WORD_RE.findall(value))
+        if self.scan_scripts:
+            for match in _SCRIPT_RE.finditer(text):
+                self.add_script(match.group(1))
+
+    def add_script(self, text):
+        self.words.update(_WORD_RE.findall(text))
+
+    def digest(self):
+        """索引内容的哈希：变化时依赖索引的输出（CSS、带内联样式的 HTML）需要重新生成"""
+        if self._digest is not None:
+            return self._digest
+        digest = hashlib.sha256()
+        for name, values in (('c', self.classes), ('i', self.ids), ('t', self.tags), ('w', self.words)):
+            digest.update(name.encode('ascii'))
+            digest.update('\0'.join(sorted(values)).encode('utf-8'))
+        digest.update(repr(self._safelist_re and self._safelist_re.pattern).encode('utf-8'))
+        self._digest = digest.hexdigest()[:16]
+        return self._digest
+
+    def _used(self, name, names):
+        return (name in names or name in self.words
+                or (self._safelist_re is not None and self._safelist_re.match(name) is not None))
+
+    def matches(self, selector):
+        """选择器是否可能匹配索引中的元素（无法判断时返回 True）"""
+        result = self._cache.get(selector)
+        if result is None:
+            result = self._cache[selector] = self._matches(selector)
+        return result
+
+    def _matches(self, selector):
+        if '|' in selector or _HEX_ESCAPE_RE.search(selector):
+            # 命名空间选择器、十六进制转义（.\31 0）不做判断
+            return True
+        selector = _SELECTOR_STRING_RE.sub('', selector)
+        selector = _ATTRIBUTE_SELECTOR_RE.sub('', selector)
+        previous = None
+        while previous != selector:
+            previous, selector = selector, _FUNCTIONAL_PSEUDO_RE.sub('', selector)
+        selector = _PSEUDO_RE.sub('', selector)
+
+        for prefix, name in _SIMPLE_SELECTOR_RE.findall(selector):
+            if '\\' in name:
+                name = _ESCAPE_RE.sub(r'\1', name)
+            if prefix == '.':
+                used = self._used(name, self.classes)
+            elif prefix == '#':
+                used = self._used(name, self.ids)
+            else:
+                used = self._used(name.lower(), self.tags)
+            if not used:
+                return False
+        return True
+
+
+def build_selector_index(source_dir, compiled, settings):
+    """扫描源目录中的 HTML（和 JS）文件建立索引；跳过规则与压缩时相同"""
+    index = SelectorIndex(settings.safelist, settings.scan_scripts)
+    suffixes = INDEX_SUFFIXES + (SCRIPT_SUFFIXES if settings.scan_scripts else ())
+    for scanned in scan_tree(source_dir, compiled.should_skip.skip_dir, compiled.should_skip, compiled.ignore_file):
+        suffix = scanned.path.suffix.lower()
+        if suffix not in suffixes:
+            continue
+        try:
+            text = read_text(scanned.path)
+        except (UnicodeDecodeError, OSError):
+            continue
+        if suffix in INDEX_SUFFIXES:
+            index.add_html(text)
+        else:
+            index.add_script(text)
+    return index
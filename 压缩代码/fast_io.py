@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+快速文件 I/O
+不需要修改的文件（图片、字体、其他非 HTML/CSS/JS 文件）不经过解码和重新编码，
+按文件系统支持程度依次尝试 reflink、硬链接、内核内复制（copy_file_range / sendfile）；
+需要压缩的文本文件通过内存映射直接解码
+"""
+
+import os
+import sys
+import mmap
+import shutil
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# 直通文件的放置方式
+PASSTHROUGH_MODES = ('reflink', 'hardlink', 'copy')
+
+# Linux 的 FICLONE ioctl（btrfs、xfs、bcachefs 等支持写时复制的文件系统）
+FICLONE = 0x40049409
+
+# 小于该大小的文件直接 read() 解码，内存映射的建立开销反而更大
+MMAP_THRESHOLD = 256 * 1024
+
+
+def _reflink(src_fd, dst_fd):
+    if fcntl is None or not sys.platform.startswith('linux'):
+        return False
+    try:
+        fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        return True
+    except OSError:
+        return False
+
+
+def _kernel_copy(src_fd, dst_fd, size):
+    """在内核中复制数据，不经过用户态缓冲区；返回使用的方式"""
+    for name in ('copy_file_range', 'sendfile'):
+        func = getattr(os, name, None)
+        if func is None:
+            continue
+        try:
+            offset = 0
+            while offset < size:
+                if name == 'copy_file_range':
+                    copied = func(src_fd, dst_fd, size - offset, offset, offset)
+                else:
+                    copied = func(dst_fd, src_fd, offset, size - offset)
+                if copied == 0:
+                    break
+                offset += copied
+            if offset == size:
+                return name
+        except OSError:
+            pass
+        # 部分失败时从头改用下一种方式
+        os.lseek(dst_fd, 0, os.SEEK_SET)
+        os.ftruncate(dst_fd, 0)
+
+    with os.fdopen(os.dup(src_fd), 'rb') as fsrc, os.fdopen(os.dup(dst_fd), 'wb') as fdst:
+        fsrc.seek(0)
+        shutil.copyfileobj(fsrc, fdst, 1024 * 1024)
+    return 'copy'
+
+
+def passthrough_file(src, dst, mode='reflink'):
+    """把不需要修改的文件放到输出位置（保留修改时间和权限），返回 (使用的方式, 文件大小)
+
+    - reflink：优先写时复制，不支持时内核内复制
+    - hardlink：优先硬链接（输出与源文件共享同一份数据，修改输出会影响源文件），
+      跨设备等无法链接时退回 reflink
+    - copy：内核内复制
+    """
+    # 先删除已有输出：它可能是上次以硬链接方式生成的，直接覆盖写会改坏源文件
+    try:
+        os.unlink(dst)
+    except FileNotFoundError:
+        pass
+
+    if mode == 'hardlink':
+        try:
+            os.link(src, dst)
+            return 'hardlink', os.stat(dst).st_size
+        except OSError:
+            mode = 'reflink'
+
+    with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+        size = os.fstat(fsrc.fileno()).st_size
+        if mode == 'reflink' and _reflink(fsrc.fileno(), fdst.fileno()):
+            method = 'reflink'
+        else:
+            method = _kernel_copy(fsrc.fileno(), fdst.fileno(), size)
+    shutil.copystat(src, dst)
+    return method, size
+
+
+def read_text(file_path):
+    """读取 UTF-8 文本：大文件通过内存映射直接解码，不产生中间的 bytes 副本；
+    换行统一为 \\n（与文本模式读取的结果一致）"""
+    with open(file_path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                content = str(mapped, 'utf-8')
+        else:
+            content = f.read().decode('utf-8')
+    if '\r' in content:
+        content = content.replace('\r\n', '\n').replace('\r', '\n')
+    return content
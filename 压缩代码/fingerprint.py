@@ -0,0 +1,208 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+资源指纹
+压缩完成后为 CSS/JS/图片等输出生成带内容哈希的文件名（app.3f9a1c8e.js），
+改写 HTML 的 src/href 属性和 CSS 的 url()/@import 引用，并输出 原文件名 → 带哈希文件名 的清单。
+按依赖顺序只处理一遍：先处理不引用其他文件的资源，再按引用关系依次处理 CSS，最后改写 HTML
+"""
+
+import os
+import re
+import json
+import posixpath
+from urllib.parse import quote, unquote
+
+from build_manifest import hash_bytes, hash_file
+from fast_io import passthrough_file, read_text
+from sidecars import SIDECAR_SUFFIXES, write_output
+
+ASSET_MANIFEST_FILE = 'asset-manifest.json'
+
+DEFAULT_FINGERPRINT_EXTENSIONS = ('.css', '.js', '.png', '.jpg', '.jpeg', '.gif', '.svg', '.webp', '.ico',
+                                  '.woff', '.woff2', '.ttf', '.eot')
+
+HTML_SUFFIXES = ('.html', '.htm')
+
+# HTML 中的 src/href 属性（带引号或不带引号）
+HTML_REF_RE = re.compile(r'''(\s(?:src|href)\s*=\s*)(["']?)([^"'\s>]*)\2''', re.IGNORECASE)
+
+# CSS 中的 url(...) 和 @import "..."
+CSS_REF_RE = re.compile(r'''(url\(\s*)(["']?)([^"')\s]+)\2(\s*\))|(@import\s*)(["'])([^"']+)\6''', re.IGNORECASE)
+
+# 外部链接、协议相对链接、data URI、页内锚点不处理
+_EXTERNAL_RE = re.compile(r'^(?:[a-z][a-z0-9+.-]*:|//|#)', re.IGNORECASE)
+
+
+class FingerprintSettings:
+    """资源指纹设置（来自 output_settings.fingerprint）"""
+
+    def __init__(self, settings):
+        settings = settings or {}
+        self.enabled = settings.get('enabled', False)
+        self.hash_length = settings.get('hash_length', 8)
+        self.extensions = frozenset(ext.lower() for ext in settings.get('extensions', DEFAULT_FINGERPRINT_EXTENSIONS))
+        self.manifest = settings.get('manifest', ASSET_MANIFEST_FILE)
+
+
+def hashed_name(rel_path, digest, length):
+    """app/main.js → app/main.3f9a1c8e.js"""
+    stem, suffix = posixpath.splitext(rel_path)
+    return f'{stem}.{digest[:length]}{suffix}'
+
+
+def resolve_ref(referrer, ref):
+    """把引用解析为输出目录中的相对路径；外部链接返回 None"""
+    path = re.split(r'[?#]', ref, maxsplit=1)[0]
+    if not path or _EXTERNAL_RE.match(ref):
+        return None
+    path = unquote(path)
+    if path.startswith('/'):
+        target = posixpath.normpath(path.lstrip('/'))
+    else:
+        target = posixpath.normpath(posixpath.join(posixpath.dirname(referrer), path))
+    if target == '..' or target.startswith('../'):
+        return None
+    return target
+
+
+class AssetFingerprinter:
+    def __init__(self, output_dir, settings, sidecar_settings):
+        self.output_dir = output_dir
+        self.settings = settings
+        self.sidecar_settings = sidecar_settings
+        self.manifest_path = output_dir / settings.manifest
+        self.mapping = {}
+        # 上次生成的带哈希文件名 → 原文件名，用于改写已经改写过的 HTML（增量模式下未重新压缩的文件）
+        self.previous = {}
+
+    def run(self, output_hashes):
+        """处理输出目录中的文件，返回 (加哈希的文件数, 改写的文件数)
+
+        output_hashes 为 {相对路径: 输出内容哈希}，来自增量清单，已知哈希的文件无需再次读取
+        """
+        previous = self._load_manifest()
+        self.previous = {hashed: plain for plain, hashed in previous.items()}
+        self.mapping = {}
+        extensions = self.settings.extensions
+
+        def suffix(rel):
+            return posixpath.splitext(rel)[1].lower()
+
+        styles = sorted(rel for rel in output_hashes if suffix(rel) == '.css')
+        pages = sorted(rel for rel in output_hashes if suffix(rel) in HTML_SUFFIXES)
+        assets = sorted(rel for rel in output_hashes if suffix(rel) in extensions and suffix(rel) != '.css')
+        rewritten = 0
+
+        # 1. 不引用其他文件的资源：内容不变，直接链接为带哈希的文件名
+        for rel in assets:
+            digest = output_hashes[rel] or hash_file(self.output_dir / rel)
+            self.mapping[rel] = hashed_name(rel, digest, self.settings.hash_length)
+            self._link(rel, self.mapping[rel])
+
+        # 2. CSS：被引用的 CSS 先处理，引用它的 CSS 才能使用它带哈希的文件名
+        texts = {rel: read_text(self.output_dir / rel) for rel in styles}
+        for rel in self._dependency_order(texts):
+            text = CSS_REF_RE.sub(lambda m: self._replace_css_ref(rel, m), texts[rel])
+            if '.css' in extensions:
+                data = text.encode('utf-8')
+                self.mapping[rel] = hashed_name(rel, hash_bytes(data), self.settings.hash_length)
+                self._write(self.mapping[rel], data, replace=False)
+            elif text != texts[rel]:
+                self._write(rel, text.encode('utf-8'))
+                rewritten += 1
+
+        # 3. HTML：原地改写引用
+        for rel in pages:
+            text = read_text(self.output_dir / rel)
+            new_text = HTML_REF_RE.sub(lambda m: self._replace_html_ref(rel, m), text)
+            if new_text != text:
+                self._write(rel, new_text.encode('utf-8'))
+                rewritten += 1
+
+        # 4. 删除上次生成、这次已不再使用的带哈希文件
+        current = set(self.mapping.values())
+        for hashed in set(previous.values()) - current:
+            for path in [self.output_dir / hashed] + [self.output_dir / f'{hashed}{s}' for s in SIDECAR_SUFFIXES]:
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+
+        self._save_manifest()
+        return len(self.mapping), rewritten
+
+    def _dependency_order(self, texts):
+        """CSS 按引用关系排序（被引用的在前）；循环引用时保持扫描顺序"""
+        order = []
+        state = {}
+
+        def visit(rel):
+            if state.get(rel):
+                return
+            state[rel] = 'visiting'
+            for match in CSS_REF_RE.finditer(texts[rel]):
+                target = resolve_ref(rel, match.group(3) or match.group(7))
+                if target in texts and state.get(target) is None:
+                    visit(target)
+            state[rel] = 'done'
+            order.append(rel)
+
+        for rel in texts:
+            visit(rel)
+        return order
+
+    def _rewrite_ref(self, referrer, ref):
+        """返回改写后的引用，只替换文件名部分，保留相对路径、查询参数和锚点"""
+        target = resolve_ref(referrer, ref)
+        if target is None:
+            return ref
+        hashed = self.mapping.get(target) or self.mapping.get(self.previous.get(target))
+        if hashed is None:
+            return ref
+        path_end = len(re.split(r'[?#]', ref, maxsplit=1)[0])
+        path = ref[:path_end]
+        base = path.rsplit('/', 1)[-1]
+        new_base = posixpath.basename(hashed)
+        if base != unquote(base):
+            new_base = quote(new_base)
+        return f'{path[:len(path) - len(base)]}{new_base}{ref[path_end:]}'
+
+    def _replace_html_ref(self, referrer, match):
+        prefix, quote_char, ref = match.groups()
+        return f'{prefix}{quote_char}{self._rewrite_ref(referrer, ref)}{quote_char}'
+
+    def _replace_css_ref(self, referrer, match):
+        if match.group(1) is not None:
+            return f'{match.group(1)}{match.group(2)}{self._rewrite_ref(referrer, match.group(3))}{match.group(2)}{match.group(4)}'
+        return f'{match.group(5)}{match.group(6)}{self._rewrite_ref(referrer, match.group(7))}{match.group(6)}'
+
+    def _link(self, rel, hashed):
+        """内容不变的文件：链接为带哈希的文件名（同名文件已存在时内容必然相同，跳过）"""
+        src = self.output_dir / rel
+        dst = self.output_dir / hashed
+        if dst.exists():
+            return
+        passthrough_file(src, dst, 'hardlink')
+        for sidecar in SIDECAR_SUFFIXES:
+            if os.path.exists(f'{src}{sidecar}'):
+                passthrough_file(f'{src}{sidecar}', f'{dst}{sidecar}', 'hardlink')
+
+    def _write(self, rel, data, replace=True):
+        path = self.output_dir / rel
+        if not replace and path.exists():
+            return
+        write_output(path, data, self.sidecar_settings)
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _save_manifest(self):
+        tmp_path = self.manifest_path.with_name(self.manifest_path.name + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.mapping, f, ensure_ascii=False, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.manifest_path)
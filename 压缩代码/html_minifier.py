@@ -0,0 +1,343 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTML 流式压缩器
+增量扫描输入分块，跟踪当前是否位于注释或需要保留的标签（pre/textarea/script/style）内，
+边扫描边输出，内存占用只与分块大小有关，与文件大小无关。
+可选：内联 <style>/<script> 的内容交给 CSS/JS 压缩器（收集到结束标签后压缩，内存占用与单个内联块大小有关），
+开始标签中的属性在扫描到时直接压缩（布尔属性、多余的引号、默认的 type）
+"""
+
+import os
+import re
+import hashlib
+from functools import lru_cache
+
+DEFAULT_PRESERVE_TAGS = ('pre', 'textarea', 'script', 'style')
+
+# HTML 空白符（不包括 &nbsp; 对应的 \xa0）
+_WS_RE = re.compile(r'[ \t\n\r\f\v]+')
+
+# 完整的开始标签（引号中可以有 >）
+_START_TAG_RE = re.compile(r'''<([a-zA-Z][\w:.-]*)((?:"[^"]*"|'[^']*'|[^'">])*)>''')
+
+# 开始标签中的一个属性
+_ATTR_RE = re.compile(r'''([^\s"'>/=][^\s"'>/=]*)(?:\s*=\s*("[^"]*"|'[^']*'|[^\s"'=<>`]+))?|(\s+)''')
+
+# 可以不加引号的属性值
+_UNQUOTED_VALUE_RE = re.compile(r'''^[^\s"'=<>`]+$''')
+
+# 超过这个长度还没有结束的开始标签不再等待后续分块，原样输出
+_MAX_TAG_LENGTH = 64 * 1024
+
+BOOLEAN_ATTRIBUTES = frozenset([
+    'allowfullscreen', 'async', 'autofocus', 'autoplay', 'checked', 'controls', 'default', 'defer',
+    'disabled', 'formnovalidate', 'hidden', 'inert', 'ismap', 'itemscope', 'loop', 'multiple', 'muted',
+    'nomodule', 'novalidate', 'open', 'playsinline', 'readonly', 'required', 'reversed', 'selected',
+])
+
+# 可以删除的默认 type 属性：{标签: 默认值}
+_DEFAULT_TYPES = {
+    'script': ('text/javascript', 'application/javascript'),
+    'style': ('text/css',),
+    'link': ('text/css',),
+}
+
+# 内联脚本内容是 JavaScript 的 type
+_JS_TYPES = frozenset(['', 'text/javascript', 'application/javascript', 'module', 'text/ecmascript',
+                       'application/ecmascript'])
+
+
+@lru_cache(maxsize=None)
+def _compile_marker_re(remove_comments, preserve_tags, start_tags=False):
+    """注释开始、所有保留标签（以及其他开始标签）合并为一个交替模式，一次搜索找到下一个特殊位置"""
+    alternatives = [r'(?P<comment><!--(?!\[if))'] if remove_comments else []
+    if preserve_tags:
+        tags = '|'.join(re.escape(tag) for tag in preserve_tags)
+        alternatives.append(rf'<(?P<tag>{tags})(?=[\s>/])')
+    if start_tags:
+        alternatives.append(r'<(?P<start>[a-zA-Z][\w:.-]*)(?=[\s>/])')
+    return re.compile('|'.join(alternatives), re.IGNORECASE) if alternatives else None
+
+
+# 页面中大量重复相同的开始标签，按原文缓存
+@lru_cache(maxsize=4096)
+def minify_start_tag(name, attributes):
+    """压缩开始标签的属性：合并空白、布尔属性只保留名称、去掉不必要的引号和默认的 type；无法解析时返回 None"""
+    lowered_name = name.lower()
+    stripped = attributes.rstrip()
+    self_closing = stripped.endswith('/') and (len(stripped) == 1 or stripped[-2] in ' \t\n\r\f"\'')
+    if self_closing:
+        attributes = stripped[:-1]
+
+    out = ['<', name]
+    pos = 0
+    unquoted_last = False
+    for match in _ATTR_RE.finditer(attributes):
+        if match.start() != pos:
+            return None
+        pos = match.end()
+        attr, value = match.group(1), match.group(2)
+        if attr is None:
+            continue
+        lowered = attr.lower()
+        if value is not None and value[:1] in ('"', "'"):
+            value = value[1:-1]
+        if lowered == 'type' and value is not None and value.strip().lower() in _DEFAULT_TYPES.get(lowered_name, ()):
+            continue
+        out.append(' ')
+        out.append(attr)
+        unquoted_last = False
+        if value is None or (lowered in BOOLEAN_ATTRIBUTES and value.lower() in ('', lowered)):
+            unquoted_last = True
+            continue
+        out.append('=')
+        if _UNQUOTED_VALUE_RE.match(value):
+            out.append(value)
+            unquoted_last = True
+        else:
+            quote = "'" if '"' in value and "'" not in value else '"'
+            out.append(f'{quote}{value}{quote}')
+    if pos != len(attributes):
+        return None
+    if self_closing:
+        out.append(' /' if unquoted_last else '/')
+    out.append('>')
+    return ''.join(out)
+
+
+def _script_type(tag_text):
+    """开始标签中 type 属性的值（小写，没有时为空字符串）"""
+    match = re.search(r'''\stype\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>]+))''', tag_text, re.IGNORECASE)
+    if match is None:
+        return ''
+    return next(group for group in match.groups() if group is not None).strip().lower()
+
+
+@lru_cache(maxsize=None)
+def _compile_end_tag_re(tag):
+    """保留标签的结束标签"""
+    return re.compile(rf'</{re.escape(tag.lower())}\s*>', re.IGNORECASE)
+
+
+class HTMLMinifier:
+    """增量HTML压缩器：多次调用 feed() 传入分块，最后调用 close()"""
+
+    def __init__(self, remove_comments=True, remove_whitespace=True, preserve_tags=DEFAULT_PRESERVE_TAGS,
+                 minify_css=None, minify_js=None, minify_attributes=False):
+        self.remove_comments = remove_comments
+        self.remove_whitespace = remove_whitespace
+        self.minify_attributes = minify_attributes
+
+        # 内联块的压缩函数：{标签: 函数}，这些标签的内容不按普通文本处理
+        self._body_minifiers = {}
+        if minify_css is not None:
+            self._body_minifiers['style'] = minify_css
+        if minify_js is not None:
+            self._body_minifiers['script'] = minify_js
+
+        preserve_tags = tuple(preserve_tags) + tuple(tag for tag in self._body_minifiers if tag not in preserve_tags)
+        self._marker_re = _compile_marker_re(remove_comments, preserve_tags, minify_attributes)
+
+        # 分块末尾可能是不完整的标记，保留这么多字符等待后续数据
+        self._lookahead = max([len('<!--[if')] + [len(tag) + 2 for tag in preserve_tags])
+
+        self._buffer = ''
+        self._state = 'text'
+        self._end_re = None
+        self._body_minifier = None
+        self._body_tag = None
+        self._body_parts = []
+        self._pending_space = False
+        self._last_char = ''
+
+    def feed(self, chunk):
+        """处理一个分块，返回可以立即输出的压缩结果"""
+        self._buffer += chunk
+        return self._process(final=False)
+
+    def close(self):
+        """处理剩余数据，返回最后的压缩结果"""
+        return self._process(final=True)
+
+    def _process(self, final):
+        out = []
+        buffer = self._buffer
+        pos = 0
+
+        while pos < len(buffer):
+            if self._state == 'comment':
+                end = buffer.find('-->', pos)
+                if end < 0:
+                    # 注释未结束：丢弃已扫描部分，保留可能是 --> 前缀的末尾
+                    pos = len(buffer) if final else max(pos, len(buffer) - 2)
+                    break
+                pos = end + 3
+                self._state = 'text'
+                continue
+
+            if self._state == 'preserve':
+                m = self._end_re.search(buffer, pos)
+                # 需要压缩的内联块收集到结束标签后一次压缩，其他保留块原样输出
+                target = self._body_parts if self._body_minifier is not None else out
+                if m is None:
+                    # 保留块未结束，末尾可能是不完整的结束标签
+                    keep_from = len(buffer)
+                    if not final:
+                        last_lt = buffer.rfind('<', pos)
+                        if last_lt >= 0 and len(buffer) - last_lt < 256:
+                            keep_from = last_lt
+                    target.append(buffer[pos:keep_from])
+                    pos = keep_from
+                    break
+                if self._body_minifier is not None:
+                    target.append(buffer[pos:m.start()])
+                    out.append(self._minify_body(''.join(target)))
+                    out.append(m.group())
+                    self._body_parts = []
+                    self._body_minifier = None
+                else:
+                    out.append(buffer[pos:m.end()])
+                self._last_char = '>'
+                pos = m.end()
+                self._state = 'text'
+                continue
+
+            m = self._marker_re.search(buffer, pos) if self._marker_re else None
+            if m is not None and (final or m.start() + self._lookahead <= len(buffer)):
+                self._emit_text(buffer[pos:m.start()], out)
+                if m.lastgroup == 'comment':
+                    self._state = 'comment'
+                    pos = m.end()
+                    continue
+                tag = m.group('tag').lower() if m.lastgroup == 'tag' else None
+                if tag or self.minify_attributes:
+                    start = _START_TAG_RE.match(buffer, m.start())
+                    if start is None:
+                        if not final and len(buffer) - m.start() < _MAX_TAG_LENGTH:
+                            # 开始标签还没有完整读入
+                            pos = m.start()
+                            break
+                        if not tag:
+                            # 无法识别的开始标签按普通文本处理
+                            self._emit_text(buffer[m.start()], out)
+                            pos = m.start() + 1
+                            continue
+                    if start is not None:
+                        tag_text = start.group()
+                        if self.minify_attributes:
+                            tag_text = minify_start_tag(start.group(1), start.group(2)) or tag_text
+                        self._emit_separator('<', out)
+                        out.append(tag_text)
+                        self._last_char = '>'
+                        pos = start.end()
+                    else:
+                        self._emit_separator('<', out)
+                        pos = m.start()
+                    if tag:
+                        self._end_re = _compile_end_tag_re(tag)
+                        self._state = 'preserve'
+                        minifier = self._body_minifiers.get(tag)
+                        if minifier is not None and start is not None and (
+                                tag != 'script' or _script_type(start.group(2)) in _JS_TYPES):
+                            self._body_minifier = minifier
+                            self._body_tag = tag
+                continue
+
+            # 没有完整的标记：输出到可能的标记前缀之前
+            if final:
+                end = len(buffer)
+            elif m is not None:
+                end = m.start()
+            else:
+                end = max(pos, len(buffer) - self._lookahead)
+            if not final and self.minify_attributes:
+                # 开始标签的名称长度不定，固定长度的前瞻不够：从最后一个没有 > 的 < 开始保留
+                last_lt = buffer.rfind('<', pos, end)
+                if last_lt >= 0 and buffer.find('>', last_lt) < 0 and len(buffer) - last_lt < _MAX_TAG_LENGTH:
+                    end = last_lt
+            self._emit_text(buffer[pos:end], out)
+            pos = end
+            break
+
+        self._buffer = buffer[pos:]
+        return ''.join(out)
+
+    def _minify_body(self, body):
+        """压缩内联 <style>/<script> 的内容；结果中出现结束标签或 HTML 注释时保留原文"""
+        if '<!--' in body:
+            return body
+        result = self._body_minifier(body)
+        if f'</{self._body_tag}' in result.lower():
+            return body
+        return result
+
+    def _emit_separator(self, next_char, out):
+        """输出待定的空白：文档开头和标签之间的空白直接删除"""
+        if self._pending_space:
+            if self._last_char and not (self._last_char == '>' and next_char == '<'):
+                out.append(' ')
+            self._pending_space = False
+
+    def _emit_text(self, text, out):
+        """输出普通文本，空白合并为一个空格，标签之间的空白删除"""
+        if not text:
+            return
+        if not self.remove_whitespace:
+            out.append(text)
+            self._last_char = text[-1]
+            return
+
+        text = _WS_RE.sub(' ', text)
+        if text[0] == ' ':
+            self._pending_space = True
+            text = text[1:]
+        if not text:
+            return
+        trailing = text[-1] == ' '
+        if trailing:
+            text = text[:-1]
+
+        self._emit_separator(text[0], out)
+        out.append(text.replace('> <', '><'))
+        self._last_char = text[-1]
+        self._pending_space = trailing
+
+
+def minify_html(content, remove_comments=True, remove_whitespace=True, preserve_tags=DEFAULT_PRESERVE_TAGS,
+                minify_css=None, minify_js=None, minify_attributes=False):
+    """压缩完整的HTML字符串"""
+    minifier = HTMLMinifier(remove_comments, remove_whitespace, preserve_tags, minify_css, minify_js, minify_attributes)
+    return minifier.feed(content) + minifier.close()
+
+
+def minify_html_file(src_path, dst_path, chunk_size=1024 * 1024, remove_comments=True,
+                     remove_whitespace=True, preserve_tags=DEFAULT_PRESERVE_TAGS,
+                     minify_css=None, minify_js=None, minify_attributes=False):
+    """流式压缩HTML文件，返回 (原始大小, 压缩后大小, 输出哈希)；无法按UTF-8解码时返回 None"""
+    minifier = HTMLMinifier(remove_comments, remove_whitespace, preserve_tags, minify_css, minify_js, minify_attributes)
+    digest = hashlib.sha256()
+    original_size = 0
+    compressed_size = 0
+
+    try:
+        with open(src_path, 'r', encoding='utf-8') as src, open(dst_path, 'w', encoding='utf-8') as dst:
+            for chunk in iter(lambda: src.read(chunk_size), ''):
+                original_size += len(chunk)
+                piece = minifier.feed(chunk)
+                if piece:
+                    dst.write(piece)
+                    digest.update(piece.encode('utf-8'))
+                    compressed_size += len(piece)
+            piece = minifier.close()
+            dst.write(piece)
+            digest.update(piece.encode('utf-8'))
+            compressed_size += len(piece)
+    except (UnicodeDecodeError, PermissionError):
+        try:
+            os.remove(dst_path)
+        except OSError:
+            pass
+        return None
+
+    return original_size, compressed_size, digest.hexdigest()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+JavaScript 单遍压缩器
+基于词法扫描，一次遍历识别字符串、模板字符串（含 ${} 嵌套）、正则表达式字面量和注释，
+直接输出压缩结果，不做占位符替换
+"""
+
+import re
+
+# 词法单元（按顺序尝试）
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>[\s\ufeff]+)
+  | (?P<line_comment>//[^\n\r\u2028\u2029]*)
+  | (?P<block_comment>/\*.*?(?:\*/|\Z))
+  | (?P<string>"(?:[^"\\\n]|\\.)*"|'(?:[^'\\\n]|\\.)*')
+  | (?P<template>`)
+  | (?P<word>[\w$]+)
+  | (?P<punct>\+\+|--|.)
+""", re.VERBOSE | re.DOTALL)
+
+# 正则表达式字面量（在允许出现正则的位置匹配 /）
+_REGEX_RE = re.compile(r'/(?![*/])(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[\w$]*')
+
+# 模板字符串片段：匹配到 ` 或 ${ 为止
+_TEMPLATE_RE = re.compile(r'(?:[^`\\$]|\\.|\$(?!\{))*(?:`|\$\{|\Z)', re.DOTALL)
+
+# 含换行的空白
+_NEWLINE_RE = re.compile(r'[\n\r\u2028\u2029]')
+
+# 这些关键字之后出现的 / 是正则表达式的开始
+_REGEX_KEYWORDS = frozenset([
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+    'throw', 'case', 'do', 'else', 'yield', 'await',
+])
+
+# 这些符号之后出现的 / 是除号
+_DIVISION_PUNCT = frozenset([')', ']', '++', '--'])
+
+# 这些关键字的条件括号之后出现的 / 是正则表达式的开始：if (x) /re/.test(y)
+_CONDITION_KEYWORDS = frozenset(['if', 'while', 'for', 'with'])
+
+# 与这些符号（或换行）相邻的空格可以删除
+_SPACE_SAFE = frozenset('{}()[];,:=<>?!&|*%^~+-/\n')
+
+# 删除空格后会改变含义的相邻字符（++、--、注释开始、<!-- ）
+_SPACE_KEEP_PAIRS = frozenset(['++', '--', '//', '/*', '<!'])
+
+# 这些符号之后或之前的换行不会影响自动分号插入
+_NEWLINE_SAFE_AFTER = frozenset('{([,;\n')
+_NEWLINE_SAFE_BEFORE = frozenset('})],;')
+
+
+def minify_js(content, remove_comments=True, remove_whitespace=True):
+    """压缩JavaScript代码
+
+    - 删除单行和多行注释（字符串、模板字符串、正则表达式内的内容保持不变）
+    - 合并空白：保留必要的换行（避免改变自动分号插入），删除缩进、空行和符号两侧的空格
+    - 无法可靠判断的代码（注释紧跟在反斜杠之后，说明把正则表达式误判成了除号）原样返回
+    """
+    out = []
+    append = out.append
+    match_token = _TOKEN_RE.match
+    pos = 0
+    length = len(content)
+
+    # 当前所在的模板字符串 ${} 表达式，每项记录表达式内未闭合的 { 数量
+    template_braces = []
+    # 上一个有效词法单元的类型和值，用于判断 / 是除号还是正则
+    last_kind = None
+    last_value = ''
+    # 未闭合的 ( 是否是 if/while/for/with 的条件括号
+    paren_conditions = []
+    after_condition = False
+    # 待输出的分隔符：''、' ' 或 '\n'
+    pending = ''
+
+    while pos < length:
+        # 模板字符串主体：匹配到结尾的 ` 或下一个 ${
+        if last_kind == 'template_body':
+            m = _TEMPLATE_RE.match(content, pos)
+            if m is None:
+                # 以单个 \ 结尾的未闭合模板字符串：剩余内容原样输出
+                append(content[pos:])
+                break
+            chunk = m.group(0)
+            append(chunk)
+            pos = m.end()
+            if chunk.endswith('${'):
+                template_braces.append(0)
+                last_kind, last_value = 'punct', '{'
+            else:
+                last_kind, last_value = 'template', ''
+            continue
+
+        m = match_token(content, pos)
+        kind = m.lastgroup
+        value = m.group(0)
+        pos = m.end()
+
+        if kind in ('line_comment', 'block_comment') and content[m.start() - 1:m.start()] == '\\':
+            # 合法代码中 \ 之后不会出现注释，是正则表达式被当成了除号（/a\//）
+            return content
+
+        if kind == 'ws' or (kind == 'block_comment' and remove_comments):
+            # 注释可能是两个词法单元之间唯一的分隔，按空白处理
+            if not remove_whitespace:
+                append(value if kind == 'ws' else (' ' if _NEWLINE_RE.search(value) is None else '\n'))
+            elif _NEWLINE_RE.search(value):
+                pending = '\n'
+            elif not pending:
+                pending = ' '
+            continue
+
+        if kind == 'line_comment' and remove_comments:
+            continue
+
+        # 判断 / 是正则表达式还是除号
+        if kind == 'punct' and value == '/':
+            regex_allowed = (
+                last_kind is None
+                or (last_kind == 'punct' and (last_value not in _DIVISION_PUNCT or after_condition))
+                or (last_kind == 'word' and last_value in _REGEX_KEYWORDS)
+            )
+            regex_match = _REGEX_RE.match(content, m.start()) if regex_allowed else None
+            if regex_match:
+                kind = 'regex'
+                value = regex_match.group(0)
+                pos = regex_match.end()
+
+        # 输出待定的分隔符
+        if pending and out:
+            prev_char = out[-1][-1]
+            next_char = value[0]
+            if pending == '\n':
+                if prev_char not in _NEWLINE_SAFE_AFTER and next_char not in _NEWLINE_SAFE_BEFORE:
+                    append('\n')
+            elif ((prev_char not in _SPACE_SAFE and next_char not in _SPACE_SAFE)
+                  or prev_char + next_char in _SPACE_KEEP_PAIRS):
+                append(' ')
+        pending = ''
+        append(value)
+
+        if kind == 'line_comment':
+            # 保留的单行注释后必须换行
+            if remove_whitespace:
+                append('\n')
+            continue
+
+        if kind == 'block_comment':
+            continue
+
+        if kind == 'template':
+            last_kind = 'template_body'
+            continue
+
+        if kind == 'punct' and template_braces:
+            if value == '{':
+                template_braces[-1] += 1
+            elif value == '}':
+                if template_braces[-1] == 0:
+                    # ${} 表达式结束，回到模板字符串主体
+                    template_braces.pop()
+                    last_kind = 'template_body'
+                    continue
+                template_braces[-1] -= 1
+
+        after_condition = False
+        if kind == 'punct' and value == '(':
+            paren_conditions.append(last_kind == 'word' and last_value in _CONDITION_KEYWORDS)
+        elif kind == 'punct' and value == ')' and paren_conditions:
+            after_condition = paren_conditions.pop()
+        last_kind, last_value = kind, value
+
+    return ''.join(out).strip()
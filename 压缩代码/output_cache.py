@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内容寻址的压缩结果缓存
+以 源文件内容哈希 + 压缩器/配置指纹 + 文件类型 为键，把压缩后的输出保存在共享目录中，
+多个项目中相同的第三方 JS/CSS 只需压缩一次；命中时直接链接或复制缓存的输出。
+缓存总大小超过上限时按最近使用时间淘汰（命中时更新对象文件的修改时间）
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+from pathlib import Path
+
+from fast_io import passthrough_file
+
+DEFAULT_MAX_SIZE = 512 * 1024 * 1024
+
+META_SUFFIX = '.meta'
+
+_SIZE_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([kmgt]?)i?b?\s*$', re.IGNORECASE)
+
+
+def default_cache_dir():
+    """默认缓存目录：$COMPRESS_CACHE_DIR，或用户缓存目录下的 code-compressor"""
+    if os.environ.get('COMPRESS_CACHE_DIR'):
+        return Path(os.environ['COMPRESS_CACHE_DIR'])
+    base = os.environ.get('XDG_CACHE_HOME') or os.environ.get('LOCALAPPDATA') or Path.home() / '.cache'
+    return Path(base) / 'code-compressor'
+
+
+def parse_size(text):
+    """解析 512M、1.5G、1048576 这样的大小"""
+    if isinstance(text, int):
+        return text
+    match = _SIZE_RE.match(str(text))
+    if not match:
+        raise ValueError(f'无法解析的大小: {text}')
+    number, unit = match.groups()
+    return int(float(number) * 1024 ** ' kmgt'.index(unit.lower() or ' '))
+
+
+def format_size(size):
+    for unit in ('bytes', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f'{size:,} {unit}' if unit == 'bytes' else f'{size:.1f} {unit}'
+        size /= 1024
+
+
+def compressor_fingerprint(modules, settings):
+    """压缩器指纹：压缩相关模块的源码 + 压缩设置，任何一个变化都会使缓存键变化"""
+    digest = hashlib.sha256()
+    for module in modules:
+        with open(module.__file__, 'rb') as f:
+            digest.update(f.read())
+    digest.update(json.dumps(settings, sort_keys=True, ensure_ascii=False).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class CacheSettings:
+    """缓存设置（来自 output_settings.cache）"""
+
+    def __init__(self, settings):
+        settings = settings or {}
+        self.enabled = settings.get('enabled', False)
+        self.directory = Path(settings['dir']).expanduser() if settings.get('dir') else default_cache_dir()
+        self.max_size = parse_size(settings.get('max_size', DEFAULT_MAX_SIZE))
+
+
+class OutputCache:
+    def __init__(self, directory, max_size=DEFAULT_MAX_SIZE, fingerprint=''):
+        self.directory = Path(directory)
+        self.objects_dir = self.directory / 'objects'
+        self.max_size = max_size
+        self.fingerprint = fingerprint
+
+    def key(self, source_hash, file_type, variant=None):
+        text = f'{self.fingerprint}:{file_type}:{source_hash}'
+        if variant is not None:
+            text += f':{variant}'
+        return hashlib.sha256(text.encode('ascii')).hexdigest()
+
+    def object_path(self, key):
+        return self.objects_dir / key[:2] / key
+
+    def lookup(self, key):
+        """返回缓存条目的元数据（文件类型、原始大小、压缩后大小、输出哈希）；未命中返回 None"""
+        path = self.object_path(key)
+        try:
+            with open(f'{path}{META_SUFFIX}', 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            # 更新修改时间，作为淘汰时的最近使用时间
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        return meta
+
+    def restore(self, key, output_file, mode):
+        """把缓存的输出放到输出位置；对象在 lookup 之后被清理（并发的 cache prune）时返回 False，按未命中处理"""
+        try:
+            passthrough_file(self.object_path(key), output_file, mode)
+        except FileNotFoundError:
+            # 复制到一半时对象被删除（copystat 失败）会留下输出，删除后重新压缩
+            try:
+                os.unlink(output_file)
+            except FileNotFoundError:
+                pass
+            return False
+        return True
+
+    def _tmp_path(self, path):
+        """每个进程使用自己的临时文件名；不用 mkstemp，临时文件的权限才会遵循 umask（恢复时会复制权限）"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path.with_name(f'.tmp-{os.getpid()}-{path.name}')
+
+    def _atomic_write(self, path, write):
+        tmp_path = self._tmp_path(path)
+        try:
+            with open(tmp_path, 'wb') as f:
+                write(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def _write_meta(self, path, meta):
+        data = json.dumps(meta, sort_keys=True).encode('utf-8')
+        self._atomic_write(Path(f'{path}{META_SUFFIX}'), lambda f: f.write(data))
+
+    def store_bytes(self, key, data, meta):
+        """保存内存中的压缩结果（多个进程同时写同一个键也是安全的：内容相同，原子替换）"""
+        path = self.object_path(key)
+        self._atomic_write(path, lambda f: f.write(data))
+        self._write_meta(path, meta)
+
+    def store_file(self, key, file_path, meta):
+        """保存已写出的压缩结果文件（用于流式压缩的输出）"""
+        path = self.object_path(key)
+        tmp_path = self._tmp_path(path)
+        passthrough_file(file_path, tmp_path, 'copy')
+        os.replace(tmp_path, path)
+        self._write_meta(path, meta)
+
+    def entries(self):
+        """返回 [(最近使用时间, 大小, 对象路径)]"""
+        result = []
+        if not self.objects_dir.exists():
+            return result
+        for bucket in os.scandir(self.objects_dir):
+            if not bucket.is_dir():
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.endswith(META_SUFFIX) or entry.name.startswith('.tmp-'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    # 其他进程刚刚淘汰了这个条目
+                    continue
+                try:
+                    meta_size = os.stat(f'{entry.path}{META_SUFFIX}').st_size
+                except FileNotFoundError:
+                    meta_size = 0
+                result.append((stat.st_mtime, stat.st_size + meta_size, entry.path))
+        return result
+
+    def stats(self):
+        entries = self.entries()
+        return {
+            'directory': str(self.directory),
+            'entries': len(entries),
+            'size': sum(size for _, size, _ in entries),
+            'max_size': self.max_size,
+            'oldest': min((mtime for mtime, _, _ in entries), default=None),
+            'newest': max((mtime for mtime, _, _ in entries), default=None),
+        }
+
+    def prune(self, max_size=None):
+        """按最近使用时间淘汰，直到总大小不超过上限；返回 (删除的条目数, 释放的字节数)"""
+        max_size = self.max_size if max_size is None else max_size
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        removed = freed = 0
+        for _, size, path in entries:
+            if total <= max_size:
+                break
+            for target in (path, f'{path}{META_SUFFIX}'):
+                try:
+                    os.unlink(target)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            freed += size
+            removed += 1
+        self._remove_stale_tmp()
+        return removed, freed
+
+    def _remove_stale_tmp(self, max_age=3600):
+        """删除中断的写入留下的临时文件"""
+        if not self.objects_dir.exists():
+            return
+        cutoff = time.time() - max_age
+        for tmp_path in self.objects_dir.glob('*/.tmp-*'):
+            try:
+                if tmp_path.stat().st_mtime < cutoff:
+                    tmp_path.unlink()
+            except OSError:
+                pass
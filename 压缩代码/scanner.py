@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+目录扫描
+基于 os.scandir 惰性遍历源目录：被跳过的目录在进入之前就剪枝，
+复用 DirEntry 缓存的 stat 结果，并支持 .gitignore 语法的忽略文件（.compressignore）
+"""
+
+import os
+import re
+from pathlib import Path
+
+IGNORE_FILE = '.compressignore'
+
+
+def _translate(pattern):
+    """把一条 .gitignore 风格的模式转换为匹配相对路径（posix 格式）的正则"""
+    anchored = '/' in pattern
+    pattern = pattern.lstrip('/')
+
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            parts.append('(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i):
+            parts.append('.*')
+            i += 2
+        elif pattern[i] == '*':
+            parts.append('[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            parts.append('[^/]')
+            i += 1
+        elif pattern[i] == '[' and ']' in pattern[i + 2:]:
+            end = pattern.index(']', i + 2)
+            body = pattern[i + 1:end]
+            if body.startswith('!'):
+                body = '^' + body[1:]
+            parts.append('[' + body.replace('\\', '\\\\') + ']')
+            i = end + 1
+        else:
+            if pattern[i] == '\\' and i + 1 < len(pattern):
+                i += 1
+            parts.append(re.escape(pattern[i]))
+            i += 1
+
+    # 不含斜杠的模式匹配任意层级的同名文件或目录
+    prefix = '' if anchored else '(?:.*/)?'
+    return re.compile(prefix + ''.join(parts) + r'\Z')
+
+
+class IgnoreRules:
+    """一个忽略文件中的规则，按顺序匹配，最后一条匹配的规则生效（! 表示重新包含）"""
+
+    def __init__(self, lines):
+        self.rules = []
+        for line in lines:
+            line = line.rstrip('\n').rstrip()
+            if not line or line.startswith('#'):
+                continue
+            negate = line.startswith('!')
+            if negate:
+                line = line[1:]
+            elif line.startswith('\\'):
+                line = line[1:]
+            dir_only = line.endswith('/')
+            line = line.rstrip('/')
+            if line:
+                self.rules.append((_translate(line), negate, dir_only))
+
+    @classmethod
+    def from_file(cls, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            return cls(f.readlines())
+
+    def match(self, rel_path, is_dir):
+        """返回 True（忽略）、False（重新包含）或 None（没有规则匹配）"""
+        result = None
+        for regex, negate, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                result = not negate
+        return result
+
+
+def _ignored(rule_stack, rel_path, is_dir):
+    """按各级目录的规则判断是否忽略，下层目录的规则优先"""
+    result = None
+    for base, rules in rule_stack:
+        match = rules.match(rel_path[len(base) + 1:] if base else rel_path, is_dir)
+        if match is not None:
+            result = match
+    return bool(result)
+
+
+def _load_rules(directory, ignore_file):
+    try:
+        return IgnoreRules.from_file(os.path.join(directory, ignore_file))
+    except (OSError, UnicodeDecodeError):
+        return None
+
+
+class ScanEntry:
+    """扫描到的文件：绝对路径、相对路径和扫描时获取的 stat 结果"""
+    __slots__ = ('path', 'rel_path', 'stat')
+
+    def __init__(self, path, rel_path, stat):
+        self.path = path
+        self.rel_path = rel_path
+        self.stat = stat
+
+
+def scan_tree(root, skip_dir=None, skip_file=None, ignore_file=IGNORE_FILE):
+    """惰性遍历 root 下的文件，按目录内名称顺序生成 ScanEntry
+
+    - skip_dir(path)：返回 True 时整个目录不再进入
+    - skip_file(path)：返回 True 时跳过该文件
+    - ignore_file：各级目录中的忽略文件名（None 表示不使用），规则作用于所在目录及其子目录
+    """
+    root = Path(root)
+    # 每层目录的忽略规则：(相对于 root 的目录, 规则)
+    rule_stack = []
+
+    def walk(directory, rel_dir):
+        try:
+            with os.scandir(directory) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except (PermissionError, FileNotFoundError):
+            return
+
+        pushed = False
+        if ignore_file is not None and any(entry.name == ignore_file for entry in entries):
+            rules = _load_rules(directory, ignore_file)
+            if rules is not None:
+                rule_stack.append((rel_dir, rules))
+                pushed = True
+
+        try:
+            subdirs = []
+            for entry in entries:
+                rel_path = f'{rel_dir}/{entry.name}' if rel_dir else entry.name
+                try:
+                    # 不跟随目录的符号链接，避免循环
+                    if entry.is_dir(follow_symlinks=False):
+                        path = Path(entry.path)
+                        if not (skip_dir and skip_dir(path)) and not _ignored(rule_stack, rel_path, True):
+                            subdirs.append((entry.path, rel_path))
+                        continue
+                    if not entry.is_file() or entry.name == ignore_file:
+                        continue
+                except OSError:
+                    continue
+
+                path = Path(entry.path)
+                if (skip_file and skip_file(path)) or _ignored(rule_stack, rel_path, False):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                yield ScanEntry(path, Path(rel_path), stat)
+
+            for path, rel_path in subdirs:
+                yield from walk(path, rel_path)
+        finally:
+            if pushed:
+                rule_stack.pop()
+
+    if skip_dir and skip_dir(root):
+        return
+    yield from walk(os.fspath(root), '')
+
+
+def is_excluded(root, rel_path, skip_dir=None, skip_file=None, ignore_file=IGNORE_FILE):
+    """判断单个文件是否会被 scan_tree 排除（监视模式下只处理变化的文件时使用，不遍历整个目录）"""
+    root = Path(root)
+    parts = Path(rel_path).parts
+    if skip_dir and skip_dir(root):
+        return True
+    if skip_file and skip_file(root.joinpath(*parts)):
+        return True
+    if ignore_file is not None and parts[-1] == ignore_file:
+        return True
+
+    rule_stack = []
+    for i in range(len(parts)):
+        rel_dir = '/'.join(parts[:i])
+        directory = root.joinpath(*parts[:i])
+        if ignore_file is not None and (directory / ignore_file).is_file():
+            rules = _load_rules(directory, ignore_file)
+            if rules is not None:
+                rule_stack.append((rel_dir, rules))
+
+        is_dir = i < len(parts) - 1
+        if is_dir and skip_dir and skip_dir(root.joinpath(*parts[:i + 1])):
+            return True
+        if _ignored(rule_stack, '/'.join(parts[:i + 1]), is_dir):
+            return True
+    return False
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+预压缩文件生成
+为压缩后的输出生成 .gz（以及安装了 brotli 模块时的 .br）同名文件，
+供 nginx 的 gzip_static / brotli_static 直接使用
+"""
+
+import os
+import zlib
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+SIDECAR_SUFFIXES = ('.gz', '.br')
+
+DEFAULT_PRECOMPRESS_EXTENSIONS = ('.html', '.css', '.js', '.json', '.svg', '.xml', '.txt')
+
+
+class SidecarSettings:
+    """预压缩设置（来自 output_settings.precompress）"""
+
+    def __init__(self, settings):
+        settings = settings or {}
+        self.enabled = settings.get('enabled', False)
+        self.gzip = settings.get('gzip', True)
+        self.gzip_level = settings.get('gzip_level', 9)
+        self.brotli = settings.get('brotli', True) and brotli is not None
+        self.brotli_quality = settings.get('brotli_quality', 11)
+        self.min_size = settings.get('min_size', 1024)
+        self.extensions = frozenset(ext.lower() for ext in settings.get('extensions', DEFAULT_PRECOMPRESS_EXTENSIONS))
+
+    def applies_to(self, file_path, size):
+        """是否需要为该文件生成预压缩文件"""
+        return self.enabled and size >= self.min_size and file_path.suffix.lower() in self.extensions
+
+
+def remove_sidecars(output_file):
+    """删除已存在的预压缩文件"""
+    for suffix in SIDECAR_SUFFIXES:
+        try:
+            os.remove(f'{output_file}{suffix}')
+        except FileNotFoundError:
+            pass
+
+
+def _gzip_compressor(level):
+    # wbits=31 输出gzip格式；不写入文件名和修改时间，保证输出可重现
+    return zlib.compressobj(level, zlib.DEFLATED, 31)
+
+
+def write_sidecars(output_file, data, settings):
+    """根据内存中的内容生成预压缩文件，返回 {'input': 原始字节数, 'gzip': ..., 'brotli': ...}"""
+    sizes = {'input': len(data), 'gzip': 0, 'brotli': 0}
+
+    if settings.gzip:
+        compressor = _gzip_compressor(settings.gzip_level)
+        compressed = compressor.compress(data) + compressor.flush()
+        with open(f'{output_file}.gz', 'wb') as f:
+            f.write(compressed)
+        sizes['gzip'] = len(compressed)
+
+    if settings.brotli:
+        compressed = brotli.compress(data, quality=settings.brotli_quality)
+        with open(f'{output_file}.br', 'wb') as f:
+            f.write(compressed)
+        sizes['brotli'] = len(compressed)
+
+    return sizes
+
+
+def write_output(output_file, data, settings):
+    """原子写入输出（输出文件可能是硬链接，不能原地修改），并重新生成预压缩文件"""
+    tmp_path = output_file.with_name(f'.tmp-{output_file.name}')
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, output_file)
+    if settings.enabled:
+        remove_sidecars(output_file)
+        if settings.applies_to(output_file, len(data)):
+            write_sidecars(output_file, data, settings)
+
+
+def write_sidecars_from_file(output_file, settings, chunk_size=1024 * 1024):
+    """分块读取已写出的大文件生成预压缩文件（用于流式压缩的输出）"""
+    sizes = {'input': 0, 'gzip': 0, 'brotli': 0}
+    gzip_out = open(f'{output_file}.gz', 'wb') if settings.gzip else None
+    brotli_out = open(f'{output_file}.br', 'wb') if settings.brotli else None
+    gzip_compressor = _gzip_compressor(settings.gzip_level) if gzip_out else None
+    brotli_compressor = brotli.Compressor(quality=settings.brotli_quality) if brotli_out else None
+
+    def emit(out, key, data):
+        if data:
+            out.write(data)
+            sizes[key] += len(data)
+
+    try:
+        with open(output_file, 'rb') as src:
+            for chunk in iter(lambda: src.read(chunk_size), b''):
+                sizes['input'] += len(chunk)
+                if gzip_out:
+                    emit(gzip_out, 'gzip', gzip_compressor.compress(chunk))
+                if brotli_out:
+                    emit(brotli_out, 'brotli', brotli_compressor.process(chunk))
+        if gzip_out:
+            emit(gzip_out, 'gzip', gzip_compressor.flush())
+        if brotli_out:
+            emit(brotli_out, 'brotli', brotli_compressor.finish())
+    finally:
+        if gzip_out:
+            gzip_out.close()
+        if brotli_out:
+            brotli_out.close()
+
+    return sizes
@@ -0,0 +1,31 @@
+import json
+from pathlib import Path
+
+from bundler import bundle_state_dir
+from compress_advanced import AdvancedCodeCompressor
+
+CONFIG_FILE = Path(__file__).resolve().parent / 'compress_config.json'
+
+
+def test_state_dir_inside_source_tree_is_not_compressed(tmp_path):
+    with open(CONFIG_FILE, encoding='utf-8') as f:
+        config = json.load(f)
+    config['output_settings']['bundle']['enabled'] = True
+    source = tmp_path / 'src'
+    output = source / 'dist'
+    source.mkdir()
+    names = ' '.join(f'a{i}' for i in range(300))
+    (source / 'a.css').write_text(''.join(f'.a{i}{{color:red}}' for i in range(300)))
+    (source / 'b.css').write_text(''.join(f'.a{i}{{margin:0}}' for i in range(300)))
+    (source / 'index.html').write_text('<link rel="stylesheet" href="a.css"><link rel="stylesheet" href="b.css">'
+                                       f'<p class="{names}">x</p>')
+
+    for _ in range(2):
+        AdvancedCodeCompressor(config=config, incremental=True).compress_directory(str(source), str(output))
+
+    state = bundle_state_dir(output)
+    assert state.parent == source
+    assert (state / 'src' / 'index.html').is_file()
+    # 状态目录和输出目录本身都不能被当作源文件压缩进输出
+    assert not any(path.name.startswith(('.dist', 'dist')) for path in output.iterdir())
+    assert 'bundles/' in (output / 'index.html').read_text()
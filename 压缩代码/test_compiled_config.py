@@ -0,0 +1,39 @@
+import fnmatch
+from pathlib import Path
+
+import pytest
+
+from compiled_config import SkipMatcher
+
+PATTERNS = ['node_modules', '.git', '__pycache__', '.pyc', 'compressed', 'a+b', '*.min.js', '*.min.css', '[ab]?.txt']
+
+PATHS = [
+    'src/app.js', 'src/app.min.js', 'node_modules/x/index.js', 'src/.gitignore', 'lib/mod.pyc', 'lib/mod.py',
+    'compressed/index.html', 'src/compressed-notes.md', 'a+b/c.css', 'aab/c.css', 'src/a1.txt', 'src/c1.txt',
+    'vendor/theme.MIN.CSS', 'docs/min.js',
+]
+
+
+def reference_should_skip(file_path, patterns):
+    """原来逐个规则检查的实现：含 * 的规则按文件名通配，其余按路径子串"""
+    for pattern in patterns:
+        if '*' in pattern:
+            if fnmatch.fnmatch(file_path.name, pattern):
+                return True
+        elif pattern in str(file_path):
+            return True
+    return False
+
+
+@pytest.mark.parametrize('path', PATHS)
+def test_skip_matcher_matches_reference(path):
+    matcher = SkipMatcher(PATTERNS)
+    assert matcher(Path(path)) == reference_should_skip(Path(path), PATTERNS)
+
+
+def test_skip_dir_only_prunes_on_substring_rules():
+    matcher = SkipMatcher(PATTERNS)
+    assert matcher.skip_dir(Path('project/node_modules'))
+    assert not matcher.skip_dir(Path('project/app.min.js'))
+    assert not SkipMatcher(['*.min.js']).skip_dir(Path('project/node_modules'))
+    assert not SkipMatcher([])(Path('anything.js'))
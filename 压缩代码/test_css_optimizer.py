@@ -0,0 +1,49 @@
+import pytest
+
+from css_optimizer import CSSParseError, optimize_css
+
+
+def test_duplicate_selectors_merge_when_nothing_in_between_conflicts():
+    assert optimize_css('.a{color:red}.b{margin:0}.a{padding:0}') == '.b{margin:0}.a{color:red;padding:0}'
+
+
+@pytest.mark.parametrize('css', [
+    # 中间的规则设置了相同属性：移动后层叠顺序会改变
+    '.a{color:red}.b{color:blue}.a{margin:0}',
+    # 简写和完整属性属于同一属性族
+    '.a{margin:0}.b{margin-top:1px}.a{padding:0}',
+    '.a{margin-top:0}.b{margin:1px}.a{color:red}',
+    # all 影响所有属性
+    '.a{color:red}.b{all:unset}.a{margin:0}',
+    # @media 中的同名规则
+    '.a{color:red}@media print{.a{color:blue}}.a{margin:0}',
+])
+def test_duplicate_selectors_are_not_moved_across_conflicting_rules(css):
+    assert optimize_css(css) == css
+
+
+def test_adjacent_identical_bodies_merge_only_for_safe_selectors():
+    assert optimize_css('a{color:red}b{color:red}') == 'a,b{color:red}'
+    # 浏览器不认识其中一个选择器时整条规则失效，不能合并
+    assert optimize_css('a::-moz-selection{color:red}a::selection{color:red}') == \
+        'a::-moz-selection{color:red}a::selection{color:red}'
+    assert optimize_css(':not(a,b){color:red}c{color:red}') == ':not(a,b){color:red}c{color:red}'
+
+
+def test_overridden_declarations():
+    assert optimize_css('a{color:red;color:#f00}') == 'a{color:red}'
+    assert optimize_css('a{color:red!important;color:blue}') == 'a{color:red!important}'
+    # 兼容写法保留
+    assert optimize_css('a{display:-webkit-box;display:flex}') == 'a{display:-webkit-box;display:flex}'
+
+
+def test_values_strings_and_functions():
+    assert optimize_css('a{color:rgb(255,0,0);margin:0px 0.50em}') == 'a{color:red;margin:0 .5em}'
+    assert optimize_css('a{width:calc(100% - 10px)}') == 'a{width:calc(100% - 10px)}'
+    assert optimize_css('a{background:url("x;y.png")}') == 'a{background:url("x;y.png")}'
+    assert optimize_css('a:after{content:"a  ;  b"}') == 'a:after{content:"a  ;  b"}'
+
+
+def test_nested_rules_raise_parse_error():
+    with pytest.raises(CSSParseError):
+        optimize_css('a{b{c:d}}')
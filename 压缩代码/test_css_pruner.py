@@ -0,0 +1,15 @@
+from css_optimizer import optimize_css
+from css_pruner import SelectorIndex
+
+
+def test_implied_table_elements_are_kept():
+    index = SelectorIndex()
+    index.add_html('<table class="grid"><tr><td>1</td></tr></table>')
+
+    css = optimize_css('table tbody tr{color:red}.grid tbody td{padding:0}body{margin:0}thead th{color:blue}',
+                       selector_filter=index.matches)
+    # 源码中省略的 tbody、body 由解析器补全，相关规则不能删除
+    assert 'table tbody tr' in css
+    assert '.grid tbody td' in css
+    assert 'body{' in css
+    assert 'thead' not in css
@@ -0,0 +1,45 @@
+import os
+
+import pytest
+
+from fast_io import MMAP_THRESHOLD, PASSTHROUGH_MODES, passthrough_file, read_text
+
+
+@pytest.mark.parametrize('mode', PASSTHROUGH_MODES)
+def test_passthrough_over_hardlinked_output_keeps_source(tmp_path, mode):
+    source = tmp_path / 'logo.png'
+    source.write_bytes(b'old image')
+    output = tmp_path / 'out.png'
+    passthrough_file(source, output, 'hardlink')
+    assert os.path.samefile(source, output)
+
+    # 输出与源文件是同一个 inode：再次输出（即使是同一个源文件）都不能截断源文件
+    passthrough_file(source, output, mode)
+    assert source.read_bytes() == b'old image'
+    assert output.read_bytes() == b'old image'
+
+    replacement = tmp_path / 'logo-v2.png'
+    replacement.write_bytes(b'new image data')
+    passthrough_file(replacement, output, mode)
+    assert source.read_bytes() == b'old image'
+    assert output.read_bytes() == b'new image data'
+
+
+@pytest.mark.parametrize('mode', PASSTHROUGH_MODES)
+def test_passthrough_copies_content_and_mtime(tmp_path, mode):
+    source = tmp_path / 'data.bin'
+    source.write_bytes(os.urandom(300 * 1024))
+    os.utime(source, ns=(1_000_000_000, 1_000_000_000))
+    method, size = passthrough_file(source, tmp_path / 'copy.bin', mode)
+    assert size == source.stat().st_size
+    assert (tmp_path / 'copy.bin').read_bytes() == source.read_bytes()
+    assert (tmp_path / 'copy.bin').stat().st_mtime_ns == 1_000_000_000
+    assert method in ('reflink', 'hardlink', 'copy_file_range', 'sendfile', 'copy')
+
+
+@pytest.mark.parametrize('size', [10, MMAP_THRESHOLD + 10])
+def test_read_text_normalizes_newlines(tmp_path, size):
+    text = ('a\r\nb\rc\n' * size)[:size] + '中文'
+    path = tmp_path / 'page.html'
+    path.write_bytes(text.encode('utf-8'))
+    assert read_text(path) == text.replace('\r\n', '\n').replace('\r', '\n')
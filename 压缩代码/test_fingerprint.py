@@ -0,0 +1,77 @@
+import json
+from posixpath import basename as name
+from pathlib import Path
+
+from compress_advanced import AdvancedCodeCompressor
+
+CONFIG_FILE = Path(__file__).resolve().parent / 'compress_config.json'
+
+
+def compress(source, output, **output_settings):
+    with open(CONFIG_FILE, encoding='utf-8') as f:
+        config = json.load(f)
+    for name, value in output_settings.items():
+        config['output_settings'][name]['enabled'] = value
+    compressor = AdvancedCodeCompressor(config=config, incremental=True)
+    compressor.compress_directory(str(source), str(output))
+    return compressor
+
+
+def test_rebuild_does_not_modify_previous_hashed_file(tmp_path):
+    source, output = tmp_path / 'src', tmp_path / 'out'
+    source.mkdir()
+    (source / 'app.js').write_text('var a = 1;')
+    (source / 'index.html').write_text('<script src="app.js"></script>')
+    compress(source, output, fingerprint=True)
+    [old] = output.glob('app.*.js')
+
+    with open(old, encoding='utf-8') as f:
+        (source / 'app.js').write_text('var b = 2;')
+        compress(source, output, fingerprint=True)
+        # 旧的带哈希文件已被删除，但仍在使用它的客户端看到的内容不能变
+        assert f.read() == 'var a=1;'
+    assert not old.exists()
+    [new] = output.glob('app.*.js')
+    assert new.read_text() == 'var b=2;'
+    assert f'src={new.name}' in (output / 'index.html').read_text()
+
+
+def test_references_are_rewritten_in_dependency_order(tmp_path):
+    source, output = tmp_path / 'src', tmp_path / 'out'
+    (source / 'css').mkdir(parents=True)
+    (source / 'img').mkdir()
+    (source / 'img' / 'logo.png').write_bytes(b'\x89PNG fake')
+    (source / 'css' / 'base.css').write_text('.logo { background: url("../img/logo.png?v=1#x") }')
+    (source / 'css' / 'site.css').write_text('@import "base.css"; body { margin: 0 }')
+    (source / 'index.html').write_text(
+        '<link rel="stylesheet" href="css/site.css"><img src="/img/logo.png">'
+        '<a href="https://example.com/img/logo.png">x</a><a href="#top">top</a>')
+    compress(source, output, fingerprint=True)
+
+    manifest = json.loads((output / 'asset-manifest.json').read_text())
+    assert set(manifest) == {'css/base.css', 'css/site.css', 'img/logo.png'}
+    logo, base, site = manifest['img/logo.png'], manifest['css/base.css'], manifest['css/site.css']
+    assert all((output / hashed).is_file() for hashed in (logo, base, site))
+
+    # 被 @import 的 CSS 先处理，引用它的 CSS 使用它带哈希的文件名（保留相对路径、查询参数和锚点）
+    assert f'url("../img/{name(logo)}?v=1#x")' in (output / base).read_text()
+    assert f'@import "{name(base)}"' in (output / site).read_text()
+
+    html = (output / 'index.html').read_text()
+    assert f'href=css/{name(site)}' in html
+    assert f'src=/img/{name(logo)}' in html
+    assert 'href=https://example.com/img/logo.png' in html
+    assert 'href=#top' in html
+
+
+def test_unchanged_incremental_run_keeps_rewritten_references(tmp_path):
+    source, output = tmp_path / 'src', tmp_path / 'out'
+    source.mkdir()
+    (source / 'app.js').write_text('var a = 1;')
+    (source / 'index.html').write_text('<script src="app.js"></script>')
+    compress(source, output, fingerprint=True)
+    first = (output / 'index.html').read_text()
+    # HTML 没有重新压缩时已经是改写后的内容，需要通过上次的清单再映射一次
+    compress(source, output, fingerprint=True)
+    assert (output / 'index.html').read_text() == first
+    assert len(list(output.glob('app.*.js'))) == 1
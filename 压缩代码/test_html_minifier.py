@@ -0,0 +1,118 @@
+import hashlib
+import json
+from pathlib import Path
+
+import pytest
+
+from compress_advanced import AdvancedCodeCompressor
+from css_optimizer import optimize_css
+from html_minifier import HTMLMinifier, minify_html, minify_html_file
+from js_minifier import minify_js
+
+CONFIG_FILE = Path(__file__).resolve().parent / 'compress_config.json'
+
+DOCUMENT = '''<!DOCTYPE html>
+<html>
+<head>
+  <!-- comment -->
+  <!--[if IE]><p>ie</p><![endif]-->
+  <style type="text/css"> body { color : red ; } </style>
+  <script type="text/javascript"> var  a = 1 ;  // x
+  </script>
+</head>
+<body>
+  <blockquote class="x" >  quoted   text </blockquote>
+  <figure><figcaption  id='c'  hidden="hidden">cap</figcaption></figure>
+  <input type="checkbox" checked="checked" disabled />
+  <pre>  keep   this  </pre>
+  <textarea> a   b </textarea>
+  <p>a < b and c > d</p>
+  <script type="text/template"><div   class="t"></div></script>
+</body>
+</html>
+'''
+
+
+def stream(content, chunk_size, **options):
+    minifier = HTMLMinifier(**options)
+    pieces = [minifier.feed(content[i:i + chunk_size]) for i in range(0, len(content), chunk_size)]
+    return ''.join(pieces) + minifier.close()
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 7, 13, 64])
+def test_start_tags_split_across_chunks_are_minified(chunk_size):
+    options = dict(minify_css=optimize_css, minify_js=minify_js, minify_attributes=True)
+    expected = minify_html(DOCUMENT, **options)
+    assert '<blockquote class=x>' in expected
+    assert '<figcaption id=c hidden>' in expected
+    assert stream(DOCUMENT, chunk_size, **options) == expected
+
+
+@pytest.mark.parametrize('chunk_size', [1, 4, 16, 1024])
+def test_streamed_file_matches_in_memory_result(tmp_path, chunk_size):
+    source = tmp_path / 'page.html'
+    source.write_text(DOCUMENT, encoding='utf-8')
+    output = tmp_path / 'page.min.html'
+    original_size, compressed_size, output_hash = minify_html_file(source, output, chunk_size=chunk_size)
+
+    expected = minify_html(DOCUMENT)
+    assert output.read_text(encoding='utf-8') == expected
+    assert (original_size, compressed_size) == (len(DOCUMENT), len(expected))
+    assert output_hash == hashlib.sha256(expected.encode('utf-8')).hexdigest()
+
+
+def test_compressor_stream_and_memory_paths_agree(tmp_path):
+    with open(CONFIG_FILE, encoding='utf-8') as f:
+        config = json.load(f)
+    source = tmp_path / 'src'
+    source.mkdir()
+    (source / 'index.html').write_text('\n  ' + DOCUMENT * 3 + '\n\n', encoding='utf-8')
+
+    outputs = []
+    for threshold in (1, 0):
+        # threshold 为 1 时所有页面都流式处理，0 表示不使用流式处理
+        config['compression_settings']['html'].update(stream_threshold=threshold, stream_chunk_size=7)
+        output = tmp_path / f'out-{threshold}'
+        AdvancedCodeCompressor(config=config).compress_directory(str(source), str(output))
+        outputs.append((output / 'index.html').read_bytes())
+    assert outputs[0] == outputs[1]
+
+
+def test_unterminated_comment_and_preserved_block_at_end_of_input():
+    for chunk_size in (1, 3, 1000):
+        assert stream('<p>a</p>  <!-- never closed', chunk_size) == '<p>a</p>'
+        assert stream('<pre> a  b', chunk_size) == '<pre> a  b'
+
+
+INLINE = dict(minify_css=optimize_css, minify_js=minify_js, minify_attributes=True)
+
+
+@pytest.mark.parametrize('html, expected', [
+    # 非 JavaScript 的 type 原样保留
+    ('<script type="application/ld+json">{ "a" :  1 }</script>',
+     '<script type=application/ld+json>{ "a" :  1 }</script>'),
+    ('<script type="module"> import  x  from "./x.js" ; </script>',
+     '<script type=module>import x from "./x.js";</script>'),
+    ('<SCRIPT> var  a = 1 ; </SCRIPT >', '<SCRIPT>var a=1;</SCRIPT >'),
+    ('<script> var s = "<\\/script>" ;  </script>', '<script>var s="<\\/script>";</script>'),
+    # 含 HTML 注释的脚本、压缩后会出现结束标签的样式保留原文
+    ('<script><!-- var  a = 1 ; --></script>', '<script><!-- var  a = 1 ; --></script>'),
+    ('<style> a::after { content : "</style" } </style>', '<style> a::after { content : "</style" } </style>'),
+    ('<style media="print"> a { color : red } </style>', '<style media=print>a{color:red}</style>'),
+])
+def test_inline_script_and_style_edge_cases(html, expected):
+    assert minify_html(html, **INLINE) == expected
+    for chunk_size in (1, 6):
+        assert stream(html, chunk_size, **INLINE) == expected
+
+
+@pytest.mark.parametrize('html, expected', [
+    ('<script src="a.js" async="async" type="text/javascript"></script>', '<script src=a.js async></script>'),
+    ('<input value="a b" data-x=\'say "hi"\' disabled="">', '<input value="a b" data-x=\'say "hi"\' disabled>'),
+    # 空值不是布尔属性时保留引号
+    ('<a href=x title="">y</a>', '<a href=x title="">y</a>'),
+    ('<img src="a.png" />', '<img src=a.png />'),
+    ('<br/>', '<br/>'),
+])
+def test_attribute_minification(html, expected):
+    assert minify_html(html, **INLINE) == expected
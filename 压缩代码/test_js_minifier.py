@@ -0,0 +1,30 @@
+import pytest
+
+from js_minifier import minify_js
+
+
+def test_unterminated_template_ending_in_backslash():
+    assert minify_js('let t = `abc\\') == 'let t=`abc\\'
+
+
+def test_regex_after_condition_parenthesis():
+    assert minify_js('if (x) /re\\//.test(y); a = b / c') == 'if(x)/re\\//.test(y);a=b/c'
+    assert minify_js('while (i--) /x/g.exec(s)') == 'while(i--)/x/g.exec(s)'
+
+
+def test_division_after_call_is_kept():
+    assert minify_js('var r = f(a) / 2 // half') == 'var r=f(a)/2'
+
+
+@pytest.mark.parametrize('source', [
+    'f(a) /re\\//.test(y)',
+    'f(a) /x\\/*y/.test(z)',
+])
+def test_misread_regex_falls_back_to_original(source):
+    # 无法判断 / 的含义时，不能把正则表达式中的 // 当成注释删掉代码
+    assert minify_js(source) == source
+
+
+def test_strings_templates_and_regex_are_preserved():
+    source = 'var s = "a // b", t = `x ${ {a: 1}.a } // y`, r = /[/]\\/*/g;  /* c */ go( s )'
+    assert minify_js(source) == 'var s="a // b",t=`x ${{a:1}.a} // y`,r=/[/]\\/*/g;go(s)'
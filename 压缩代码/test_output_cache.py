@@ -0,0 +1,41 @@
+import json
+from pathlib import Path
+
+from compress_advanced import AdvancedCodeCompressor
+from output_cache import OutputCache
+
+CONFIG_FILE = Path(__file__).resolve().parent / 'compress_config.json'
+
+
+def test_restore_of_pruned_object_is_a_miss(tmp_path):
+    cache = OutputCache(tmp_path / 'cache')
+    key = cache.key('source-hash', 'js')
+    cache.store_bytes(key, b'var a=1;', {'type': 'js'})
+    assert cache.lookup(key) is not None
+    cache.object_path(key).unlink()
+    assert cache.restore(key, tmp_path / 'out.js', 'hardlink') is False
+    assert not (tmp_path / 'out.js').exists()
+
+
+def test_object_pruned_between_lookup_and_restore_is_recompressed(tmp_path, monkeypatch):
+    with open(CONFIG_FILE, encoding='utf-8') as f:
+        config = json.load(f)
+    config['output_settings']['cache'] = {'enabled': True, 'dir': str(tmp_path / 'cache')}
+    source, output = tmp_path / 'src', tmp_path / 'out'
+    source.mkdir()
+    (source / 'app.js').write_text('var a = 1;')
+    AdvancedCodeCompressor(config=config).compress_directory(str(source), str(output))
+
+    lookup = OutputCache.lookup
+
+    def lookup_then_prune(self, key):
+        meta = lookup(self, key)
+        # 模拟另一个进程在 lookup 和 restore 之间执行 cache prune
+        self.object_path(key).unlink(missing_ok=True)
+        return meta
+
+    monkeypatch.setattr(OutputCache, 'lookup', lookup_then_prune)
+    compressor = AdvancedCodeCompressor(config=config)
+    compressor.compress_directory(str(source), str(output))
+    assert (output / 'app.js').read_text() == 'var a=1;'
+    assert compressor.cache_hits == 0
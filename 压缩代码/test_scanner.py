@@ -0,0 +1,63 @@
+from pathlib import Path
+
+from compiled_config import SkipMatcher
+from scanner import IgnoreRules, is_excluded, scan_tree
+
+FILES = [
+    'index.html', 'debug.log', 'keep.log', 'build/out.js', 'src/build/util.js', 'src/app.js', 'src/app.test.js',
+    'docs/a/b/draft.md', 'docs/guide.md', 'vendor/lib.js', 'vendor/keep/lib.js', 'notes/todo.txt',
+    'notes/.compressignore', 'notes/sub/todo.txt', 'node_modules/x/index.js', 'file[1].txt',
+]
+
+ROOT_RULES = '''
+# 注释和空行忽略
+*.log
+!keep.log
+/build/
+**/draft.md
+*.test.js
+vendor/*
+!vendor/keep/
+file\\[1].txt
+'''
+
+
+def make_tree(root):
+    for rel in FILES:
+        path = root / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text('x')
+    (root / '.compressignore').write_text(ROOT_RULES)
+    (root / 'notes' / '.compressignore').write_text('/todo.txt\n')
+
+
+def test_ignore_rules_negation_and_anchoring(tmp_path):
+    make_tree(tmp_path)
+    skip = SkipMatcher(['node_modules'])
+    scanned = sorted(entry.rel_path.as_posix() for entry in scan_tree(tmp_path, skip.skip_dir, skip))
+    assert scanned == sorted([
+        'index.html', 'keep.log',
+        # 带 / 的模式相对于忽略文件所在目录：src/build 不受 /build/ 影响
+        'src/build/util.js', 'src/app.js',
+        'docs/guide.md', 'vendor/keep/lib.js',
+        # 子目录中的 /todo.txt 只匹配该目录下的文件
+        'notes/sub/todo.txt',
+    ])
+
+
+def test_is_excluded_agrees_with_scan_tree(tmp_path):
+    make_tree(tmp_path)
+    skip = SkipMatcher(['node_modules'])
+    scanned = {entry.rel_path.as_posix() for entry in scan_tree(tmp_path, skip.skip_dir, skip)}
+    for rel in FILES:
+        if rel.endswith('.compressignore'):
+            continue
+        assert is_excluded(tmp_path, Path(rel), skip.skip_dir, skip) == (rel not in scanned), rel
+
+
+def test_directory_only_rules_do_not_match_files():
+    rules = IgnoreRules(['cache/', '!important.log', '*.log'])
+    assert rules.match('cache', True) is True
+    assert rules.match('cache', False) is None
+    # 最后一条匹配的规则生效
+    assert rules.match('important.log', False) is True
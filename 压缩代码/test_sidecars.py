@@ -0,0 +1,66 @@
+import gzip
+import json
+import os
+from pathlib import Path
+
+import pytest
+
+from compress_advanced import AdvancedCodeCompressor
+from sidecars import SidecarSettings, brotli, write_output, write_sidecars, write_sidecars_from_file
+
+CONFIG_FILE = Path(__file__).resolve().parent / 'compress_config.json'
+
+DATA = b''.join(b'.rule-%d{color:#%06x}' % (i, i * 2654435761 % 0xffffff) for i in range(2000))
+
+
+def test_sidecars_round_trip(tmp_path):
+    output = tmp_path / 'app.css'
+    output.write_bytes(DATA)
+    settings = SidecarSettings({'enabled': True})
+    sizes = write_sidecars(output, DATA, settings)
+
+    assert gzip.decompress((tmp_path / 'app.css.gz').read_bytes()) == DATA
+    assert sizes['input'] == len(DATA)
+    assert sizes['gzip'] == os.path.getsize(tmp_path / 'app.css.gz')
+    if brotli is not None:
+        assert brotli.decompress((tmp_path / 'app.css.br').read_bytes()) == DATA
+        assert sizes['brotli'] == os.path.getsize(tmp_path / 'app.css.br')
+
+
+def test_file_and_memory_sidecars_are_identical(tmp_path):
+    settings = SidecarSettings({'enabled': True})
+    memory, streamed = tmp_path / 'memory.css', tmp_path / 'streamed.css'
+    memory.write_bytes(DATA)
+    streamed.write_bytes(DATA)
+    assert write_sidecars(memory, DATA, settings) == write_sidecars_from_file(streamed, settings, chunk_size=1000)
+    for suffix in ('.gz', '.br') if brotli is not None else ('.gz',):
+        assert Path(f'{memory}{suffix}').read_bytes() == Path(f'{streamed}{suffix}').read_bytes()
+
+
+def test_write_output_replaces_stale_sidecars(tmp_path):
+    output = tmp_path / 'small.js'
+    settings = SidecarSettings({'enabled': True, 'min_size': 100})
+    write_output(output, DATA, settings)
+    assert (tmp_path / 'small.js.gz').exists()
+    # 新内容小于 min_size 时旧的预压缩文件必须删除，否则服务器会返回过期内容
+    write_output(output, b'var a=1;', settings)
+    assert output.read_bytes() == b'var a=1;'
+    assert not (tmp_path / 'small.js.gz').exists()
+    assert not (tmp_path / 'small.js.br').exists()
+
+
+@pytest.mark.parametrize('stream_threshold', [0, 1])
+def test_compressor_sidecars_match_outputs(tmp_path, stream_threshold):
+    with open(CONFIG_FILE, encoding='utf-8') as f:
+        config = json.load(f)
+    config['output_settings']['precompress'] = {'enabled': True, 'min_size': 10}
+    config['compression_settings']['html']['stream_threshold'] = stream_threshold
+    source, output = tmp_path / 'src', tmp_path / 'out'
+    source.mkdir()
+    (source / 'index.html').write_text('<p>  hello   world  </p>' * 50)
+    (source / 'app.js').write_text('var  answer = 42 ;' * 50)
+    AdvancedCodeCompressor(config=config).compress_directory(str(source), str(output))
+
+    for name in ('index.html', 'app.js'):
+        data = (output / name).read_bytes()
+        assert gzip.decompress((output / f'{name}.gz').read_bytes()) == data
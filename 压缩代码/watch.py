@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监视模式
+先完成一次（增量）压缩，然后监视源目录：安装了 watchdog 模块时使用系统通知（Linux 上为 inotify），
+否则定期扫描比较文件大小和修改时间。一批连续的变化合并（防抖）后只处理受影响的文件
+"""
+
+import os
+import time
+import threading
+from pathlib import Path
+from datetime import datetime
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+from bundler import bundle_state_dir
+from scanner import scan_tree
+
+DEFAULT_DEBOUNCE = 0.1
+DEFAULT_POLL_INTERVAL = 0.5
+
+# 持续有变化时最多等待这么久也要处理一次
+MAX_BATCH_DELAY = 2.0
+
+
+class ChangeQueue:
+    """收集变化的路径；get_batch 等到一段时间内没有新的变化后一次取出"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._paths = set()
+        self._last_change = 0.0
+
+    def put(self, paths):
+        with self._cond:
+            self._paths.update(paths)
+            self._last_change = time.monotonic()
+            self._cond.notify()
+
+    def get_batch(self, debounce, max_delay=MAX_BATCH_DELAY):
+        with self._cond:
+            # 带超时等待，主线程可以及时响应 Ctrl+C
+            while not self._paths:
+                self._cond.wait(1.0)
+            first = time.monotonic()
+            while True:
+                now = time.monotonic()
+                remaining = min(self._last_change + debounce, first + max_delay) - now
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+            paths, self._paths = self._paths, set()
+            return paths
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, queue, output_dir):
+        self.queue = queue
+        self.ignored_dirs = (os.path.join(os.path.abspath(output_dir), ''),
+                             os.path.join(bundle_state_dir(output_dir), ''))
+
+    def on_any_event(self, event):
+        # 目录的修改事件只表示其中的文件有变化，文件本身会有单独的事件
+        if event.is_directory and event.event_type == 'modified':
+            return
+        if event.event_type in ('opened', 'closed', 'closed_no_write'):
+            return
+        paths = [event.src_path]
+        if getattr(event, 'dest_path', None):
+            paths.append(event.dest_path)
+        # 输出目录位于源目录中时忽略压缩结果（以及合并状态）的写入
+        paths = [path for path in map(os.fsdecode, paths) if not os.path.abspath(path).startswith(self.ignored_dirs)]
+        if paths:
+            self.queue.put(paths)
+
+
+class PollingWatcher(threading.Thread):
+    """没有 watchdog 时的轮询：用 scan_tree 扫描（跳过的目录不进入），比较大小和修改时间"""
+
+    def __init__(self, queue, source_dir, output_dir, compiled, interval=DEFAULT_POLL_INTERVAL):
+        super().__init__(daemon=True)
+        self.queue = queue
+        self.source_dir = Path(source_dir)
+        self.compiled = compiled
+        self.skip_dir = compiled.source_skip_dir(output_dir)
+        self.interval = interval
+        self._stop_event = threading.Event()
+        self._snapshot = self._scan()
+
+    def _scan(self):
+        compiled = self.compiled
+        snapshot = {}
+        directories = {self.source_dir}
+        for entry in scan_tree(self.source_dir, self.skip_dir, compiled.should_skip, compiled.ignore_file):
+            snapshot[entry.path] = (entry.stat.st_size, entry.stat.st_mtime_ns)
+            directories.add(entry.path.parent)
+        # 忽略文件本身不会被扫描到，单独检查
+        if compiled.ignore_file:
+            for directory in directories:
+                ignore_path = directory / compiled.ignore_file
+                try:
+                    stat = ignore_path.stat()
+                except OSError:
+                    continue
+                snapshot[ignore_path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            snapshot = self._scan()
+            previous = self._snapshot
+            changed = {path for path, state in snapshot.items() if previous.get(path) != state}
+            changed.update(path for path in previous if path not in snapshot)
+            self._snapshot = snapshot
+            if changed:
+                self.queue.put(changed)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def start_watcher(queue, source_dir, output_dir, compiled, use_polling=False, poll_interval=DEFAULT_POLL_INTERVAL):
+    """启动监视，返回 (监视器, 方式说明)；监视器有 stop() 方法"""
+    if Observer is not None and not use_polling:
+        observer = Observer()
+        observer.schedule(_EventHandler(queue, output_dir), os.path.abspath(source_dir), recursive=True)
+        observer.start()
+        return observer, f'watchdog ({type(observer).__name__})'
+    watcher = PollingWatcher(queue, source_dir, output_dir, compiled, poll_interval)
+    watcher.start()
+    return watcher, f'轮询（每 {poll_interval:g} 秒）'
+
+
+def watch(compressor, source_dir, output_dir, debounce=DEFAULT_DEBOUNCE, use_polling=False,
+          poll_interval=DEFAULT_POLL_INTERVAL):
+    """初次压缩后持续监视源目录，Ctrl+C 退出时打印统计报告"""
+    compressor.compress_directory(source_dir, output_dir)
+    compressor.print_summary()
+
+    queue = ChangeQueue()
+    watcher, method = start_watcher(queue, source_dir, output_dir, compressor.compiled, use_polling, poll_interval)
+    print(f"\n👀 监视中: {Path(source_dir).absolute()}（{method}，防抖 {debounce * 1000:.0f} ms），按 Ctrl+C 退出")
+
+    try:
+        while True:
+            paths = queue.get_batch(debounce)
+            started = time.perf_counter()
+            try:
+                result = compressor.update_paths(source_dir, output_dir, paths)
+            except Exception as e:
+                # 单批处理失败（如文件在处理中被删除、权限错误）不终止监视，文件再次变化时重新处理
+                print(f"❌ {datetime.now().strftime('%H:%M:%S')} 处理变化失败: {e}")
+                continue
+            elapsed = (time.perf_counter() - started) * 1000
+            if result is not None and not any(result):
+                continue
+
+            stats = compressor.stats.values()
+            total_original = sum(item['original'] for item in stats)
+            total_compressed = sum(item['compressed'] for item in stats)
+            total_files = sum(item['files'] for item in stats)
+            timestamp = datetime.now().strftime('%H:%M:%S')
+            if result is None:
+                print(f"🔄 {timestamp} 重新同步完成 ({elapsed:.0f} ms)", end='')
+            else:
+                print(f"🔄 {timestamp} 更新 {result[0]} 个文件，删除 {result[1]} 个输出 ({elapsed:.0f} ms)", end='')
+            print(f" | 总计 {total_files} 文件 {total_original:,} → {total_compressed:,} bytes")
+    except KeyboardInterrupt:
+        print("\n⏹️  停止监视")
+    finally:
+        watcher.stop()
+        watcher.join(timeout=5)
+        compressor.print_summary()